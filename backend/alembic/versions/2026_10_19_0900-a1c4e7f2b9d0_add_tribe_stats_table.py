@@ -0,0 +1,44 @@
+"""add_tribe_stats_table
+
+Revision ID: a1c4e7f2b9d0
+Revises: bfb4582d2806
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e7f2b9d0'
+down_revision = 'bfb4582d2806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reuse the existing genderenum type from the users table
+    gender_enum = postgresql.ENUM('MALE', 'FEMALE', 'PREFER_NOT_TO_SAY', name='genderenum', create_type=False)
+    
+    op.create_table(
+        'tribe_stats',
+        sa.Column('tribe_id', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=False),
+        sa.Column('gender', gender_enum, nullable=False),
+        sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('tribe_id', 'country', 'gender')
+    )
+    
+    # Backfill from active users (the nightly reconciler keeps it correct afterwards)
+    op.execute("""
+        INSERT INTO tribe_stats (tribe_id, country, gender, member_count, updated_at)
+        SELECT tribe_id, country, gender, COUNT(id), now()
+        FROM users
+        WHERE is_active = true
+        GROUP BY tribe_id, country, gender
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('tribe_stats')
@@ -0,0 +1,28 @@
+"""add_random_key_to_users
+
+Revision ID: b2d5f8a3c1e4
+Revises: a1c4e7f2b9d0
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d5f8a3c1e4'
+down_revision = 'a1c4e7f2b9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('random_key', sa.Float(), nullable=True))
+    op.execute("UPDATE users SET random_key = random() WHERE random_key IS NULL")
+    op.alter_column('users', 'random_key', nullable=False)
+    op.create_index('ix_users_tribe_id_random_key', 'users', ['tribe_id', 'random_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_tribe_id_random_key', table_name='users')
+    op.drop_column('users', 'random_key')
@@ -0,0 +1,25 @@
+"""add_tribe_member_keyset_index
+
+Revision ID: c3e6a9b4d2f5
+Revises: b2d5f8a3c1e4
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e6a9b4d2f5'
+down_revision = 'b2d5f8a3c1e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Supports keyset pagination of tribe members ordered by id
+    op.create_index('ix_users_tribe_id_id', 'users', ['tribe_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_tribe_id_id', table_name='users')
@@ -0,0 +1,32 @@
+"""add_room_participant_unique_constraint
+
+Revision ID: d4f7b1c5e3a6
+Revises: c3e6a9b4d2f5
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7b1c5e3a6'
+down_revision = 'c3e6a9b4d2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Remove duplicate participations (keep the earliest) before enforcing uniqueness
+    op.execute("""
+        DELETE FROM room_participants a
+        USING room_participants b
+        WHERE a.room_id = b.room_id
+          AND a.user_id = b.user_id
+          AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_room_participants_room_user', 'room_participants', ['room_id', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_room_participants_room_user', 'room_participants', type_='unique')
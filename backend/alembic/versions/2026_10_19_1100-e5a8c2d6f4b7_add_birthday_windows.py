@@ -0,0 +1,44 @@
+"""add_birthday_windows
+
+Revision ID: e5a8c2d6f4b7
+Revises: d4f7b1c5e3a6
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c2d6f4b7'
+down_revision = 'd4f7b1c5e3a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Windows are filled by the birthday_window_precompute job (and on demand)
+    op.create_table(
+        'birthday_windows',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('birthday_date', sa.Date(), nullable=False),
+        sa.Column('tz', sa.String(), nullable=False),
+        sa.Column('opens_at_utc', sa.DateTime(), nullable=False),
+        sa.Column('closes_at_utc', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'year', name='uq_birthday_windows_user_year')
+    )
+    op.create_index(op.f('ix_birthday_windows_id'), 'birthday_windows', ['id'], unique=False)
+    op.create_index('ix_birthday_windows_opens_at_utc', 'birthday_windows', ['opens_at_utc'], unique=False)
+    op.create_index('ix_birthday_windows_closes_at_utc', 'birthday_windows', ['closes_at_utc'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_birthday_windows_closes_at_utc', table_name='birthday_windows')
+    op.drop_index('ix_birthday_windows_opens_at_utc', table_name='birthday_windows')
+    op.drop_index(op.f('ix_birthday_windows_id'), table_name='birthday_windows')
+    op.drop_table('birthday_windows')
@@ -0,0 +1,28 @@
+"""add_lifecycle_sweep_indexes
+
+Revision ID: f6b9d3e7a5c8
+Revises: e5a8c2d6f4b7
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b9d3e7a5c8'
+down_revision = 'e5a8c2d6f4b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_rooms_is_active_closes_at', 'rooms', ['is_active', 'closes_at'], unique=False)
+    op.create_index('ix_birthday_walls_is_active_closes_at', 'birthday_walls', ['is_active', 'closes_at'], unique=False)
+    op.create_index('ix_birthday_buddies_is_active_expires_at', 'birthday_buddies', ['is_active', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_birthday_buddies_is_active_expires_at', table_name='birthday_buddies')
+    op.drop_index('ix_birthday_walls_is_active_closes_at', table_name='birthday_walls')
+    op.drop_index('ix_rooms_is_active_closes_at', table_name='rooms')
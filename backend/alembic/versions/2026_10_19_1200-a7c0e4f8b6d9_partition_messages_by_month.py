@@ -0,0 +1,122 @@
+"""partition_messages_by_month
+
+Revision ID: a7c0e4f8b6d9
+Revises: f6b9d3e7a5c8
+Create Date: 2026-10-19 12:00:00.000000
+
+Converts messages into a table range-partitioned by created_at, one
+partition per month (messages_yYYYYmMM) plus a default partition. The
+primary key becomes (id, created_at) since a partitioned table's unique
+constraints must include the partition key, which also means
+message_reactions can no longer hold a foreign key to messages.
+
+PostgreSQL only; other databases keep the plain table.
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c0e4f8b6d9'
+down_revision = 'f6b9d3e7a5c8'
+branch_labels = None
+depends_on = None
+
+# Future months created up front (the maintenance job keeps extending this)
+MONTHS_AHEAD = 2
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Dropped for good: the referenced key would have to include created_at.
+    # Reactions of archived partitions are deleted by the maintenance job;
+    # downgrade() restores the constraint.
+    op.execute("ALTER TABLE message_reactions DROP CONSTRAINT IF EXISTS message_reactions_message_id_fkey")
+    op.execute("ALTER TABLE messages RENAME TO messages_legacy")
+    op.execute("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_pkey TO messages_legacy_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_messages_id")
+
+    op.execute("""
+        CREATE TABLE messages (
+            id INTEGER NOT NULL DEFAULT nextval('messages_id_seq'),
+            room_id INTEGER NOT NULL REFERENCES rooms (id),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            content TEXT NOT NULL,
+            is_flagged BOOLEAN,
+            is_deleted BOOLEAN,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM messages_legacy")).scalar()
+    today = date.today()
+    month = date((oldest or datetime.utcnow()).year, (oldest or datetime.utcnow()).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE messages_y{month.year:04d}m{month.month:02d} PARTITION OF messages "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+    op.execute("""
+        INSERT INTO messages (id, room_id, user_id, content, is_flagged, is_deleted, created_at, updated_at)
+        SELECT id, room_id, user_id, content, is_flagged, is_deleted, COALESCE(created_at, now()), updated_at
+        FROM messages_legacy
+    """)
+    op.execute("DROP TABLE messages_legacy")
+
+    op.create_index('ix_messages_id', 'messages', ['id'], unique=False)
+    op.create_index('ix_messages_room_id_created_at', 'messages', ['room_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute("ALTER TABLE messages_partitioned RENAME CONSTRAINT messages_pkey TO messages_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE messages (
+            id INTEGER NOT NULL DEFAULT nextval('messages_id_seq') PRIMARY KEY,
+            room_id INTEGER NOT NULL REFERENCES rooms (id),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            content TEXT NOT NULL,
+            is_flagged BOOLEAN,
+            is_deleted BOOLEAN,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute("ALTER SEQUENCE messages_id_seq OWNED BY messages.id")
+    op.execute("""
+        INSERT INTO messages (id, room_id, user_id, content, is_flagged, is_deleted, created_at, updated_at)
+        SELECT id, room_id, user_id, content, is_flagged, is_deleted, created_at, updated_at
+        FROM messages_partitioned
+    """)
+    op.execute("DROP TABLE messages_partitioned CASCADE")
+    op.execute("DROP INDEX IF EXISTS ix_messages_id")
+    op.create_index('ix_messages_id', 'messages', ['id'], unique=False)
+    op.execute("""
+        DELETE FROM message_reactions
+        WHERE message_id NOT IN (SELECT id FROM messages)
+    """)
+    op.create_foreign_key(
+        'message_reactions_message_id_fkey', 'message_reactions', 'messages',
+        ['message_id'], ['id']
+    )
@@ -0,0 +1,40 @@
+"""add_message_search_vector
+
+Revision ID: b8d1f5a9c7e0
+Revises: a7c0e4f8b6d9
+Create Date: 2026-10-19 12:30:00.000000
+
+Adds a generated tsvector column over messages.content with a GIN index for
+moderator search. Being a generated column it stays current on insert and
+edit without triggers, and new monthly partitions inherit it.
+
+PostgreSQL only; other databases use the in-process search index.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d1f5a9c7e0'
+down_revision = 'a7c0e4f8b6d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        ALTER TABLE messages
+        ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED
+    """)
+    op.execute("CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_messages_search_vector")
+    op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS search_vector")
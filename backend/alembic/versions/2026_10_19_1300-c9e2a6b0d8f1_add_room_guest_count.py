@@ -0,0 +1,35 @@
+"""add_room_guest_count
+
+Revision ID: c9e2a6b0d8f1
+Revises: b8d1f5a9c7e0
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e2a6b0d8f1'
+down_revision = 'b8d1f5a9c7e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('rooms', sa.Column('guest_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill personal rooms with the participants other than the owner
+    op.execute("""
+        UPDATE rooms
+        SET guest_count = (
+            SELECT count(*) FROM room_participants p
+            WHERE p.room_id = rooms.id
+              AND (p.user_id IS NULL OR p.user_id <> rooms.owner_id)
+        )
+        WHERE owner_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('rooms', 'guest_count')
@@ -0,0 +1,71 @@
+"""add_reaction_and_upload_unique_constraints
+
+Revision ID: d0f3b7c1e9a2
+Revises: c9e2a6b0d8f1
+Create Date: 2026-10-19 13:30:00.000000
+
+room_participants (room_id, user_id) is already unique since d4f7b1c5e3a6.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f3b7c1e9a2'
+down_revision = 'c9e2a6b0d8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Remove duplicates (keep the earliest row) before enforcing uniqueness
+    op.execute("""
+        DELETE FROM photo_reactions a
+        USING photo_reactions b
+        WHERE a.photo_id = b.photo_id
+          AND a.user_id = b.user_id
+          AND a.emoji = b.emoji
+          AND a.id > b.id
+    """)
+    op.execute("""
+        DELETE FROM message_reactions a
+        USING message_reactions b
+        WHERE a.message_id = b.message_id
+          AND a.user_id = b.user_id
+          AND a.emoji = b.emoji
+          AND a.id > b.id
+    """)
+
+    # Fold duplicate upload tracking rows into the earliest one
+    op.execute("""
+        UPDATE wall_uploads w
+        SET upload_count = totals.upload_count,
+            last_upload_at = totals.last_upload_at
+        FROM (
+            SELECT min(id) AS id,
+                   sum(coalesce(upload_count, 1)) AS upload_count,
+                   max(last_upload_at) AS last_upload_at
+            FROM wall_uploads
+            WHERE uploader_user_id IS NOT NULL
+            GROUP BY wall_id, uploader_user_id
+            HAVING count(*) > 1
+        ) totals
+        WHERE w.id = totals.id
+    """)
+    op.execute("""
+        DELETE FROM wall_uploads a
+        USING wall_uploads b
+        WHERE a.wall_id = b.wall_id
+          AND a.uploader_user_id = b.uploader_user_id
+          AND a.id > b.id
+    """)
+
+    op.create_unique_constraint('uq_photo_reactions_photo_user_emoji', 'photo_reactions', ['photo_id', 'user_id', 'emoji'])
+    op.create_unique_constraint('uq_wall_uploads_wall_uploader', 'wall_uploads', ['wall_id', 'uploader_user_id'])
+    op.create_unique_constraint('uq_message_reactions_message_user_emoji', 'message_reactions', ['message_id', 'user_id', 'emoji'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_message_reactions_message_user_emoji', 'message_reactions', type_='unique')
+    op.drop_constraint('uq_wall_uploads_wall_uploader', 'wall_uploads', type_='unique')
+    op.drop_constraint('uq_photo_reactions_photo_user_emoji', 'photo_reactions', type_='unique')
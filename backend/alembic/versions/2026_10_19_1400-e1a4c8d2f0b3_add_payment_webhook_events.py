@@ -0,0 +1,52 @@
+"""add_payment_webhook_events
+
+Revision ID: e1a4c8d2f0b3
+Revises: d0f3b7c1e9a2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a4c8d2f0b3'
+down_revision = 'd0f3b7c1e9a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_webhook_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('transaction_id', sa.String(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=True),
+        sa.Column('tx_ref', sa.String(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('transaction_id')
+    )
+    op.create_index(op.f('ix_payment_webhook_events_id'), 'payment_webhook_events', ['id'], unique=False)
+    op.create_index(op.f('ix_payment_webhook_events_tx_ref'), 'payment_webhook_events', ['tx_ref'], unique=False)
+    op.create_index(
+        'ix_payment_webhook_events_status_next_attempt_at',
+        'payment_webhook_events',
+        ['status', 'next_attempt_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_webhook_events_status_next_attempt_at', table_name='payment_webhook_events')
+    op.drop_index(op.f('ix_payment_webhook_events_tx_ref'), table_name='payment_webhook_events')
+    op.drop_index(op.f('ix_payment_webhook_events_id'), table_name='payment_webhook_events')
+    op.drop_table('payment_webhook_events')
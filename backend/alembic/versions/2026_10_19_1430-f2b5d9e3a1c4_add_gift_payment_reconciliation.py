@@ -0,0 +1,26 @@
+"""add_gift_payment_reconciliation
+
+Revision ID: f2b5d9e3a1c4
+Revises: e1a4c8d2f0b3
+Create Date: 2026-10-19 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b5d9e3a1c4'
+down_revision = 'e1a4c8d2f0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('gifts', sa.Column('payment_checked_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_gifts_payment_status_created_at', 'gifts', ['payment_status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gifts_payment_status_created_at', table_name='gifts')
+    op.drop_column('gifts', 'payment_checked_at')
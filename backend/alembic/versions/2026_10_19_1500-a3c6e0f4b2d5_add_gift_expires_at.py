@@ -0,0 +1,39 @@
+"""add_gift_expires_at
+
+Revision ID: a3c6e0f4b2d5
+Revises: f2b5d9e3a1c4
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c6e0f4b2d5'
+down_revision = 'f2b5d9e3a1c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('gifts', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_gifts_recipient_id_delivered_at', 'gifts', ['recipient_id', 'delivered_at'], unique=False)
+
+    # Backfill from the per-type durations in DigitalGiftService (digital cards never expire)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("""
+        UPDATE gifts
+        SET expires_at = delivered_at + CASE gift_type
+            WHEN 'WALL_HIGHLIGHT' THEN interval '48 hours'
+            ELSE interval '24 hours'
+        END
+        WHERE delivered_at IS NOT NULL
+          AND gift_type IN ('CONFETTI_EFFECT', 'CELEBRANT_BADGE', 'WALL_HIGHLIGHT', 'FEATURED_MESSAGE')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gifts_recipient_id_delivered_at', table_name='gifts')
+    op.drop_column('gifts', 'expires_at')
@@ -0,0 +1,49 @@
+"""add_gift_history_indexes_and_counters
+
+Revision ID: b4d7f1a5c3e6
+Revises: a3c6e0f4b2d5
+Create Date: 2026-10-19 15:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d7f1a5c3e6'
+down_revision = 'a3c6e0f4b2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_gifts_recipient_id_payment_status_created_at',
+        'gifts',
+        ['recipient_id', 'payment_status', 'created_at'],
+        unique=False
+    )
+    op.create_index('ix_gifts_sender_id_created_at', 'gifts', ['sender_id', 'created_at'], unique=False)
+
+    op.add_column('users', sa.Column('gifts_sent_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('gifts_received_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill; kept in sync afterwards by GiftStatsService
+    op.execute("""
+        UPDATE users SET gifts_sent_count = (
+            SELECT count(*) FROM gifts WHERE gifts.sender_id = users.id
+        )
+    """)
+    op.execute("""
+        UPDATE users SET gifts_received_count = (
+            SELECT count(*) FROM gifts
+            WHERE gifts.recipient_id = users.id AND gifts.payment_status = 'completed'
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'gifts_received_count')
+    op.drop_column('users', 'gifts_sent_count')
+    op.drop_index('ix_gifts_sender_id_created_at', table_name='gifts')
+    op.drop_index('ix_gifts_recipient_id_payment_status_created_at', table_name='gifts')
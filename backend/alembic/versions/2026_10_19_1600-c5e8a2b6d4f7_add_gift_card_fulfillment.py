@@ -0,0 +1,76 @@
+"""add_gift_card_fulfillment
+
+Revision ID: c5e8a2b6d4f7
+Revises: b4d7f1a5c3e6
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a2b6d4f7'
+down_revision = 'b4d7f1a5c3e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('gift_catalog', sa.Column('provider_key', sa.String(), nullable=True))
+
+    # Backfill with the name matching send_gift used before provider_key existed
+    op.execute("""
+        UPDATE gift_catalog SET provider_key = CASE
+            WHEN lower(name) LIKE '%amazon%' THEN 'amazon'
+            WHEN lower(name) LIKE '%netflix%' THEN 'netflix'
+            WHEN lower(name) LIKE '%spotify%' THEN 'spotify'
+            WHEN lower(name) LIKE '%apple%' OR lower(name) LIKE '%app store%' THEN 'apple'
+            WHEN lower(name) LIKE '%google play%' THEN 'google_play'
+            WHEN lower(name) LIKE '%uber eats%' THEN 'uber_eats'
+            WHEN lower(name) LIKE '%starbucks%' THEN 'starbucks'
+            WHEN lower(name) LIKE '%airbnb%' THEN 'airbnb'
+            WHEN lower(name) LIKE '%steam%' THEN 'steam'
+            WHEN lower(name) LIKE '%disney%' THEN 'disney_plus'
+            WHEN lower(name) LIKE '%sephora%' THEN 'sephora'
+            WHEN lower(name) LIKE '%nike%' THEN 'nike'
+            WHEN lower(name) LIKE '%uber%' THEN 'uber'
+            WHEN lower(name) LIKE '%doordash%' THEN 'doordash'
+            WHEN lower(name) LIKE '%masterclass%' THEN 'masterclass'
+        END
+        WHERE gift_type = 'GIFT_CARD'
+    """)
+
+    op.create_table(
+        'gift_card_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('gift_id', sa.Integer(), nullable=False),
+        sa.Column('provider_key', sa.String(), nullable=False),
+        sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('provider_reference', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('fulfilled_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['gift_id'], ['gifts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('gift_id')
+    )
+    op.create_index(op.f('ix_gift_card_jobs_id'), 'gift_card_jobs', ['id'], unique=False)
+    op.create_index(
+        'ix_gift_card_jobs_status_next_attempt_at',
+        'gift_card_jobs',
+        ['status', 'next_attempt_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gift_card_jobs_status_next_attempt_at', table_name='gift_card_jobs')
+    op.drop_index(op.f('ix_gift_card_jobs_id'), table_name='gift_card_jobs')
+    op.drop_table('gift_card_jobs')
+    op.drop_column('gift_catalog', 'provider_key')
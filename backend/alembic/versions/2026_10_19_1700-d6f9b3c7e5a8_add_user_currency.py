@@ -0,0 +1,25 @@
+"""add_user_currency
+
+Revision ID: d6f9b3c7e5a8
+Revises: c5e8a2b6d4f7
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f9b3c7e5a8'
+down_revision = 'c5e8a2b6d4f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled at signup, and on first use for existing users (CurrencyService.currency_for_user)
+    op.add_column('users', sa.Column('currency', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'currency')
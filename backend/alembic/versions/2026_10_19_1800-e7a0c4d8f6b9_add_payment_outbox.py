@@ -0,0 +1,48 @@
+"""add_payment_outbox
+
+Revision ID: e7a0c4d8f6b9
+Revises: d6f9b3c7e5a8
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a0c4d8f6b9'
+down_revision = 'd6f9b3c7e5a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('gift_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['gift_id'], ['gifts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payment_outbox_id'), 'payment_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_payment_outbox_gift_id'), 'payment_outbox', ['gift_id'], unique=False)
+    op.create_index(
+        'ix_payment_outbox_status_created_at',
+        'payment_outbox',
+        ['status', 'created_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_outbox_status_created_at', table_name='payment_outbox')
+    op.drop_index(op.f('ix_payment_outbox_gift_id'), table_name='payment_outbox')
+    op.drop_index(op.f('ix_payment_outbox_id'), table_name='payment_outbox')
+    op.drop_table('payment_outbox')
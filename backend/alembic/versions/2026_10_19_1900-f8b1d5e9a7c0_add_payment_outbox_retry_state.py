@@ -0,0 +1,50 @@
+"""add_payment_outbox_retry_state
+
+Revision ID: f8b1d5e9a7c0
+Revises: e7a0c4d8f6b9
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8b1d5e9a7c0'
+down_revision = 'e7a0c4d8f6b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('payment_outbox', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('payment_outbox', sa.Column(
+        'next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()
+    ))
+    op.add_column('payment_outbox', sa.Column('locked_until', sa.DateTime(), nullable=True))
+
+    # Entries already dispatched count as one attempt; abandoned entries are final
+    op.execute("UPDATE payment_outbox SET attempts = 1 WHERE status <> 'pending'")
+    op.execute("UPDATE payment_outbox SET status = 'failed' WHERE status = 'abandoned'")
+
+    op.drop_index('ix_payment_outbox_status_created_at', table_name='payment_outbox')
+    op.create_index(
+        'ix_payment_outbox_status_next_attempt_at',
+        'payment_outbox',
+        ['status', 'next_attempt_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_outbox_status_next_attempt_at', table_name='payment_outbox')
+    op.create_index(
+        'ix_payment_outbox_status_created_at',
+        'payment_outbox',
+        ['status', 'created_at'],
+        unique=False
+    )
+    op.execute("UPDATE payment_outbox SET status = 'pending' WHERE status = 'processing'")
+    op.drop_column('payment_outbox', 'locked_until')
+    op.drop_column('payment_outbox', 'next_attempt_at')
+    op.drop_column('payment_outbox', 'attempts')
@@ -0,0 +1,38 @@
+"""split_payment_transaction_id
+
+Revision ID: a9c2e6f0b8d1
+Revises: f8b1d5e9a7c0
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c2e6f0b8d1'
+down_revision = 'f8b1d5e9a7c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('gifts', sa.Column('payment_transaction_id', sa.String(), nullable=True))
+
+    # Completed gifts stored "tx_ref|transaction_id"; keep the bare tx_ref so
+    # webhooks find gifts by equality on the unique payment_intent_id index
+    op.execute("""
+        UPDATE gifts
+        SET payment_transaction_id = split_part(payment_intent_id, '|', 2),
+            payment_intent_id = split_part(payment_intent_id, '|', 1)
+        WHERE payment_intent_id LIKE '%|%'
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE gifts
+        SET payment_intent_id = payment_intent_id || '|' || payment_transaction_id
+        WHERE payment_transaction_id IS NOT NULL
+    """)
+    op.drop_column('gifts', 'payment_transaction_id')
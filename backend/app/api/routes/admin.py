@@ -1,17 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from pydantic import BaseModel
 from datetime import datetime, date, timedelta
+from decimal import Decimal
 from typing import Optional, List
 from collections import defaultdict
+import csv
+import enum
+import io
+import json
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.auth import require_admin, get_current_user
+from app.core.http_client import get_metrics as get_http_client_metrics
 from app.models import (
     User, Celebrity, ModerationLog, FlaggedContent,
     ModerationActionEnum, ContentTypeEnum, Room, Message, Gift, BirthdayWall, GiftCatalog
 )
+from app.services.tribe_stats_service import TribeStatsService
+from app.services.celebrant_service import CelebrantService
+from app.services.message_search_service import MessageSearchService
+from app.services.gift_catalog_service import GiftCatalogService
 from fastapi import Request
 
 router = APIRouter()
@@ -133,6 +144,59 @@ async def get_flagged_content(
     }
 
 
+@router.get("/messages/search")
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    room_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    include_deleted: bool = Query(True),
+    limit: int = Query(50, ge=1, le=200),
+    admin_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over room messages for moderation"""
+    
+    # Bounding by date also lets PostgreSQL skip unrelated message partitions
+    results = MessageSearchService.search(
+        db,
+        q,
+        room_id=room_id,
+        user_id=user_id,
+        start_date=start_date,
+        end_date=end_date,
+        include_deleted=include_deleted,
+        limit=limit
+    )
+    
+    return {
+        "query": q,
+        "count": len(results),
+        "messages": [
+            {
+                "id": msg.id,
+                "room_id": msg.room_id,
+                "user_id": msg.user_id,
+                "content": msg.content,
+                "is_flagged": msg.is_flagged,
+                "is_deleted": msg.is_deleted,
+                "created_at": msg.created_at
+            }
+            for msg in results
+        ]
+    }
+
+
+@router.get("/http-metrics")
+async def get_http_metrics(
+    admin_user: User = Depends(require_admin)
+):
+    """Latency and error counts for outbound HTTP calls, per host"""
+    
+    return {"hosts": get_http_client_metrics()}
+
+
 @router.get("/stats/overview")
 async def get_platform_stats(db: Session = Depends(get_db)):
     """Get platform statistics"""
@@ -157,40 +221,20 @@ async def get_platform_stats(db: Session = Depends(get_db)):
 
 
 @router.get("/celebrants/state/{state}")
-async def get_state_celebrants(state: str, db: Session = Depends(get_db)):
+async def get_state_celebrants(
+    state: str,
+    country: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """Get celebrants in a specific state today"""
     
-    today = date.today()
-    
-    # Get all celebrants
-    all_celebrants = db.query(User).filter(
-        User.birth_month == today.month,
-        User.birth_day == today.day,
-        User.state == state,
-        User.is_active == True
-    ).count()
-    
-    # Get visible celebrants
-    visible_celebrants = db.query(User).filter(
-        User.birth_month == today.month,
-        User.birth_day == today.day,
-        User.state == state,
-        User.state_visibility_enabled == True,
-        User.is_active == True
-    ).all()
+    celebrants = CelebrantService.get_state_celebrants(db, state, country)
     
     return {
         "state": state,
-        "total_celebrants": all_celebrants,
-        "visible_celebrants": [
-            {
-                "id": user.id,
-                "first_name": user.first_name,
-                "profile_picture_url": user.profile_picture_url,
-                "city": user.city
-            }
-            for user in visible_celebrants
-        ]
+        "country": country,
+        "total_celebrants": celebrants["total_celebrants"],
+        "visible_celebrants": celebrants["visible_celebrants"]
     }
 
 
@@ -393,17 +437,8 @@ async def get_tribe_analytics(
 ):
     """Get birthday tribe analytics"""
     
-    # Tribe sizes
-    tribe_sizes = db.query(
-        User.tribe_id,
-        func.count(User.id).label('member_count')
-    ).filter(
-        User.is_active == True
-    ).group_by(
-        User.tribe_id
-    ).order_by(
-        func.count(User.id).desc()
-    ).limit(20).all()
+    # Tribe sizes (precomputed)
+    tribe_sizes = TribeStatsService.get_tribe_sizes(db, limit=20)
     
     # Calculate average tribe size from the results
     if tribe_sizes:
@@ -412,10 +447,8 @@ async def get_tribe_analytics(
     else:
         avg_tribe_size = 0
     
-    # Get total number of unique tribes
-    total_tribes = db.query(func.count(func.distinct(User.tribe_id))).filter(
-        User.is_active == True
-    ).scalar() or 0
+    # Get total number of tribes with active members
+    total_tribes = TribeStatsService.count_tribes(db)
     
     return {
         "top_tribes": [
@@ -555,6 +588,175 @@ async def get_user_activities(
     }
 
 
+# ========== STREAMING EXPORT ENDPOINTS ==========
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _export_value(value):
+    """Convert a column value into something JSON/CSV can represent"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _stream_rows(build_query, columns: List[str], export_format: str):
+    """
+    Stream query rows as NDJSON or CSV, one row at a time.
+
+    Runs in its own session because the request-scoped session is closed
+    before a StreamingResponse body is iterated. Rows are fetched through a
+    server-side cursor in EXPORT_BATCH_SIZE chunks, so memory stays flat no
+    matter how many rows are exported.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush_buffer() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return line
+    
+    if export_format == "csv":
+        # Send the header before the query runs so bytes go out immediately
+        writer.writerow(columns)
+        yield flush_buffer()
+    
+    db = SessionLocal()
+    try:
+        for row in build_query(db).yield_per(EXPORT_BATCH_SIZE):
+            values = [_export_value(value) for value in row]
+            if export_format == "csv":
+                writer.writerow(values)
+                yield flush_buffer()
+            else:
+                yield json.dumps(dict(zip(columns, values)), default=str) + "\n"
+    finally:
+        db.close()
+
+
+def _export_response(build_query, columns: List[str], export_format: str, filename: str) -> StreamingResponse:
+    """Wrap a row stream in a downloadable StreamingResponse"""
+    return StreamingResponse(
+        _stream_rows(build_query, columns, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        }
+    )
+
+
+@router.get("/export/users")
+async def export_users(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    is_active: Optional[bool] = Query(None),
+    admin_user: User = Depends(require_admin)
+):
+    """Stream all users as NDJSON or CSV"""
+    
+    columns = [
+        "id", "first_name", "email", "tribe_id", "gender", "country", "state",
+        "city", "is_active", "is_verified", "created_at", "updated_at"
+    ]
+    
+    def build_query(db: Session):
+        query = db.query(*(getattr(User, column) for column in columns))
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        return query.order_by(User.id)
+    
+    return _export_response(build_query, columns, export_format, "users")
+
+
+@router.get("/export/user-activities")
+async def export_user_activities(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    admin_user: User = Depends(require_admin)
+):
+    """Stream per-user activity counts as NDJSON or CSV"""
+    
+    columns = [
+        "user_id", "user_name", "email", "tribe_id", "country", "state",
+        "created_at", "last_active", "messages_sent", "gifts_sent",
+        "gifts_received", "walls_created"
+    ]
+    
+    def build_query(db: Session):
+        # Aggregate each activity table once instead of counting per user
+        message_counts = db.query(
+            Message.user_id.label("user_id"),
+            func.count(Message.id).label("count")
+        ).group_by(Message.user_id).subquery()
+        gifts_sent = db.query(
+            Gift.sender_id.label("user_id"),
+            func.count(Gift.id).label("count")
+        ).group_by(Gift.sender_id).subquery()
+        gifts_received = db.query(
+            Gift.recipient_id.label("user_id"),
+            func.count(Gift.id).label("count")
+        ).group_by(Gift.recipient_id).subquery()
+        wall_counts = db.query(
+            BirthdayWall.owner_id.label("user_id"),
+            func.count(BirthdayWall.id).label("count")
+        ).group_by(BirthdayWall.owner_id).subquery()
+        
+        return db.query(
+            User.id,
+            User.first_name,
+            User.email,
+            User.tribe_id,
+            User.country,
+            User.state,
+            User.created_at,
+            User.updated_at,
+            func.coalesce(message_counts.c.count, 0),
+            func.coalesce(gifts_sent.c.count, 0),
+            func.coalesce(gifts_received.c.count, 0),
+            func.coalesce(wall_counts.c.count, 0)
+        ).outerjoin(
+            message_counts, message_counts.c.user_id == User.id
+        ).outerjoin(
+            gifts_sent, gifts_sent.c.user_id == User.id
+        ).outerjoin(
+            gifts_received, gifts_received.c.user_id == User.id
+        ).outerjoin(
+            wall_counts, wall_counts.c.user_id == User.id
+        ).order_by(User.id)
+    
+    return _export_response(build_query, columns, export_format, "user_activities")
+
+
+@router.get("/export/flagged-content")
+async def export_flagged_content(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = Query(None),
+    admin_user: User = Depends(require_admin)
+):
+    """Stream flagged content reports as NDJSON or CSV"""
+    
+    columns = [
+        "id", "content_type", "content_id", "reported_by_user_id", "reason",
+        "status", "reviewed_by_moderator_id", "reviewed_at", "created_at"
+    ]
+    
+    def build_query(db: Session):
+        query = db.query(*(getattr(FlaggedContent, column) for column in columns))
+        if status:
+            query = query.filter(FlaggedContent.status == status)
+        return query.order_by(FlaggedContent.id)
+    
+    return _export_response(build_query, columns, export_format, "flagged_content")
+
+
 @router.post("/run-migrations")
 async def run_migrations_endpoint():
     """
@@ -642,6 +844,7 @@ async def seed_initial_data(db: Session = Depends(get_db)):
                 try:
                     from database.seed_gift_catalog import seed_gift_catalog
                     seed_gift_catalog()
+                    GiftCatalogService.invalidate()
                     results["gifts_seeded"] = True
                     results["message"] += f"✅ Seeded gift catalog. "
                 except Exception as e:
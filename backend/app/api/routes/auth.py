@@ -12,6 +12,8 @@ from app.core.auth import get_current_user
 from app.core.security import limiter, sanitize_input
 from app.models import User, GenderEnum
 from app.core.config import settings
+from app.services.tribe_stats_service import TribeStatsService
+from app.services.currency_service import CurrencyService
 
 router = APIRouter()
 
@@ -120,6 +122,7 @@ async def signup(request: Request, signup_data: SignupRequest, db: Session = Dep
         date_of_birth=request_data.date_of_birth,
         gender=request_data.gender,
         country=request_data.country,
+        currency=await CurrencyService.get_user_currency(request_data.country),
         state=request_data.state,
         city=request_data.city,
         profile_picture_url=request_data.profile_picture_url,
@@ -131,6 +134,12 @@ async def signup(request: Request, signup_data: SignupRequest, db: Session = Dep
     )
     
     db.add(new_user)
+    
+    # Keep precomputed tribe counts in the same transaction as the new user
+    TribeStatsService.record_member_change(
+        db, tribe_id, new_user.country, new_user.gender, +1
+    )
+    
     db.commit()
     db.refresh(new_user)
     
@@ -3,10 +3,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.models import BirthdayBuddy, User, Room, RoomTypeEnum
+from app.services.birthday_window_service import BirthdayWindowService
 
 router = APIRouter()
 
@@ -40,9 +41,8 @@ async def get_buddy_status(
             detail="User not found"
         )
     
-    # Check if user has a buddy for their birthday
-    today = date.today()
-    user_birthday = date(today.year, user.birth_month, user.birth_day)
+    # Check if user has a buddy for their (local) birthday
+    user_birthday = BirthdayWindowService.get_current_window(db, user).birthday_date
     
     # Find active buddy pairing
     buddy = db.query(BirthdayBuddy).filter(
@@ -93,8 +93,7 @@ async def create_buddy_match(
         )
     
     # Check if user already has a buddy
-    today = date.today()
-    user_birthday = date(today.year, user.birth_month, user.birth_day)
+    user_birthday = BirthdayWindowService.get_current_window(db, user).birthday_date
     
     existing_buddy = db.query(BirthdayBuddy).filter(
         or_(
@@ -179,8 +178,7 @@ async def accept_buddy(
             detail="User not found"
         )
     
-    today = date.today()
-    user_birthday = date(today.year, user.birth_month, user.birth_day)
+    user_birthday = BirthdayWindowService.get_current_window(db, user).birthday_date
     
     # Find buddy pairing
     buddy = db.query(BirthdayBuddy).filter(
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Header, Response
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 from decimal import Decimal
+from datetime import datetime
+import logging
 import os
 
 from app.core.database import get_db
@@ -11,8 +14,14 @@ from app.core.config import settings
 from app.models import Gift, GiftCatalog, GiftTypeEnum, PaymentProviderEnum, User
 from app.services.flutterwave_service import FlutterwaveService
 from app.services.currency_service import CurrencyService
+from app.services.gift_catalog_service import GiftCatalogService
+from app.services.gift_stats_service import GiftStatsService
+from app.services.payment_outbox_service import PaymentOutboxService, FLUTTERWAVE_INITIALIZE
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_GIFT_PAGE_SIZE = 100
 
 
 class SendGiftRequest(BaseModel):
@@ -25,6 +34,7 @@ class SendGiftRequest(BaseModel):
 @router.get("/catalog")
 async def get_gift_catalog(
     current_user: Optional[User] = Depends(get_optional_user),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -32,56 +42,22 @@ async def get_gift_catalog(
     
     If user is authenticated, prices are converted to their country's currency.
     Otherwise, prices are returned in USD (base currency).
-    """
     
-    gifts = db.query(GiftCatalog).filter(
-        GiftCatalog.is_active == True
-    ).order_by(GiftCatalog.display_order).all()
+    Served from the materialized catalog; supports If-None-Match revalidation.
+    """
     
     # Get user's currency if authenticated
     user_currency = CurrencyService.BASE_CURRENCY
     if current_user:
-        user_currency = await CurrencyService.get_user_currency(current_user.country)
-    
-    # Convert prices if user currency is different from base
-    converted_gifts = []
-    for gift in gifts:
-        base_price = Decimal(str(gift.price))
-        display_price = base_price
-        display_currency = gift.currency
-        
-        # Convert if user currency is different
-        if user_currency != CurrencyService.BASE_CURRENCY:
-            try:
-                display_price = await CurrencyService.convert_currency(
-                    base_price,
-                    CurrencyService.BASE_CURRENCY,
-                    user_currency
-                )
-                display_currency = user_currency
-            except Exception as e:
-                print(f"Error converting currency for gift {gift.id}: {str(e)}")
-                # Fallback to base currency
-                display_price = base_price
-                display_currency = CurrencyService.BASE_CURRENCY
-        
-        converted_gifts.append({
-            "id": gift.id,
-            "name": gift.name,
-            "description": gift.description,
-            "gift_type": gift.gift_type,
-            "price": float(display_price),
-            "currency": display_currency,
-            "base_price": float(base_price),  # Include base price for reference
-            "base_currency": CurrencyService.BASE_CURRENCY,
-            "image_url": gift.image_url,
-            "is_featured": gift.is_featured
-        })
+        user_currency = await CurrencyService.currency_for_user(db, current_user)
     
-    return {
-        "gifts": converted_gifts,
-        "user_currency": user_currency
-    }
+    body, etag = await GiftCatalogService.get_catalog(user_currency)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/send")
@@ -116,7 +92,7 @@ async def send_gift(
     
     # Get user's currency and convert price
     base_price = Decimal(str(catalog_item.price))
-    user_currency = await CurrencyService.get_user_currency(sender.country)
+    user_currency = await CurrencyService.currency_for_user(db, sender)
     
     # Convert price to user's currency
     converted_price = base_price
@@ -133,8 +109,15 @@ async def send_gift(
             converted_price = base_price
             user_currency = CurrencyService.BASE_CURRENCY
     
-    # Generate transaction reference
-    tx_ref = FlutterwaveService.generate_tx_ref(0)  # Will update after gift creation
+    is_flutterwave = gift_request.payment_provider == PaymentProviderEnum.FLUTTERWAVE
+    if is_flutterwave and not settings.FLUTTERWAVE_SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Flutterwave is not configured"
+        )
+    
+    # Transaction reference is generated up front, so the gift is inserted once
+    tx_ref = FlutterwaveService.generate_tx_ref()
     
     # Create gift transaction (store converted amount and currency)
     gift = Gift(
@@ -151,96 +134,60 @@ async def send_gift(
         payment_intent_id=tx_ref  # Store tx_ref as payment_intent_id
     )
     
-    # If this is a gift card, extract provider name from gift name
+    # Gift cards are fulfilled by the provider registered for the catalog item
     if catalog_item.gift_type == GiftTypeEnum.GIFT_CARD:
-        # Extract provider from name (e.g., "Amazon Gift Card $25" -> "amazon")
-        gift_name_lower = catalog_item.name.lower()
-        if "amazon" in gift_name_lower:
-            gift.gift_card_provider = "amazon"
-        elif "netflix" in gift_name_lower:
-            gift.gift_card_provider = "netflix"
-        elif "spotify" in gift_name_lower:
-            gift.gift_card_provider = "spotify"
-        elif "apple" in gift_name_lower or "app store" in gift_name_lower:
-            gift.gift_card_provider = "apple"
-        elif "google play" in gift_name_lower:
-            gift.gift_card_provider = "google_play"
-        elif "uber eats" in gift_name_lower:
-            gift.gift_card_provider = "uber_eats"
-        elif "starbucks" in gift_name_lower:
-            gift.gift_card_provider = "starbucks"
-        elif "airbnb" in gift_name_lower:
-            gift.gift_card_provider = "airbnb"
-        elif "steam" in gift_name_lower:
-            gift.gift_card_provider = "steam"
-        elif "disney" in gift_name_lower:
-            gift.gift_card_provider = "disney_plus"
-        elif "sephora" in gift_name_lower:
-            gift.gift_card_provider = "sephora"
-        elif "nike" in gift_name_lower:
-            gift.gift_card_provider = "nike"
-        elif "uber" in gift_name_lower and "eats" not in gift_name_lower:
-            gift.gift_card_provider = "uber"
-        elif "doordash" in gift_name_lower:
-            gift.gift_card_provider = "doordash"
-        elif "masterclass" in gift_name_lower:
-            gift.gift_card_provider = "masterclass"
+        gift.gift_card_provider = catalog_item.provider_key
     
     db.add(gift)
-    db.commit()
-    db.refresh(gift)
+    GiftStatsService.record_sent(db, sender_id)
+    db.flush()
+    gift_id = gift.id
+    
+    # Payment initialization is recorded in the same transaction and made after it commits
+    outbox_entry = None
+    if is_flutterwave:
+        # Get redirect URL (frontend will handle payment completion)
+        frontend_url = os.getenv("NEXT_PUBLIC_FRONTEND_URL", "http://localhost:3000")
+        payment_args = {
+            "amount": str(converted_price),  # Use converted price
+            "currency": user_currency,  # Use user's currency
+            "email": sender.email,
+            "tx_ref": tx_ref,
+            "customer_name": sender.first_name,
+            "redirect_url": f"{frontend_url}/gifts/payment/callback?gift_id={gift_id}",
+            "meta_data": {
+                "gift_id": gift_id,
+                "sender_id": sender_id,
+                "recipient_id": gift_request.recipient_id,
+                "base_price": str(base_price),  # Store base price for reference
+                "base_currency": CurrencyService.BASE_CURRENCY
+            }
+        }
+        outbox_entry = PaymentOutboxService.add(db, gift_id, FLUTTERWAVE_INITIALIZE, payment_args)
     
-    # Update tx_ref with actual gift ID
-    tx_ref = FlutterwaveService.generate_tx_ref(gift.id)
-    gift.payment_intent_id = tx_ref
     db.commit()
     
-    # Initialize payment if Flutterwave is selected
+    # No transaction is open while Flutterwave responds
     payment_data = None
-    if gift_request.payment_provider == PaymentProviderEnum.FLUTTERWAVE:
-        if not settings.FLUTTERWAVE_SECRET_KEY:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Flutterwave is not configured"
-            )
-        
-        # Get redirect URL (frontend will handle payment completion)
-        api_url = os.getenv("API_URL", os.getenv("NEXT_PUBLIC_API_URL", "http://localhost:8000"))
-        frontend_url = os.getenv("NEXT_PUBLIC_FRONTEND_URL", "http://localhost:3000")
-        redirect_url = f"{frontend_url}/gifts/payment/callback?gift_id={gift.id}"
-        
+    if outbox_entry is not None:
         try:
-            payment_response = await FlutterwaveService.initialize_payment(
-                amount=converted_price,  # Use converted price
-                currency=user_currency,  # Use user's currency
-                email=sender.email,
-                tx_ref=tx_ref,
-                customer_name=sender.first_name,
-                redirect_url=redirect_url,
-                meta_data={
-                    "gift_id": gift.id,
-                    "sender_id": sender_id,
-                    "recipient_id": gift_request.recipient_id,
-                    "base_price": str(base_price),  # Store base price for reference
-                    "base_currency": CurrencyService.BASE_CURRENCY
-                }
-            )
-            
+            payment_response = await PaymentOutboxService.dispatch(db, outbox_entry)
             payment_data = {
                 "payment_url": payment_response.get("data", {}).get("link"),
                 "tx_ref": tx_ref
             }
-        except Exception as e:
-            # If payment initialization fails, still return gift but mark as failed
-            gift.payment_status = "failed"
-            db.commit()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to initialize payment: {str(e)}"
-            )
+        except Exception:
+            # The outbox relay retries the call; the link is then served by /payments/verify
+            logger.warning(f"Payment initialization for gift {gift_id} deferred", exc_info=True)
+            return {
+                "gift_id": gift_id,
+                "status": "pending",
+                "message": "Gift created. The payment link is still being prepared.",
+                "payment_data": None
+            }
     
     return {
-        "gift_id": gift.id,
+        "gift_id": gift_id,
         "status": "pending",
         "message": "Gift created. Complete payment to deliver.",
         "payment_data": payment_data
@@ -272,6 +219,7 @@ async def activate_gift_after_payment(
         # PLACEHOLDER: In production, payment webhook sets this to "completed"
         # For now, we'll update it here to simulate successful payment
         gift.payment_status = "completed"
+        GiftStatsService.record_received(db, [gift.recipient_id])
         db.commit()
     
     # Only activate if payment is completed
@@ -289,19 +237,9 @@ async def activate_gift_after_payment(
             "gift_id": gift.id
         }
     
-    # Activate the gift based on type
-    if gift.gift_type == GiftTypeEnum.GIFT_CARD:
-        # For gift cards, we need to call the gift card service
-        # TODO: Implement gift card API integration
-        return {
-            "success": False,
-            "message": "Gift card activation requires API integration",
-            "gift_id": gift.id
-        }
-    else:
-        # For digital gifts (our own), activate immediately
-        result = await DigitalGiftService.activate_gift(gift, db)
-        return result
+    # Activate the gift based on type (gift cards are queued for fulfillment)
+    result = await DigitalGiftService.activate_gift(gift, db)
+    return result
 
 
 @router.get("/active/{user_id}")
@@ -319,16 +257,80 @@ async def get_active_gifts(
     return active_gifts
 
 
+def _decode_gift_cursor(cursor: str):
+    """Parse a next_cursor value ("<created_at ISO>_<id>") into (created_at, id)"""
+    try:
+        created_at, gift_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(gift_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _paginate_gifts(query, cursor: Optional[str], limit: int):
+    """
+    Keyset pagination over (created_at, id), newest first.
+    
+    Returns:
+        (rows, next_cursor)
+    """
+    if cursor:
+        created_at, gift_id = _decode_gift_cursor(cursor)
+        query = query.filter(or_(
+            Gift.created_at < created_at,
+            and_(Gift.created_at == created_at, Gift.id < gift_id)
+        ))
+    
+    rows = query.order_by(Gift.created_at.desc(), Gift.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1].created_at.isoformat()}_{rows[-1].id}"
+    return rows, next_cursor
+
+
 @router.get("/received")
-async def get_received_gifts(user_id: int, db: Session = Depends(get_db)):
-    """Get gifts received by user"""
+async def get_received_gifts(
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get gifts received by user, newest first
+    
+    Args:
+        user_id: Recipient user ID
+        limit: Page size (default: 20, max: 100)
+        cursor: next_cursor from the previous page
+    """
+    limit = max(1, min(limit, MAX_GIFT_PAGE_SIZE))
     
-    gifts = db.query(Gift).filter(
+    # Served by ix_gifts_recipient_id_payment_status_created_at
+    query = db.query(
+        Gift.id,
+        Gift.gift_name,
+        Gift.gift_type,
+        Gift.sender_id,
+        Gift.message,
+        Gift.delivered_at,
+        Gift.amount,
+        Gift.created_at
+    ).filter(
         Gift.recipient_id == user_id,
         Gift.payment_status == "completed"
-    ).order_by(Gift.created_at.desc()).all()
+    )
+    gifts, next_cursor = _paginate_gifts(query, cursor, limit)
+    
+    total_count = db.query(User.gifts_received_count).filter(User.id == user_id).scalar()
     
     return {
+        "total_count": total_count or 0,
+        "returned_count": len(gifts),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "gifts": [
             {
                 "id": gift.id,
@@ -345,14 +347,43 @@ async def get_received_gifts(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/sent")
-async def get_sent_gifts(user_id: int, db: Session = Depends(get_db)):
-    """Get gifts sent by user"""
+async def get_sent_gifts(
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get gifts sent by user, newest first
+    
+    Args:
+        user_id: Sender user ID
+        limit: Page size (default: 20, max: 100)
+        cursor: next_cursor from the previous page
+    """
+    limit = max(1, min(limit, MAX_GIFT_PAGE_SIZE))
     
-    gifts = db.query(Gift).filter(
+    # Served by ix_gifts_sender_id_created_at
+    query = db.query(
+        Gift.id,
+        Gift.gift_name,
+        Gift.gift_type,
+        Gift.recipient_id,
+        Gift.payment_status,
+        Gift.amount,
+        Gift.created_at
+    ).filter(
         Gift.sender_id == user_id
-    ).order_by(Gift.created_at.desc()).all()
+    )
+    gifts, next_cursor = _paginate_gifts(query, cursor, limit)
+    
+    total_count = db.query(User.gifts_sent_count).filter(User.id == user_id).scalar()
     
     return {
+        "total_count": total_count or 0,
+        "returned_count": len(gifts),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "gifts": [
             {
                 "id": gift.id,
@@ -4,12 +4,14 @@ Payment webhook handlers
 from fastapi import APIRouter, Request, HTTPException, status, Header, Depends
 from sqlalchemy.orm import Session
 from typing import Optional
-import json
 
 from app.core.database import get_db
-from app.models import Gift
+from app.core.auth import get_current_user
+from app.models import Gift, User
 from app.services.flutterwave_service import FlutterwaveService
-from app.services.digital_gift_service import DigitalGiftService
+from app.services.payment_webhook_service import PaymentWebhookService, InvalidWebhookPayload, webhook_worker
+from app.services.payment_reconciliation_service import PaymentReconciliationService
+from app.services.payment_outbox_service import PaymentOutboxService
 
 router = APIRouter()
 
@@ -21,107 +23,71 @@ async def flutterwave_webhook(
 ):
     """
     Handle Flutterwave webhook events
+    
+    The event is stored in the webhook inbox and acknowledged right away;
+    verification and gift activation happen in the background worker.
+    Redeliveries of an already stored transaction are acknowledged and ignored.
     """
+    # Get raw body for signature verification
+    body = await request.body()
     try:
-        # Get raw body for signature verification
-        body = await request.body()
         body_str = body.decode('utf-8')
-        
-        # Get signature from header
-        signature = request.headers.get("verif-hash", "")
-        
-        # Verify webhook signature
-        if not FlutterwaveService.verify_webhook_signature(body_str, signature):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid webhook signature"
-            )
-        
-        # Parse webhook data
-        webhook_data = await request.json()
-        event_type = webhook_data.get("event")
-        data = webhook_data.get("data", {})
-        
-        # Handle charge.completed event
-        if event_type == "charge.completed":
-            tx_ref = data.get("tx_ref")
-            transaction_id = data.get("id")
-            status = data.get("status")
-            
-            if status == "successful":
-                # Find gift by transaction reference
-                gift = db.query(Gift).filter(
-                    Gift.payment_intent_id == tx_ref
-                ).first()
-                
-                if gift:
-                    # Verify payment with Flutterwave
-                    verification = await FlutterwaveService.verify_payment(str(transaction_id))
-                    
-                    if verification.get("status") == "success":
-                        verified_data = verification.get("data", {})
-                        
-                        # Update gift payment status
-                        gift.payment_status = "completed"
-                        gift.payment_intent_id = f"{tx_ref}|{transaction_id}"  # Store both refs
-                        db.commit()
-                        
-                        # Activate the gift
-                        if not gift.is_delivered:
-                            await DigitalGiftService.activate_gift(gift, db)
-                        
-                        return {"status": "success", "message": "Payment verified and gift activated"}
-            
-            elif status == "failed":
-                # Find and mark gift as failed
-                gift = db.query(Gift).filter(
-                    Gift.payment_intent_id == tx_ref
-                ).first()
-                
-                if gift:
-                    gift.payment_status = "failed"
-                    db.commit()
-        
-        return {"status": "received"}
-        
-    except Exception as e:
-        # Log error but return 200 to prevent Flutterwave from retrying
-        print(f"Webhook error: {str(e)}")
-        return {"status": "error", "message": str(e)}
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+    
+    # Get signature from header
+    signature = request.headers.get("verif-hash", "")
+    
+    # Verify webhook signature
+    if not FlutterwaveService.verify_webhook_signature(body_str, signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+    
+    try:
+        event_id = PaymentWebhookService.record_event(db, body)
+    except InvalidWebhookPayload:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+    
+    if event_id is None:
+        return {"status": "duplicate"}
+    
+    webhook_worker.notify()
+    return {"status": "received"}
 
 
 @router.get("/verify/{gift_id}")
 async def verify_payment_status(
     gift_id: int,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Verify payment status for a gift
+    Verify payment status for a gift - requires authentication
+    
+    A cached read: pending payments are settled by the webhook worker and,
+    if the webhook never arrives, by the payment_reconciliation job.
+    While the payment is pending, the sender also gets the payment link
+    (checkout may have returned without one while the outbox retried the call).
     """
-    gift = db.query(Gift).filter(Gift.id == gift_id).first()
+    payment_status = PaymentReconciliationService.get_status(db, gift_id)
     
-    if not gift:
+    if not payment_status:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Gift not found"
         )
     
-    # If payment is completed, verify with Flutterwave
-    if gift.payment_provider.value == "flutterwave" and gift.payment_status == "pending":
-        if gift.payment_intent_id:
-            # Extract transaction ID if available
-            tx_ref = gift.payment_intent_id.split("|")[0] if "|" in gift.payment_intent_id else gift.payment_intent_id
-            
-            try:
-                # Try to verify payment (this would need transaction ID, which we get from webhook)
-                # For now, just return current status
-                pass
-            except Exception as e:
-                print(f"Payment verification error: {str(e)}")
+    if payment_status["payment_status"] == "pending":
+        payment_url = PaymentOutboxService.payment_link(db, gift_id, current_user.id)
+        if payment_url:
+            payment_status = {**payment_status, "payment_url": payment_url}
     
-    return {
-        "gift_id": gift.id,
-        "payment_status": gift.payment_status,
-        "is_delivered": gift.is_delivered
-    }
-
+    return payment_status
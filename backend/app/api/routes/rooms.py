@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, update
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel, field_validator
 from typing import Optional
 import secrets
 
-from app.core.database import get_db
+from app.core.database import get_db, insert_or_ignore, upsert
 from app.core.auth import get_current_user, get_optional_user
 from app.core.security import limiter, sanitize_input
 from app.models import Room, RoomParticipant, Message, User, RoomTypeEnum, BirthdayWall, WallPhoto, WallThemeEnum, PhotoReaction, BackgroundAnimationEnum, WallInvitation, WallUpload
+from app.services.birthday_window_service import BirthdayWindowService
 
 router = APIRouter()
 
@@ -89,21 +91,20 @@ async def create_personal_birthday_room(
             detail="User not found"
         )
     
-    # Check if it's user's birthday
-    today = date.today()
-    is_birthday = (today.month == user.birth_month and today.day == user.birth_day)
+    # Check if it's user's birthday in their own timezone
+    window = BirthdayWindowService.get_current_window(db, user)
     
-    if not is_birthday:
+    if not window.is_open():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Personal room only available on your birthday"
         )
     
-    # Check if room already exists for today
+    # Check if room already exists for this birthday
     existing_room = db.query(Room).filter(
         Room.room_type == RoomTypeEnum.PERSONAL,
         Room.owner_id == user.id,
-        Room.opens_at >= datetime.combine(today, datetime.min.time())
+        Room.opens_at >= window.opens_at_utc
     ).first()
     
     if existing_room:
@@ -117,13 +118,13 @@ async def create_personal_birthday_room(
     room_name = sanitize_input(room_data.name, max_length=100) if room_data.name else None
     
     # Create room
-    opens_at = datetime.combine(today, datetime.min.time())
-    closes_at = datetime.combine(today, datetime.max.time())
+    opens_at = window.opens_at_utc
+    closes_at = window.closes_at_utc
     invite_code = secrets.token_urlsafe(16)
     
     room = Room(
         room_type=RoomTypeEnum.PERSONAL,
-        room_identifier=f"personal_{user.id}_{today.isoformat()}",
+        room_identifier=f"personal_{user.id}_{window.birthday_date.isoformat()}",
         name=request.name or f"{user.first_name}'s Birthday Celebration",
         opens_at=opens_at,
         closes_at=closes_at,
@@ -162,57 +163,87 @@ async def join_room_with_invite(
 ):
     """Join a personal birthday room using invite code"""
     
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
+    # Room, existing membership and both users' tribes in one query
+    joiner = aliased(User)
+    owner = aliased(User)
+    result = db.query(
+        Room.invite_code,
+        Room.is_active,
+        RoomParticipant.id,
+        joiner.tribe_id,
+        owner.tribe_id
+    ).outerjoin(
+        RoomParticipant,
+        and_(
+            RoomParticipant.room_id == Room.id,
+            RoomParticipant.user_id == user_id
+        )
+    ).outerjoin(
+        owner, owner.id == Room.owner_id
+    ).outerjoin(
+        joiner, joiner.id == user_id
+    ).filter(
+        Room.id == room_id
+    ).first()
+    
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Room not found"
         )
     
-    if room.invite_code != invite_code:
+    room_invite_code, room_is_active, participant_id, joiner_tribe_id, owner_tribe_id = result
+    
+    if room_invite_code != invite_code:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid invite code"
         )
     
-    if not room.is_active:
+    if not room_is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Room is not active"
         )
     
     # Check if already participant
-    existing = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id,
-        RoomParticipant.user_id == user_id
-    ).first()
-    
-    if existing:
+    if participant_id:
         return {"message": "Already a member"}
     
-    # Check guest limit
-    guest_count = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id
-    ).count()
+    # Claim a guest slot; the conditional update cannot overshoot max_guests
+    admitted = db.execute(
+        update(Room).where(
+            Room.id == room_id,
+            Room.guest_count < Room.max_guests
+        ).values(
+            guest_count=Room.guest_count + 1
+        ).returning(Room.id)
+    ).first()
     
-    if guest_count >= room.max_guests:
+    if not admitted:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Room is full"
         )
     
-    # Get user info
-    user = db.query(User).filter(User.id == user_id).first()
-    is_birthday_mate = user and (user.tribe_id == db.query(User).filter(User.id == room.owner_id).first().tribe_id)
+    is_birthday_mate = joiner_tribe_id is not None and joiner_tribe_id == owner_tribe_id
+    
+    # Add as participant (a concurrent duplicate join gives its slot back)
+    now = datetime.utcnow()
+    participant_id = insert_or_ignore(db, RoomParticipant, {
+        "room_id": room_id,
+        "user_id": user_id,
+        "is_guest": not is_birthday_mate,
+        "is_birthday_mate": is_birthday_mate,
+        "joined_at": now,
+        "last_seen": now
+    }, ["room_id", "user_id"])
+    
+    if not participant_id:
+        db.rollback()
+        return {"message": "Already a member"}
     
-    # Add as participant
-    participant = RoomParticipant(
-        room_id=room_id,
-        user_id=user_id,
-        is_guest=not is_birthday_mate,
-        is_birthday_mate=is_birthday_mate
-    )
-    db.add(participant)
     db.commit()
     
     return {"message": "Joined successfully", "is_birthday_mate": is_birthday_mate}
@@ -235,7 +266,6 @@ async def create_birthday_wall(
         )
     
     # Check if wall already exists for this birthday cycle
-    today = date.today()
     existing_wall = db.query(BirthdayWall).filter(
         BirthdayWall.owner_id == user_id,
         BirthdayWall.closes_at > datetime.utcnow()
@@ -248,13 +278,11 @@ async def create_birthday_wall(
             "message": "Wall already exists"
         }
     
-    # Calculate lifecycle dates
-    birthday_this_year = date(today.year, user.birth_month, user.birth_day)
-    if birthday_this_year < today:
-        birthday_this_year = date(today.year + 1, user.birth_month, user.birth_day)
+    # Calculate lifecycle dates around the current or next local birthday
+    window = BirthdayWindowService.get_current_window(db, user)
     
-    opens_at = datetime.combine(birthday_this_year - timedelta(days=1), datetime.min.time())
-    closes_at = datetime.combine(birthday_this_year + timedelta(days=2), datetime.max.time())
+    opens_at = window.opens_at_utc - timedelta(days=1)
+    closes_at = window.closes_at_utc + timedelta(days=2)
     
     # ENFORCE: Wall can only be created within 24 hours before birthday
     now = datetime.utcnow()
@@ -288,7 +316,7 @@ async def create_birthday_wall(
         animation_intensity=request.animation_intensity or "medium",
         opens_at=opens_at,
         closes_at=closes_at,
-        birthday_year=birthday_this_year.year,  # Store year for archive
+        birthday_year=window.year,  # Store year for archive
         is_active=True,
         public_url_code=public_url_code
     )
@@ -382,8 +410,9 @@ async def get_user_birthday_wall(
     
     # Check if wall is open
     now = datetime.utcnow()
-    is_open = wall.opens_at <= now <= wall.closes_at
-    is_archived = now > wall.closes_at
+    # Archived state is stored by the lifecycle sweep
+    is_archived = not wall.is_active
+    is_open = not is_archived and wall.opens_at <= now
     
     return {
         "wall_id": wall.id,
@@ -430,8 +459,9 @@ async def get_birthday_wall(
     
     # Check if wall is open (for uploads/reactions)
     now = datetime.utcnow()
-    is_open = wall.opens_at <= now <= wall.closes_at
-    is_archived = now > wall.closes_at
+    # Archived state is stored by the lifecycle sweep
+    is_archived = not wall.is_active
+    is_open = not is_archived and wall.opens_at <= now
     
     # ENFORCEMENT: If wall is archived, only the owner can access it
     if is_archived:
@@ -639,19 +669,29 @@ async def upload_photo_to_wall(
             detail="You don't have permission to upload to this wall. You need to be invited by the celebrant."
         )
     
-    # EME Phase 1: Check upload limit (1 upload per person) - Owner can upload unlimited times
+    # EME Phase 1: Track upload to enforce limit (1 upload per person) - Owner can upload unlimited times
+    # The unique (wall_id, uploader_user_id) row is claimed first; it rolls back with any later rejection
+    wall_upload = {
+        "wall_id": wall_id,
+        "uploader_user_id": user_id,
+        "uploader_email": user.email if user else None,
+        "uploader_name": user.first_name if user else "Guest",
+        "upload_type": "photo",
+        "upload_count": 1,
+        "last_upload_at": now,
+        "created_at": now
+    }
     if wall.owner_id != user_id:
-        existing_upload = db.query(WallUpload).filter(
-            WallUpload.wall_id == wall_id,
-            WallUpload.uploader_user_id == user_id,
-            WallUpload.upload_type == "photo"
-        ).first()
-        
-        if existing_upload:
+        if not insert_or_ignore(db, WallUpload, wall_upload, ["wall_id", "uploader_user_id"]):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You have already uploaded to this wall. Each person can only upload once."
             )
+    else:
+        upsert(db, WallUpload, wall_upload, ["wall_id", "uploader_user_id"], {
+            "upload_count": WallUpload.__table__.c.upload_count + 1,
+            "last_upload_at": now
+        })
     
     # Check photo limit
     photo_count = db.query(WallPhoto).filter(WallPhoto.wall_id == wall_id).count()
@@ -661,8 +701,6 @@ async def upload_photo_to_wall(
             detail="Photo limit reached"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
-    
     # Validate frame style
     valid_frames = ["none", "classic", "elegant", "vintage", "modern", "gold", "rainbow", "polaroid"]
     frame_style = request.frame_style or "none"
@@ -680,19 +718,6 @@ async def upload_photo_to_wall(
         is_approved=True  # Auto-approve photos uploaded by the wall owner
     )
     db.add(photo)
-    
-    # EME Phase 1: Track upload to enforce limit
-    wall_upload = WallUpload(
-        wall_id=wall_id,
-        uploader_user_id=user_id,
-        uploader_email=user.email if user else None,
-        uploader_name=user.first_name if user else "Guest",
-        upload_type="photo",
-        upload_count=1,
-        last_upload_at=datetime.utcnow()
-    )
-    db.add(wall_upload)
-    
     db.commit()
     db.refresh(photo)
     
@@ -732,43 +757,40 @@ async def add_photo_reaction(
             detail="Photo not found"
         )
     
-    # Check if user already reacted with this emoji
-    existing_reaction = db.query(PhotoReaction).filter(
+    # If user already reacted with this emoji, remove it (toggle off)
+    removed = db.query(PhotoReaction).filter(
         PhotoReaction.photo_id == photo_id,
         PhotoReaction.user_id == user_id,
         PhotoReaction.emoji == request.emoji
-    ).first()
+    ).delete(synchronize_session=False)
     
-    if existing_reaction:
-        # Remove reaction (toggle off)
-        db.delete(existing_reaction)
+    if removed:
         db.commit()
         return {
             "message": "Reaction removed",
             "action": "removed"
         }
-    else:
-        # Remove any other reaction from this user on this photo (one reaction per user)
-        db.query(PhotoReaction).filter(
-            PhotoReaction.photo_id == photo_id,
-            PhotoReaction.user_id == user_id
-        ).delete()
-        
-        # Add new reaction
-        reaction = PhotoReaction(
-            photo_id=photo_id,
-            user_id=user_id,
-            emoji=request.emoji
-        )
-        db.add(reaction)
-        db.commit()
-        db.refresh(reaction)
-        
-        return {
-            "message": "Reaction added",
-            "action": "added",
-            "reaction_id": reaction.id
-        }
+    
+    # Remove any other reaction from this user on this photo (one reaction per user)
+    db.query(PhotoReaction).filter(
+        PhotoReaction.photo_id == photo_id,
+        PhotoReaction.user_id == user_id
+    ).delete(synchronize_session=False)
+    
+    # Add new reaction (a concurrent identical request is ignored)
+    reaction_id = insert_or_ignore(db, PhotoReaction, {
+        "photo_id": photo_id,
+        "user_id": user_id,
+        "emoji": request.emoji,
+        "created_at": datetime.utcnow()
+    }, ["photo_id", "user_id", "emoji"])
+    db.commit()
+    
+    return {
+        "message": "Reaction added",
+        "action": "added",
+        "reaction_id": reaction_id
+    }
 
 
 @router.delete("/birthday-wall/{wall_id}/photos/{photo_id}")
@@ -1067,8 +1089,9 @@ async def get_user_wall_archive(
         
         # Check status
         now = datetime.utcnow()
-        is_open = wall.opens_at <= now <= wall.closes_at
-        is_archived = now > wall.closes_at
+        # Archived state is stored by the lifecycle sweep
+        is_archived = not wall.is_active
+        is_open = not is_archived and wall.opens_at <= now
         
         archive_by_year[year].append({
             "wall_id": wall.id,
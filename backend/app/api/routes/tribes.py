@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import and_
 from datetime import datetime, date, timedelta
 from typing import List
 from pydantic import BaseModel, field_validator
@@ -8,6 +9,12 @@ from app.core.database import get_db
 from app.core.auth import get_current_user
 from app.core.security import limiter, sanitize_input
 from app.models import User, Room, RoomParticipant, Message, RoomTypeEnum
+from app.services.tribe_stats_service import TribeStatsService
+from app.services.tribe_room_service import TribeRoomService
+from app.services.birthday_window_service import BirthdayWindowService
+from app.services.message_queue import message_queue
+from app.services.presence_service import PresenceService
+from app.utils.timezones import observed_birthday, global_day_window
 
 router = APIRouter()
 
@@ -24,28 +31,24 @@ class TribeInfo(BaseModel):
 async def get_tribe_info(tribe_id: str, db: Session = Depends(get_db)):
     """Get information about a birthday tribe"""
     
-    # Get member count
-    member_count = db.query(User).filter(User.tribe_id == tribe_id).count()
+    # Get member count and breakdown (precomputed)
+    member_count = TribeStatsService.get_member_count(db, tribe_id)
+    breakdown = TribeStatsService.get_breakdown(db, tribe_id)
     
-    # Check if tribe is active (it's their birthday)
-    today = date.today()
+    # Tribe is active while its birthday is the local date anywhere
+    now = datetime.utcnow()
     month, day = map(int, tribe_id.split("-"))
-    is_birthday = (today.month == month and today.day == day)
-    
-    # Calculate opens/closes times
-    if is_birthday:
-        opens_at = datetime.combine(today, datetime.min.time())
-        closes_at = datetime.combine(today, datetime.max.time())
-    else:
-        next_birthday = date(today.year, month, day)
-        if next_birthday < today:
-            next_birthday = date(today.year + 1, month, day)
-        opens_at = datetime.combine(next_birthday, datetime.min.time())
-        closes_at = datetime.combine(next_birthday, datetime.max.time())
+    for year in (now.year - 1, now.year, now.year + 1):
+        opens_at, closes_at = global_day_window(observed_birthday(month, day, year))
+        if closes_at > now:
+            break
+    is_birthday = opens_at <= now
     
     return {
         "tribe_id": tribe_id,
         "member_count": member_count,
+        "gender_breakdown": breakdown["by_gender"],
+        "country_breakdown": breakdown["by_country"],
         "is_active": is_birthday,
         "opens_at": opens_at,
         "closes_at": closes_at,
@@ -61,7 +64,7 @@ async def get_tribe_room(
     db: Session = Depends(get_db)
 ):
     """
-    Get or create the birthday tribe room.
+    Get the birthday tribe room and join it.
     Only accessible on the birthday day.
     Requires authentication.
     """
@@ -74,55 +77,22 @@ async def get_tribe_room(
             detail="You don't belong to this tribe"
         )
     
-    # Check if it's the birthday
-    today = date.today()
-    month, day = map(int, tribe_id.split("-"))
-    is_birthday = (today.month == month and today.day == day)
+    # Check if it's the birthday in the user's own timezone
+    window = BirthdayWindowService.get_current_window(db, user)
     
-    if not is_birthday:
+    if not window.is_open():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Tribe room only opens on your birthday"
         )
     
-    # Find or create tribe room for today
-    room = db.query(Room).filter(
-        Room.room_type == RoomTypeEnum.TRIBE,
-        Room.room_identifier == tribe_id,
-        Room.opens_at >= datetime.combine(today, datetime.min.time())
-    ).first()
-    
+    # Rooms are pre-provisioned by the scheduler; this is normally a pure read
+    room = TribeRoomService.get_room_for_member(db, tribe_id, window.birthday_date, user.id)
     if not room:
-        # Create room
-        opens_at = datetime.combine(today, datetime.min.time())
-        closes_at = datetime.combine(today, datetime.max.time())
-        
-        room = Room(
-            room_type=RoomTypeEnum.TRIBE,
-            room_identifier=tribe_id,
-            name=f"Birthday Tribe {tribe_id}",
-            opens_at=opens_at,
-            closes_at=closes_at,
-            is_active=True,
-        )
-        db.add(room)
-        db.commit()
-        db.refresh(room)
-    
-    # Add user as participant if not already
-    participant = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room.id,
-        RoomParticipant.user_id == user.id
-    ).first()
-    
-    if not participant:
-        participant = RoomParticipant(
-            room_id=room.id,
-            user_id=user.id,
-            is_birthday_mate=True
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tribe room is not available yet"
         )
-        db.add(participant)
-        db.commit()
     
     return {
         "room_id": room.id,
@@ -155,33 +125,54 @@ async def send_tribe_message(
 ):
     """Send a message in the tribe room (text only) - requires authentication"""
     
-    # Verify room exists and is active
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
+    # Verify room exists and is active, and user is participant (one query)
+    result = db.query(
+        Room.is_active,
+        Room.is_read_only,
+        RoomParticipant.id
+    ).outerjoin(
+        RoomParticipant,
+        and_(
+            RoomParticipant.room_id == Room.id,
+            RoomParticipant.user_id == current_user.id
+        )
+    ).filter(
+        Room.id == room_id
+    ).first()
+    
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Room not found"
         )
     
-    if not room.is_active or room.is_read_only:
+    is_active, is_read_only, participant_id = result
+    if not is_active or is_read_only:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Room is not active"
         )
     
-    # Verify user is participant
-    participant = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id,
-        RoomParticipant.user_id == current_user.id
-    ).first()
-    
-    if not participant:
+    if not participant_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this room"
         )
     
-    # Create message
+    # Sending a message also counts as a presence heartbeat
+    PresenceService.touch(room_id, current_user.id)
+    
+    # Create message through the group-commit queue when it's running
+    if message_queue.running:
+        # Release the connection while the batch is written
+        db.close()
+        new_message = await message_queue.submit(room_id, current_user.id, message_data.message)
+        return {
+            "message_id": new_message["id"],
+            "content": message_data.message,
+            "created_at": new_message["created_at"]
+        }
+    
     new_message = Message(
         room_id=room_id,
         user_id=current_user.id,
@@ -198,6 +189,69 @@ async def send_tribe_message(
     }
 
 
+@router.post("/{tribe_id}/room/{room_id}/heartbeat")
+@limiter.limit("10/minute")
+async def tribe_room_heartbeat(
+    request: Request,
+    tribe_id: str,
+    room_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark the user as present in the tribe room - requires authentication"""
+    
+    if not PresenceService.heartbeat(db, room_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this room"
+        )
+    
+    return {"online_count": PresenceService.get_online_count(room_id)}
+
+
+@router.get("/{tribe_id}/room/{room_id}/online")
+@limiter.limit("30/minute")
+async def get_tribe_room_online(
+    request: Request,
+    tribe_id: str,
+    room_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get who is currently in the tribe room - requires authentication"""
+    
+    if not PresenceService.is_member(db, room_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this room"
+        )
+    
+    online_ids = PresenceService.get_online_user_ids(room_id)
+    shown_ids = online_ids[:limit]
+    users = {
+        u.id: u
+        for u in db.query(
+            User.id,
+            User.first_name,
+            User.profile_picture_url
+        ).filter(User.id.in_(shown_ids)).all()
+    } if shown_ids else {}
+    
+    return {
+        "online_count": len(online_ids),
+        "online": [
+            {
+                "user_id": user_id,
+                "first_name": users[user_id].first_name,
+                "profile_picture_url": users[user_id].profile_picture_url
+            }
+            for user_id in shown_ids
+            if user_id in users
+        ]
+    }
+
+
 @router.get("/{tribe_id}/room/{room_id}/messages")
 @limiter.limit("100/minute")  # Rate limit message fetching
 async def get_tribe_messages(
@@ -210,21 +264,27 @@ async def get_tribe_messages(
 ):
     """Get messages from tribe room - requires authentication"""
     
-    # Verify user is participant
-    participant = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id,
-        RoomParticipant.user_id == current_user.id
-    ).first()
+    # Verify user is participant (and get the room's opening time)
+    room_opens_at = db.query(Room.opens_at).join(
+        RoomParticipant,
+        and_(
+            RoomParticipant.room_id == Room.id,
+            RoomParticipant.user_id == current_user.id
+        )
+    ).filter(
+        Room.id == room_id
+    ).scalar()
     
-    if not participant:
+    if room_opens_at is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not a member of this room"
         )
     
-    # Get messages
+    # Get messages (bounded by the room's opening so only its partitions are scanned)
     messages = db.query(Message).filter(
         Message.room_id == room_id,
+        Message.created_at >= room_opens_at,
         Message.is_deleted == False
     ).order_by(Message.created_at.desc()).limit(limit).all()
     
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, field_validator
 from datetime import datetime, date
 from typing import Optional
+import random
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, get_optional_user
 from app.core.security import limiter, sanitize_input
 from app.models import User, ContactSubmission
+from app.services.tribe_stats_service import TribeStatsService
+from app.services.celebrant_service import CelebrantService
 
 router = APIRouter()
 
@@ -119,6 +123,9 @@ async def update_user_profile(
     db.commit()
     db.refresh(user)
     
+    # Visibility, name and city all feed the cached state celebrant lists
+    CelebrantService.invalidate(user.country, user.state)
+    
     return {"message": "Profile updated successfully"}
 
 
@@ -159,17 +166,103 @@ async def update_profile_picture(
     db.commit()
     db.refresh(user)
     
+    CelebrantService.invalidate(user.country, user.state)
+    
     return {
         "message": "Profile picture updated successfully",
         "profile_picture_url": user.profile_picture_url
     }
 
 
+@router.post("/{user_id}/deactivate")
+@limiter.limit("5/minute")  # Rate limit account deactivation
+async def deactivate_user_account(
+    request: Request,
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Deactivate a user account - requires authentication and ownership (or admin)"""
+    if current_user.id != user_id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only deactivate your own account"
+        )
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    # Conditional UPDATE: of concurrent requests only one flips is_active,
+    # and only that one decrements the tribe counts
+    deactivated = db.execute(
+        update(User).where(
+            User.id == user_id,
+            User.is_active == True
+        ).values(is_active=False, updated_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    ).rowcount
+    if deactivated != 1:
+        db.rollback()
+        return {"message": "Account already deactivated"}
+    
+    # Keep precomputed tribe counts in the same transaction as the deactivation
+    TribeStatsService.record_member_change(db, user.tribe_id, user.country, user.gender, -1)
+    
+    db.commit()
+    
+    CelebrantService.invalidate(user.country, user.state)
+    
+    return {"message": "Account deactivated successfully"}
+
+
+# Only the columns the member listing returns; skips full ORM entity loading
+TRIBE_MEMBER_COLUMNS = (
+    User.id,
+    User.first_name,
+    User.profile_picture_url,
+    User.country,
+    User.state,
+    User.date_of_birth,
+)
+
+
+def _sample_tribe_members(db: Session, tribe_id: str, limit: int) -> list:
+    """
+    Pick random active members of a tribe without ORDER BY random().
+    
+    Every user carries a uniform random_key, indexed with tribe_id. We jump to
+    a random pivot and range-scan forward (wrapping around to the start of the
+    key space if needed), so the cost depends on `limit`, not tribe size.
+    """
+    pivot = random.random()
+    base_query = db.query(*TRIBE_MEMBER_COLUMNS).filter(
+        User.tribe_id == tribe_id,
+        User.is_active == True
+    )
+    
+    members = base_query.filter(
+        User.random_key >= pivot
+    ).order_by(User.random_key).limit(limit).all()
+    
+    if len(members) < limit:
+        members += base_query.filter(
+            User.random_key < pivot
+        ).order_by(User.random_key).limit(limit - len(members)).all()
+    
+    # Neighbouring keys are stable, so shuffle to vary display order
+    random.shuffle(members)
+    return members
+
+
 @router.get("/tribe/{tribe_id}/members")
 async def get_tribe_members(
     tribe_id: str,
     limit: int = 30,
     random_sample: bool = False,
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -179,33 +272,38 @@ async def get_tribe_members(
         tribe_id: The tribe ID (format: MM-DD)
         limit: Maximum number of members to return (default: 30, max: 100)
         random_sample: If True, returns random members instead of sequential
+        after_id: Cursor from a previous page's next_cursor (sequential only)
     """
     # Cap the limit to prevent abuse
     limit = min(limit, 100)
     
-    # Get total count
-    total_count = db.query(User).filter(
-        User.tribe_id == tribe_id,
-        User.is_active == True
-    ).count()
+    # Get total count (precomputed, cached)
+    total_count = TribeStatsService.get_cached_member_count(db, tribe_id)
     
     # Get members
-    query = db.query(User).filter(
-        User.tribe_id == tribe_id,
-        User.is_active == True
-    )
-    
+    next_cursor = None
     if random_sample:
-        # Use ORDER BY RANDOM() for PostgreSQL (or RAND() for MySQL)
-        from sqlalchemy import func
-        query = query.order_by(func.random())
-    
-    members = query.limit(limit).all()
+        members = _sample_tribe_members(db, tribe_id, limit)
+    else:
+        # Keyset pagination over (tribe_id, id): constant cost per page
+        query = db.query(*TRIBE_MEMBER_COLUMNS).filter(
+            User.tribe_id == tribe_id,
+            User.is_active == True
+        )
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        
+        members = query.order_by(User.id).limit(limit + 1).all()
+        if len(members) > limit:
+            members = members[:limit]
+            next_cursor = members[-1].id
     
     return {
         "tribe_id": tribe_id,
         "total_count": total_count,
         "returned_count": len(members),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "members": [
             {
                 "id": m.id,
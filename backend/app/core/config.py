@@ -34,9 +34,20 @@ class Settings(BaseSettings):
     FLUTTERWAVE_ENCRYPTION_KEY: str = ""
     FLUTTERWAVE_WEBHOOK_HASH: str = ""
     
+    # Exchange rates (USD-based table; other bases are derived locally)
+    EXCHANGE_RATE_API_URL: str = "https://api.exchangerate-api.com/v4/latest/USD"
+    EXCHANGE_RATE_SNAPSHOT_PATH: str = "./cache/exchange_rates.json"
+    
+    # Gift cards (simulated provider issues fake codes for every brand; for development)
+    GIFT_CARD_SIMULATED_PROVIDER: bool = False
+    
     # AI (Google Gemini)
     GEMINI_API_KEY: str = ""
     
+    # Message archival (monthly partitions older than this are exported and dropped)
+    MESSAGE_RETENTION_DAYS: int = 90
+    MESSAGE_ARCHIVE_DIR: str = "./archive/messages"
+    
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields from .env that aren't defined
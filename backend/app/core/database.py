@@ -16,3 +16,45 @@ def get_db():
     finally:
         db.close()
 
+
+def dialect_insert(db, model):
+    """
+    Return an INSERT construct for the session's dialect.
+
+    PostgreSQL and SQLite inserts both support on_conflict_do_nothing /
+    on_conflict_do_update, which the generic insert() does not.
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+    return insert(model)
+
+
+def insert_or_ignore(db, model, values: dict, index_elements: list):
+    """
+    INSERT a row unless it conflicts on the given unique columns.
+
+    Replaces check-then-insert: one round trip, and safe under concurrency.
+
+    Returns:
+        The new row's primary key, or None if a conflicting row already existed
+    """
+    table = model.__table__
+    stmt = dialect_insert(db, table).values(**values).on_conflict_do_nothing(
+        index_elements=index_elements
+    ).returning(*table.primary_key.columns)
+    row = db.execute(stmt).first()
+    return row[0] if row else None
+
+
+def upsert(db, model, values: dict, index_elements: list, set_: dict) -> None:
+    """INSERT a row, or apply `set_` to the existing row conflicting on the given unique columns"""
+    stmt = dialect_insert(db, model.__table__).values(**values).on_conflict_do_update(
+        index_elements=index_elements,
+        set_=set_
+    )
+    db.execute(stmt)
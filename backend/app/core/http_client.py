@@ -0,0 +1,246 @@
+"""
+Shared outbound HTTP clients.
+
+Each integration registers a named client at import time (like scheduler
+jobs) with its own connection pool limits and timeouts. The clients are
+opened and closed from the application lifespan in main.py, so connections
+are kept alive and reused across requests instead of paying a TCP+TLS
+handshake per call.
+
+Requests are retried with jittered exponential backoff: idempotent methods
+on transport errors and 429/502/503/504 responses, other methods only when
+the connection could not be established (so the request was never sent).
+Latency and error counts are recorded per host for the admin metrics
+endpoint.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+# Errors raised before any byte of the request reached the server
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+LATENCY_SAMPLE_SIZE = 500
+
+
+@dataclass
+class ClientConfig:
+    name: str
+    base_url: str = ""
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    max_retries: int = 2
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+
+
+@dataclass
+class HostMetrics:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    status_codes: Dict[int, int] = field(default_factory=dict)
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLE_SIZE))
+
+    def record(self, seconds: float, status_code: Optional[int]) -> None:
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        if status_code is None or status_code >= 500:
+            self.errors += 1
+        if status_code is not None:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def snapshot(self) -> Dict:
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 1) if self.requests else None,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "status_codes": dict(self.status_codes)
+        }
+
+
+_configs: Dict[str, ClientConfig] = {}
+_clients: Dict[str, "ServiceClient"] = {}
+_metrics: Dict[str, HostMetrics] = {}
+# Closes of replaced clients still in flight (referenced so they are not garbage collected)
+_closing: Set[asyncio.Future] = set()
+
+
+def _host_metrics(url: httpx.URL) -> HostMetrics:
+    host = url.host
+    metrics = _metrics.get(host)
+    if metrics is None:
+        metrics = _metrics[host] = HostMetrics()
+    return metrics
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ServiceClient:
+    """Pooled httpx client for one integration, with retries and metrics"""
+
+    def __init__(self, config: ClientConfig):
+        self.config = config
+        # Pooled connections belong to the loop the client was opened on
+        self.loop = _running_loop()
+        self._client = httpx.AsyncClient(
+            base_url=config.base_url,
+            timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry
+            )
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures; raises like httpx does"""
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        request = self._client.build_request(method, url, **kwargs)
+        metrics = _host_metrics(request.url)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self._client.send(request)
+            except httpx.TransportError as e:
+                metrics.record(time.perf_counter() - started, None)
+                retryable = idempotent or isinstance(e, CONNECT_ERRORS)
+                if not retryable or attempt >= self.config.max_retries:
+                    raise
+            else:
+                metrics.record(time.perf_counter() - started, response.status_code)
+                if (
+                    not idempotent
+                    or response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.config.max_retries
+                ):
+                    return response
+                await response.aclose()
+
+            metrics.retries += 1
+            delay = self._backoff(attempt)
+            attempt += 1
+            logger.debug(f"Retrying {method} {request.url} in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def register_client(name: str, **options) -> None:
+    """
+    Register a named client configuration (see ClientConfig for options).
+
+    Re-registering replaces the configuration; an already open client keeps
+    its old settings until the clients are restarted.
+    """
+    _configs[name] = ClientConfig(name=name, **options)
+
+
+def get_client(name: str) -> ServiceClient:
+    """
+    Get the shared client for an integration.
+
+    Clients are normally opened by start_http_clients(); one is opened on
+    first use if that has not happened, or if the caller runs on a different
+    event loop (scripts, jobs run outside the app).
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed or client.loop is not _running_loop():
+        if client is not None:
+            _close_replaced(client)
+        client = _clients[name] = ServiceClient(_configs[name])
+    return client
+
+
+def _close_replaced(client: ServiceClient) -> None:
+    """Close a client replaced by get_client(), on its own loop while that loop still runs"""
+    if client.is_closed:
+        return
+    loop = client.loop
+    if loop is not None and loop.is_running():
+        closing = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    elif _running_loop() is not None:
+        # Its loop is gone, and its connections' sockets with it; release the pool here
+        closing = asyncio.ensure_future(client.aclose())
+    else:
+        try:
+            asyncio.run(client.aclose())
+        except Exception as e:
+            logger.debug(f"Closing replaced {client.config.name} client failed: {e}")
+        return
+    _closing.add(closing)
+    closing.add_done_callback(_closed)
+
+
+def _closed(closing: asyncio.Future) -> None:
+    _closing.discard(closing)
+    if not closing.cancelled() and closing.exception() is not None:
+        logger.debug(f"Closing replaced client failed: {closing.exception()}")
+
+
+def start_http_clients() -> None:
+    """Open a client for every registered configuration"""
+    for name in _configs:
+        get_client(name)
+
+
+async def close_http_clients() -> None:
+    """Close every open client and its pooled connections"""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+def get_metrics() -> Dict[str, Dict]:
+    """Per-host request counts and latency summary"""
+    return {host: metrics.snapshot() for host, metrics in sorted(_metrics.items())}
@@ -0,0 +1,81 @@
+"""
+In-process scheduler for periodic maintenance jobs.
+
+Jobs are registered at import time by the modules that own them and are
+started/stopped from the application lifespan in main.py. Every job must be
+idempotent: with several uvicorn workers each process runs its own copy.
+"""
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval_seconds: float
+    func: Callable
+    run_at_startup: bool = True
+
+
+_jobs: Dict[str, PeriodicJob] = {}
+_tasks: List[asyncio.Task] = []
+
+
+def register_job(
+    name: str,
+    interval_seconds: float,
+    func: Callable,
+    run_at_startup: bool = True
+) -> None:
+    """
+    Register a periodic job.
+
+    Args:
+        name: Unique job name (re-registering replaces the job)
+        interval_seconds: Delay between runs
+        func: Sync or async callable taking no arguments. Sync callables run
+              in a worker thread so they never block the event loop.
+        run_at_startup: Run once immediately when the scheduler starts
+    """
+    _jobs[name] = PeriodicJob(name, interval_seconds, func, run_at_startup)
+
+
+async def run_job_once(job: PeriodicJob):
+    """Run a job a single time, logging (not raising) failures"""
+    try:
+        if inspect.iscoroutinefunction(job.func):
+            return await job.func()
+        return await asyncio.to_thread(job.func)
+    except Exception as e:
+        logger.error(f"Scheduled job {job.name} failed: {e}")
+        return None
+
+
+async def _job_loop(job: PeriodicJob):
+    if not job.run_at_startup:
+        await asyncio.sleep(job.interval_seconds)
+    while True:
+        await run_job_once(job)
+        await asyncio.sleep(job.interval_seconds)
+
+
+def start_scheduler() -> None:
+    """Start all registered jobs on the running event loop"""
+    if _tasks:
+        return
+    for job in _jobs.values():
+        _tasks.append(asyncio.create_task(_job_loop(job), name=f"job:{job.name}"))
+    logger.info(f"Scheduler started with {len(_tasks)} job(s)")
+
+
+async def stop_scheduler() -> None:
+    """Cancel all running jobs and wait for them to finish"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -6,6 +6,7 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from typing import Optional
+import html
 import re
 from PIL import Image
 import io
@@ -14,6 +15,29 @@ import io
 limiter = Limiter(key_func=get_remote_address)
 
 
+# Removed in order (an earlier removal can join text into a later match).
+# Each pattern is paired with a character it cannot match without; removals
+# never add characters, so patterns whose character is absent are skipped.
+_DANGEROUS_PATTERNS = [
+    ('<', re.compile(r'<script[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL)),
+    (':', re.compile(r'javascript:', re.IGNORECASE | re.DOTALL)),
+    ('=', re.compile(r'on\w+\s*=', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<iframe[^>]*>', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<object[^>]*>', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<embed[^>]*>', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<link[^>]*>', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<meta[^>]*>', re.IGNORECASE | re.DOTALL)),
+    ('<', re.compile(r'<style[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL)),
+]
+
+# Common safe entities restored after escaping, in order
+_SAFE_ENTITY_UNESCAPES = [
+    ('&amp;amp;', '&amp;'),
+    ('&amp;lt;', '&lt;'),
+    ('&amp;gt;', '&gt;'),
+]
+
+
 def sanitize_input(text: str, max_length: int = 1000) -> str:
     """
     Sanitize user input to prevent XSS attacks.
@@ -37,32 +61,19 @@ def sanitize_input(text: str, max_length: int = 1000) -> str:
     
     # Remove potentially dangerous characters/patterns
     # Remove script tags and event handlers
-    dangerous_patterns = [
-        r'<script[^>]*>.*?</script>',
-        r'javascript:',
-        r'on\w+\s*=',
-        r'<iframe[^>]*>',
-        r'<object[^>]*>',
-        r'<embed[^>]*>',
-        r'<link[^>]*>',
-        r'<meta[^>]*>',
-        r'<style[^>]*>.*?</style>',
-    ]
-    
-    for pattern in dangerous_patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
+    for required_char, pattern in _DANGEROUS_PATTERNS:
+        if required_char in text:
+            text = pattern.sub('', text)
     
-    # Escape HTML entities (basic protection)
-    text = text.replace('&', '&amp;')
-    text = text.replace('<', '&lt;')
-    text = text.replace('>', '&gt;')
-    text = text.replace('"', '&quot;')
-    text = text.replace("'", '&#x27;')
+    # Escape HTML entities (basic protection): & < > " '
+    if '&' not in text and '<' not in text and '>' not in text and '"' not in text and "'" not in text:
+        return text
+    text = html.escape(text, quote=True)
     
     # Unescape common safe entities
-    text = text.replace('&amp;amp;', '&amp;')
-    text = text.replace('&amp;lt;', '&lt;')
-    text = text.replace('&amp;gt;', '&gt;')
+    if '&amp;amp;' in text or '&amp;lt;' in text or '&amp;gt;' in text:
+        for escaped, safe in _SAFE_ENTITY_UNESCAPES:
+            text = text.replace(escaped, safe)
     
     return text
 
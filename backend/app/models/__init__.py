@@ -1,10 +1,13 @@
 from app.models.user import User, GenderEnum
 from app.models.room import Room, RoomParticipant, Message, MessageReaction, RoomTypeEnum
 from app.models.birthday_wall import BirthdayWall, WallPhoto, PhotoReaction, WallThemeEnum, BackgroundAnimationEnum, WallInvitation, WallUpload
-from app.models.gift import Gift, GiftCatalog, GiftTypeEnum, PaymentProviderEnum
+from app.models.gift import Gift, GiftCatalog, GiftCardJob, GiftTypeEnum, PaymentProviderEnum
 from app.models.buddy import BirthdayBuddy, CelebrantVisibility
 from app.models.admin import ModerationLog, FlaggedContent, Celebrity, ModerationActionEnum, ContentTypeEnum
 from app.models.contact import ContactSubmission
+from app.models.tribe import TribeStats
+from app.models.birthday_window import BirthdayWindow
+from app.models.payment import PaymentWebhookEvent, PaymentOutbox
 
 __all__ = [
     "User",
@@ -23,6 +26,7 @@ __all__ = [
     "BackgroundAnimationEnum",
     "Gift",
     "GiftCatalog",
+    "GiftCardJob",
     "GiftTypeEnum",
     "PaymentProviderEnum",
     "BirthdayBuddy",
@@ -33,5 +37,9 @@ __all__ = [
     "ModerationActionEnum",
     "ContentTypeEnum",
     "ContactSubmission",
+    "TribeStats",
+    "BirthdayWindow",
+    "PaymentWebhookEvent",
+    "PaymentOutbox",
 ]
 
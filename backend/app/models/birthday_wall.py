@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Text, Enum, Float
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Text, Enum, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -85,6 +85,10 @@ class BirthdayWall(Base):
     invitations = relationship("WallInvitation", back_populates="wall", cascade="all, delete-orphan")
     upload_tracking = relationship("WallUpload", back_populates="wall", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index("ix_birthday_walls_is_active_closes_at", "is_active", "closes_at"),
+    )
+    
     def __repr__(self):
         return f"<BirthdayWall {self.id} for user {self.owner_id}>"
 
@@ -146,6 +150,10 @@ class PhotoReaction(Base):
     # Relationships
     photo = relationship("WallPhoto", back_populates="reactions")
     
+    __table_args__ = (
+        UniqueConstraint("photo_id", "user_id", "emoji", name="uq_photo_reactions_photo_user_emoji"),
+    )
+    
     def __repr__(self):
         return f"<PhotoReaction {self.emoji}>"
 
@@ -212,6 +220,10 @@ class WallUpload(Base):
     wall = relationship("BirthdayWall", back_populates="upload_tracking")
     uploader = relationship("User", foreign_keys=[uploader_user_id])
     
+    __table_args__ = (
+        UniqueConstraint("wall_id", "uploader_user_id", name="uq_wall_uploads_wall_uploader"),
+    )
+    
     def __repr__(self):
         return f"<WallUpload {self.id} on wall {self.wall_id}>"
 
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+
+class BirthdayWindow(Base):
+    """
+    Precomputed local birthday interval for a user and year.
+
+    opens_at_utc/closes_at_utc bound the user's birthday in their own timezone
+    (derived from country/state), stored as naive UTC. Rows are precomputed
+    ahead of time by app/services/birthday_window_service.py.
+    """
+    __tablename__ = "birthday_windows"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    
+    # Local date celebrated (Feb 29 birthdays are observed on Feb 28 in common years)
+    birthday_date = Column(Date, nullable=False)
+    tz = Column(String, nullable=False)  # IANA timezone name
+    
+    opens_at_utc = Column(DateTime, nullable=False)
+    closes_at_utc = Column(DateTime, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "year", name="uq_birthday_windows_user_year"),
+        Index("ix_birthday_windows_opens_at_utc", "opens_at_utc"),
+        Index("ix_birthday_windows_closes_at_utc", "closes_at_utc"),
+    )
+    
+    def is_open(self, now: datetime = None) -> bool:
+        now = now or datetime.utcnow()
+        return self.opens_at_utc <= now < self.closes_at_utc
+    
+    def __repr__(self):
+        return f"<BirthdayWindow user={self.user_id} {self.birthday_date} {self.tz}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Date
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -31,6 +31,10 @@ class BirthdayBuddy(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=False)
     
+    __table_args__ = (
+        Index("ix_birthday_buddies_is_active_expires_at", "is_active", "expires_at"),
+    )
+    
     def __repr__(self):
         return f"<BirthdayBuddy {self.user_1_id} & {self.user_2_id}>"
 
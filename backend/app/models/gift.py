@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Numeric, Enum, Text
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Numeric, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -41,8 +41,10 @@ class Gift(Base):
     
     # Payment
     payment_provider = Column(Enum(PaymentProviderEnum), nullable=False)
-    payment_intent_id = Column(String, unique=True, nullable=True)
+    payment_intent_id = Column(String, unique=True, nullable=True)  # Our tx_ref
+    payment_transaction_id = Column(String, nullable=True)  # Provider's transaction id, once completed
     payment_status = Column(String, default="pending")  # pending, completed, failed, refunded
+    payment_checked_at = Column(DateTime, nullable=True)  # Last reconciliation check with the provider
     
     # Gift card specifics (for third-party gift cards)
     gift_card_code = Column(String, nullable=True)
@@ -54,6 +56,7 @@ class Gift(Base):
     # Delivery
     is_delivered = Column(Boolean, default=False)
     delivered_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # End of the display window; None for gifts that don't expire
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -63,6 +66,16 @@ class Gift(Base):
     sender = relationship("User", foreign_keys=[sender_id], back_populates="gifts_sent")
     recipient = relationship("User", foreign_keys=[recipient_id], back_populates="gifts_received")
     
+    __table_args__ = (
+        # Reconciliation scans pending payments by age
+        Index("ix_gifts_payment_status_created_at", "payment_status", "created_at"),
+        # Active gifts for a profile are a recent delivered_at range per recipient
+        Index("ix_gifts_recipient_id_delivered_at", "recipient_id", "delivered_at"),
+        # Gift history pages, newest first
+        Index("ix_gifts_recipient_id_payment_status_created_at", "recipient_id", "payment_status", "created_at"),
+        Index("ix_gifts_sender_id_created_at", "sender_id", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<Gift {self.gift_type} from {self.sender_id} to {self.recipient_id}>"
 
@@ -81,6 +94,9 @@ class GiftCatalog(Base):
     price = Column(Numeric(10, 2), nullable=False)
     currency = Column(String, default="USD")
     
+    # Gift card fulfillment: key into the gift card provider registry (e.g. "amazon")
+    provider_key = Column(String, nullable=True)
+    
     # Display
     image_url = Column(String, nullable=True)
     preview_url = Column(String, nullable=True)
@@ -97,3 +113,39 @@ class GiftCatalog(Base):
     def __repr__(self):
         return f"<GiftCatalogItem {self.name}>"
 
+
+
+class GiftCardJob(Base):
+    """
+    Pending third-party gift card purchase for a paid gift.
+
+    One job per gift. Jobs are created when a gift card's payment completes
+    and fulfilled in the background by app/services/gift_card_service.py, so
+    checkout never waits on the provider.
+    """
+    __tablename__ = "gift_card_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    gift_id = Column(Integer, ForeignKey("gifts.id", ondelete="CASCADE"), unique=True, nullable=False)
+    provider_key = Column(String, nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    currency = Column(String, nullable=False)
+    
+    # Processing state
+    status = Column(String, nullable=False, default="pending")  # pending, processing, fulfilled, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    provider_reference = Column(String, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    fulfilled_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_gift_card_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    
+    def __repr__(self):
+        return f"<GiftCardJob gift={self.gift_id} {self.provider_key} {self.status}>"
@@ -0,0 +1,78 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index, ForeignKey
+from datetime import datetime
+from app.core.database import Base
+
+
+class PaymentWebhookEvent(Base):
+    """
+    Inbox of payment provider webhooks.
+
+    The webhook endpoint only stores the event (deduplicated on the provider's
+    transaction id) and acknowledges it; app/services/payment_webhook_service.py
+    processes it afterwards, retrying with backoff and dead-lettering events
+    that keep failing.
+    """
+    __tablename__ = "payment_webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String, nullable=False, default="flutterwave")
+    # Provider transaction id (or a hash of the body for events without one)
+    transaction_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String, nullable=True)
+    tx_ref = Column(String, nullable=True, index=True)
+    payload = Column(Text, nullable=False)  # Raw JSON body
+
+    # Processing state
+    status = Column(String, nullable=False, default="pending")  # pending, processing, processed, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # Timestamps
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_payment_webhook_events_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<PaymentWebhookEvent {self.transaction_id} {self.status}>"
+
+
+class PaymentOutbox(Base):
+    """
+    Outgoing payment provider calls, recorded in the same transaction as the
+    gift that needs them.
+
+    Checkout commits the gift and its outbox entry together, then makes the
+    call with no database transaction open (app/services/payment_outbox_service.py).
+    Calls that fail, or that a crashed request never made, are retried by the
+    payment_outbox_relay job until MAX_ATTEMPTS.
+    """
+    __tablename__ = "payment_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    gift_id = Column(Integer, ForeignKey("gifts.id", ondelete="CASCADE"), nullable=False, index=True)
+    operation = Column(String, nullable=False)  # e.g. "flutterwave.initialize"
+    payload = Column(Text, nullable=False)  # JSON arguments for the call
+
+    # Dispatch state
+    status = Column(String, nullable=False, default="pending")  # pending, processing, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    response = Column(Text, nullable=True)  # JSON provider response
+    last_error = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    dispatched_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_payment_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<PaymentOutbox {self.operation} gift={self.gift_id} {self.status}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Text, Enum, UniqueConstraint, Index, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -17,7 +17,7 @@ class Room(Base):
     id = Column(Integer, primary_key=True, index=True)
     room_type = Column(Enum(RoomTypeEnum), nullable=False)
     
-    # For tribe rooms: "MM-DD", for personal: user_id, for buddy: generated
+    # For tribe rooms: "tribe_MM-DD_YYYY", for personal: user_id, for buddy: generated
     room_identifier = Column(String, unique=True, index=True, nullable=False)
     
     # Room metadata
@@ -35,6 +35,7 @@ class Room(Base):
     # Invite system for personal rooms
     invite_code = Column(String, unique=True, nullable=True)
     max_guests = Column(Integer, default=50)
+    guest_count = Column(Integer, default=0, nullable=False)  # Participants admitted via invite
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -44,6 +45,11 @@ class Room(Base):
     messages = relationship("Message", back_populates="room", cascade="all, delete-orphan")
     participants = relationship("RoomParticipant", back_populates="room", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Lets the lifecycle sweeper find expired active rooms without a table scan
+        Index("ix_rooms_is_active_closes_at", "is_active", "closes_at"),
+    )
+    
     def __repr__(self):
         return f"<Room {self.room_type} {self.room_identifier}>"
 
@@ -67,11 +73,23 @@ class RoomParticipant(Base):
     # Relationships
     room = relationship("Room", back_populates="participants")
     
+    __table_args__ = (
+        UniqueConstraint("room_id", "user_id", name="uq_room_participants_room_user"),
+    )
+    
     def __repr__(self):
         return f"<RoomParticipant room={self.room_id} user={self.user_id}>"
 
 
 class Message(Base):
+    """
+    Chat message.
+
+    On PostgreSQL the table is range-partitioned by month on created_at with
+    primary key (id, created_at); see the partition_messages_by_month
+    migration and app/services/message_partition_service.py. Filter on
+    created_at where possible so queries only touch the relevant partitions.
+    """
     __tablename__ = "messages"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -86,7 +104,7 @@ class Message(Base):
     is_deleted = Column(Boolean, default=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Partition key
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -94,14 +112,37 @@ class Message(Base):
     user = relationship("User", back_populates="messages")
     reactions = relationship("MessageReaction", back_populates="message", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index("ix_messages_room_id_created_at", "room_id", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<Message {self.id} in room {self.room_id}>"
 
 
+# PostgreSQL only: generated tsvector for full-text search (app/services/message_search_service.py).
+# Not mapped on the model; the same DDL as the add_message_search_vector migration, for
+# databases built with create_all.
+event.listen(
+    Message.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE messages ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED"
+    ).execute_if(dialect="postgresql")
+)
+event.listen(
+    Message.__table__,
+    "after_create",
+    DDL("CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)").execute_if(dialect="postgresql")
+)
+
+
 class MessageReaction(Base):
     __tablename__ = "message_reactions"
     
     id = Column(Integer, primary_key=True, index=True)
+    # No database-level FK on PostgreSQL (messages is partitioned)
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     emoji = Column(String, nullable=False)
@@ -111,6 +152,10 @@ class MessageReaction(Base):
     # Relationships
     message = relationship("Message", back_populates="reactions")
     
+    __table_args__ = (
+        UniqueConstraint("message_id", "user_id", "emoji", name="uq_message_reactions_message_user_emoji"),
+    )
+    
     def __repr__(self):
         return f"<Reaction {self.emoji} on message {self.message_id}>"
 
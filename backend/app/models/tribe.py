@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, DateTime, Enum
+from datetime import datetime
+from app.core.database import Base
+from app.models.user import GenderEnum
+
+
+class TribeStats(Base):
+    """
+    Precomputed active-member counts per birthday tribe.
+
+    One row per (tribe_id, country, gender). Maintained in the same
+    transaction as signup/deactivation and rebuilt nightly by the reconciler
+    in app/services/tribe_stats_service.py.
+    """
+    __tablename__ = "tribe_stats"
+
+    tribe_id = Column(String, primary_key=True)  # Format: "MM-DD"
+    country = Column(String, primary_key=True)
+    gender = Column(Enum(GenderEnum), primary_key=True)
+
+    member_count = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TribeStats {self.tribe_id} {self.country} {self.gender}: {self.member_count}>"
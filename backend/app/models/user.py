@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Date, Enum
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Date, Enum, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import random
 from app.core.database import Base
 
 
@@ -23,6 +24,7 @@ class User(Base):
     country = Column(String, nullable=False)
     state = Column(String, nullable=False)
     city = Column(String, nullable=True)
+    currency = Column(String, nullable=True)  # ISO 4217, resolved from country (see CurrencyService.currency_for_user)
     profile_picture_url = Column(String, nullable=False)
     
     # Birthday tribe (auto-assigned based on MM-DD)
@@ -30,6 +32,9 @@ class User(Base):
     birth_day = Column(Integer, nullable=False)    # 1-31
     tribe_id = Column(String, index=True, nullable=False)  # Format: "MM-DD"
     
+    # Uniform random key for cheap random sampling within a tribe
+    random_key = Column(Float, default=random.random, nullable=False)
+    
     # Privacy settings
     state_visibility_enabled = Column(Boolean, default=False)
     
@@ -37,6 +42,10 @@ class User(Base):
     last_profile_picture_change = Column(DateTime, nullable=True)
     profile_picture_change_count = Column(Integer, default=0)
     
+    # Gift history totals (maintained by app/services/gift_stats_service.py)
+    gifts_sent_count = Column(Integer, default=0, nullable=False)  # Every gift sent, whatever its payment status
+    gifts_received_count = Column(Integer, default=0, nullable=False)  # Completed gifts only
+    
     # Account status
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
@@ -53,6 +62,11 @@ class User(Base):
     gifts_received = relationship("Gift", foreign_keys="Gift.recipient_id", back_populates="recipient")
     birthday_walls = relationship("BirthdayWall", back_populates="owner")
     
+    __table_args__ = (
+        Index("ix_users_tribe_id_random_key", "tribe_id", "random_key"),
+        Index("ix_users_tribe_id_id", "tribe_id", "id"),
+    )
+    
     def __repr__(self):
         return f"<User {self.first_name} ({self.email})>"
 
@@ -0,0 +1,141 @@
+"""
+Birthday Window Service
+Computes and precomputes each user's local birthday interval.
+
+A user's birthday opens at local midnight in the timezone derived from their
+country/state, so rooms, walls and buddy pairings open and close in ~24+
+timezone waves instead of all at server midnight. Windows are precomputed
+into the indexed birthday_windows table ahead of time. Request paths read the
+one stored window they need and never write; when the precompute job hasn't
+reached a user yet they compute the window in memory instead.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import SessionLocal, dialect_insert
+from app.models import User, BirthdayWindow
+from app.utils.timezones import (
+    resolve_timezone,
+    observed_birthday,
+    observed_tribe_ids,
+    local_day_window,
+)
+
+logger = logging.getLogger(__name__)
+
+# Days (starting today) whose windows are kept precomputed
+PRECOMPUTE_DAYS_AHEAD = 2
+PRECOMPUTE_BATCH_SIZE = 1000
+
+
+class BirthdayWindowService:
+    """Service for users' timezone-aware birthday windows"""
+
+    @staticmethod
+    def compute_window(user, year: int) -> Dict:
+        """Compute the birthday_windows row for a user and year"""
+        tz = resolve_timezone(user.country, user.state)
+        birthday_date = observed_birthday(user.birth_month, user.birth_day, year)
+        opens_at_utc, closes_at_utc = local_day_window(birthday_date, tz)
+        return {
+            "user_id": user.id,
+            "year": year,
+            "birthday_date": birthday_date,
+            "tz": tz,
+            "opens_at_utc": opens_at_utc,
+            "closes_at_utc": closes_at_utc,
+            "created_at": datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _insert_windows(db: Session, rows: List[Dict]) -> int:
+        if not rows:
+            return 0
+        stmt = dialect_insert(db, BirthdayWindow.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=["user_id", "year"]
+        )
+        return db.execute(stmt).rowcount or 0
+
+    @staticmethod
+    def get_current_window(
+        db: Session,
+        user: User,
+        now: Optional[datetime] = None
+    ) -> BirthdayWindow:
+        """
+        Get the user's birthday window that is open now, or the next one.
+
+        Windows near New Year can belong to the neighbouring year in UTC, so
+        the year is picked from the previous, current and next year's windows
+        computed in memory. Only that year's row is read; if it hasn't been
+        precomputed, the computed window is returned unsaved.
+        """
+        now = now or datetime.utcnow()
+        window = None
+        for year in (now.year - 1, now.year, now.year + 1):
+            window = BirthdayWindowService.compute_window(user, year)
+            if window["closes_at_utc"] > now:
+                break
+
+        stored = db.query(BirthdayWindow).filter(
+            BirthdayWindow.user_id == user.id,
+            BirthdayWindow.year == window["year"]
+        ).first()
+        return stored or BirthdayWindow(**window)
+
+    @staticmethod
+    def is_birthday(db: Session, user: User, now: Optional[datetime] = None) -> bool:
+        """Check whether it is currently the user's birthday in their timezone"""
+        now = now or datetime.utcnow()
+        return BirthdayWindowService.get_current_window(db, user, now).is_open(now)
+
+    @staticmethod
+    def precompute(db: Session, start_day: date, days: int) -> int:
+        """
+        Precompute windows for every active user celebrating in [start_day, start_day + days).
+
+        Returns:
+            Number of windows created
+        """
+        created = 0
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            members = db.query(
+                User.id,
+                User.birth_month,
+                User.birth_day,
+                User.country,
+                User.state
+            ).filter(
+                User.tribe_id.in_(observed_tribe_ids(day)),
+                User.is_active == True
+            ).yield_per(PRECOMPUTE_BATCH_SIZE)
+
+            batch: List[Dict] = []
+            for member in members:
+                batch.append(BirthdayWindowService.compute_window(member, day.year))
+                if len(batch) >= PRECOMPUTE_BATCH_SIZE:
+                    created += BirthdayWindowService._insert_windows(db, batch)
+                    batch = []
+            created += BirthdayWindowService._insert_windows(db, batch)
+        return created
+
+    @staticmethod
+    def run_precompute() -> int:
+        """Scheduled entry point: precompute today's and upcoming windows"""
+        db = SessionLocal()
+        try:
+            created = BirthdayWindowService.precompute(
+                db, date.today(), PRECOMPUTE_DAYS_AHEAD + 1
+            )
+            db.commit()
+            if created:
+                logger.info(f"Precomputed {created} birthday window(s)")
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,106 @@
+"""
+Celebrant Service
+Serves today's celebrants per (country, state) from a per-day cached index.
+
+Each cache entry is built from a single scan of today's tribe and holds both
+the total celebrant count and the visible celebrant list. Entries are
+invalidated whenever a user's visibility or displayed profile fields change.
+
+The state comes straight from the request, so the cache is bounded: entries
+expire after CACHE_DURATION and at most MAX_CACHE_ENTRIES are kept, evicting
+the oldest first.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+# (day, country, state) -> (index entry, cached_at)
+_state_celebrant_cache: Dict[Tuple[date, str, str], Tuple[Dict[str, Any], datetime]] = {}
+CACHE_DURATION = timedelta(minutes=5)
+MAX_CACHE_ENTRIES = 1000
+
+
+class CelebrantService:
+    """Service for state-level celebrant visibility lookups"""
+    
+    @staticmethod
+    def get_state_celebrants(
+        db: Session,
+        state: str,
+        country: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get today's celebrant total and visible celebrants for a state
+        
+        Args:
+            db: Database session
+            state: State name as stored on users
+            country: Optional country to disambiguate states with the same name
+            
+        Returns:
+            Dict with total_celebrants and visible_celebrants
+        """
+        today = date.today()
+        key = (today, country or "", state)
+        
+        cached = _state_celebrant_cache.get(key)
+        if cached and datetime.utcnow() - cached[1] < CACHE_DURATION:
+            return cached[0]
+        
+        # Single scan over today's tribe (indexed) yields both total and visible list
+        query = db.query(
+            User.id,
+            User.first_name,
+            User.profile_picture_url,
+            User.city,
+            User.state_visibility_enabled
+        ).filter(
+            User.tribe_id == f"{today.month:02d}-{today.day:02d}",
+            User.state == state,
+            User.is_active == True
+        )
+        if country:
+            query = query.filter(User.country == country)
+        
+        rows = query.all()
+        entry = {
+            "total_celebrants": len(rows),
+            "visible_celebrants": [
+                {
+                    "id": row.id,
+                    "first_name": row.first_name,
+                    "profile_picture_url": row.profile_picture_url,
+                    "city": row.city
+                }
+                for row in rows
+                if row.state_visibility_enabled
+            ]
+        }
+        
+        CelebrantService._store(key, entry)
+        return entry
+    
+    @staticmethod
+    def _store(key: Tuple[date, str, str], entry: Dict[str, Any]) -> None:
+        """Cache an entry, dropping expired ones and then the oldest beyond MAX_CACHE_ENTRIES"""
+        now = datetime.utcnow()
+        for stale_key in [
+            k for k, (_, cached_at) in _state_celebrant_cache.items()
+            if k[0] != key[0] or now - cached_at >= CACHE_DURATION
+        ]:
+            _state_celebrant_cache.pop(stale_key, None)
+        
+        # Re-insert so dict order stays oldest-first
+        _state_celebrant_cache.pop(key, None)
+        while len(_state_celebrant_cache) >= MAX_CACHE_ENTRIES:
+            _state_celebrant_cache.pop(next(iter(_state_celebrant_cache)))
+        _state_celebrant_cache[key] = (entry, now)
+    
+    @staticmethod
+    def invalidate(country: Optional[str], state: str) -> None:
+        """Drop cached entries that could include a user from this country/state"""
+        for key in list(_state_celebrant_cache):
+            if key[2] == state and key[1] in ("", country):
+                _state_celebrant_cache.pop(key, None)
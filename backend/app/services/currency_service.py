@@ -1,224 +1,157 @@
 """
 Currency Conversion Service
 Handles currency conversion based on exchange rates
+
+Rates are kept in a single USD-based table; every other base is derived from
+it locally (rate(A -> B) = usd[B] / usd[A]). Concurrent cache misses share one
+in-flight fetch, the table is refreshed in the background ahead of expiry,
+and the last good table is snapshotted to disk so a cold start can serve
+rates without waiting on the network.
 """
 import os
+import json
+import logging
 from typing import Dict, Optional
-from decimal import Decimal
-import httpx
+from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
 from app.core.config import settings
+from app.core.http_client import register_client, get_client
+from app.models import User
+from app.utils.countries import CURRENCY_CODES, CURRENCY_MINOR_UNITS, DEFAULT_MINOR_UNITS, currency_for_country
 import asyncio
 from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
 
-# Cache for exchange rates (refresh every hour)
-_exchange_rate_cache: Dict[str, Dict] = {}
-_cache_timestamp: Optional[datetime] = None
+# USD rates are considered fresh for CACHE_DURATION and refreshed in the
+# background once they are older than CACHE_DURATION - REFRESH_AHEAD
 CACHE_DURATION = timedelta(hours=1)
+REFRESH_AHEAD = timedelta(minutes=10)
+
+register_client("exchange_rates", timeout=10.0, max_connections=4, max_keepalive_connections=2)
 
 
-# Country to Currency Mapping
-COUNTRY_TO_CURRENCY: Dict[str, str] = {
-    # Africa
-    "NG": "NGN",  # Nigeria
-    "KE": "KES",  # Kenya
-    "GH": "GHS",  # Ghana
-    "ZA": "ZAR",  # South Africa
-    "EG": "EGP",  # Egypt
-    "TZ": "TZS",  # Tanzania
-    "UG": "UGX",  # Uganda
-    "ET": "ETB",  # Ethiopia
-    "MA": "MAD",  # Morocco
-    "DZ": "DZD",  # Algeria
-    "TN": "TND",  # Tunisia
-    "CM": "XAF",  # Cameroon
-    "CI": "XOF",  # Côte d'Ivoire
-    "SN": "XOF",  # Senegal
-    "AO": "AOA",  # Angola
-    "SD": "SDG",  # Sudan
-    "MZ": "MZN",  # Mozambique
-    "MG": "MGA",  # Madagascar
-    "ML": "XOF",  # Mali
-    "BF": "XOF",  # Burkina Faso
-    "NE": "XOF",  # Niger
-    "RW": "RWF",  # Rwanda
-    "BJ": "XOF",  # Benin
-    "TG": "XOF",  # Togo
-    "GN": "GNF",  # Guinea
-    "SL": "SLL",  # Sierra Leone
-    "LR": "LRD",  # Liberia
-    "TD": "XAF",  # Chad
-    "CF": "XAF",  # Central African Republic
-    "GA": "XAF",  # Gabon
-    "CG": "XAF",  # Republic of the Congo
-    "CD": "CDF",  # Democratic Republic of the Congo
-    "ZM": "ZMW",  # Zambia
-    "ZW": "USD",  # Zimbabwe (uses USD)
-    "MW": "MWK",  # Malawi
-    "LS": "LSL",  # Lesotho
-    "BW": "BWP",  # Botswana
-    "NA": "NAD",  # Namibia
-    "SZ": "SZL",  # Eswatini
-    "MU": "MUR",  # Mauritius
-    "SC": "SCR",  # Seychelles
-    "KM": "KMF",  # Comoros
-    "DJ": "DJF",  # Djibouti
-    "ER": "ERN",  # Eritrea
-    "SO": "SOS",  # Somalia
-    "SS": "SSP",  # South Sudan
+class ExchangeRateStore:
+    """USD-based exchange rate table with single-flight refresh and disk snapshot"""
+    
+    def __init__(self, api_url: str, snapshot_path: str):
+        self.api_url = api_url
+        self.snapshot_path = Path(snapshot_path)
+        self.usd_rates: Dict[str, float] = {}
+        self.fetched_at: Optional[datetime] = None
+        self._derived: Dict[str, Dict[str, float]] = {}
+        self._inflight: Optional[asyncio.Task] = None
+        self._snapshot_loaded = False
+    
+    @property
+    def version(self) -> Optional[datetime]:
+        """Changes whenever a new rate table is installed"""
+        return self.fetched_at
+    
+    def _install(self, rates: Dict[str, float], fetched_at: datetime) -> None:
+        rates = dict(rates)
+        rates["USD"] = 1.0
+        self.usd_rates = rates
+        self.fetched_at = fetched_at
+        self._derived = {}
     
-    # Americas
-    "US": "USD",  # United States
-    "CA": "CAD",  # Canada
-    "MX": "MXN",  # Mexico
-    "BR": "BRL",  # Brazil
-    "AR": "ARS",  # Argentina
-    "CL": "CLP",  # Chile
-    "CO": "COP",  # Colombia
-    "PE": "PEN",  # Peru
-    "VE": "VES",  # Venezuela
-    "EC": "USD",  # Ecuador (uses USD)
-    "BO": "BOB",  # Bolivia
-    "PY": "PYG",  # Paraguay
-    "UY": "UYU",  # Uruguay
-    "GY": "GYD",  # Guyana
-    "SR": "SRD",  # Suriname
-    "GF": "EUR",  # French Guiana
-    "FK": "FKP",  # Falkland Islands
-    "GT": "GTQ",  # Guatemala
-    "BZ": "BZD",  # Belize
-    "SV": "USD",  # El Salvador (uses USD)
-    "HN": "HNL",  # Honduras
-    "NI": "NIO",  # Nicaragua
-    "CR": "CRC",  # Costa Rica
-    "PA": "PAB",  # Panama
-    "CU": "CUP",  # Cuba
-    "JM": "JMD",  # Jamaica
-    "HT": "HTG",  # Haiti
-    "DO": "DOP",  # Dominican Republic
-    "PR": "USD",  # Puerto Rico (uses USD)
-    "TT": "TTD",  # Trinidad and Tobago
-    "BB": "BBD",  # Barbados
-    "BS": "BSD",  # Bahamas
-    "AG": "XCD",  # Antigua and Barbuda
-    "DM": "XCD",  # Dominica
-    "GD": "XCD",  # Grenada
-    "KN": "XCD",  # Saint Kitts and Nevis
-    "LC": "XCD",  # Saint Lucia
-    "VC": "XCD",  # Saint Vincent and the Grenadines
+    def _load_snapshot(self) -> None:
+        self._snapshot_loaded = True
+        try:
+            data = json.loads(self.snapshot_path.read_text())
+            self._install(data["rates"], datetime.fromisoformat(data["fetched_at"]))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error loading exchange rate snapshot: {e}")
     
-    # Asia
-    "CN": "CNY",  # China
-    "JP": "JPY",  # Japan
-    "IN": "INR",  # India
-    "ID": "IDR",  # Indonesia
-    "PK": "PKR",  # Pakistan
-    "BD": "BDT",  # Bangladesh
-    "PH": "PHP",  # Philippines
-    "VN": "VND",  # Vietnam
-    "TH": "THB",  # Thailand
-    "MY": "MYR",  # Malaysia
-    "SG": "SGD",  # Singapore
-    "HK": "HKD",  # Hong Kong
-    "TW": "TWD",  # Taiwan
-    "KR": "KRW",  # South Korea
-    "MM": "MMK",  # Myanmar
-    "KH": "KHR",  # Cambodia
-    "LA": "LAK",  # Laos
-    "BN": "BND",  # Brunei
-    "AF": "AFN",  # Afghanistan
-    "IR": "IRR",  # Iran
-    "IQ": "IQD",  # Iraq
-    "SA": "SAR",  # Saudi Arabia
-    "AE": "AED",  # United Arab Emirates
-    "OM": "OMR",  # Oman
-    "YE": "YER",  # Yemen
-    "KW": "KWD",  # Kuwait
-    "QA": "QAR",  # Qatar
-    "BH": "BHD",  # Bahrain
-    "JO": "JOD",  # Jordan
-    "LB": "LBP",  # Lebanon
-    "SY": "SYP",  # Syria
-    "IL": "ILS",  # Israel
-    "PS": "ILS",  # Palestine (uses ILS)
-    "TR": "TRY",  # Turkey
-    "GE": "GEL",  # Georgia
-    "AM": "AMD",  # Armenia
-    "AZ": "AZN",  # Azerbaijan
-    "KZ": "KZT",  # Kazakhstan
-    "UZ": "UZS",  # Uzbekistan
-    "TM": "TMT",  # Turkmenistan
-    "TJ": "TJS",  # Tajikistan
-    "KG": "KGS",  # Kyrgyzstan
-    "MN": "MNT",  # Mongolia
-    "NP": "NPR",  # Nepal
-    "BT": "BTN",  # Bhutan
-    "LK": "LKR",  # Sri Lanka
-    "MV": "MVR",  # Maldives
+    def _write_snapshot(self) -> None:
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({
+                "fetched_at": self.fetched_at.isoformat(),
+                "rates": self.usd_rates
+            }))
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Error writing exchange rate snapshot: {e}")
     
-    # Europe
-    "GB": "GBP",  # United Kingdom
-    "IE": "EUR",  # Ireland
-    "FR": "EUR",  # France
-    "DE": "EUR",  # Germany
-    "IT": "EUR",  # Italy
-    "ES": "EUR",  # Spain
-    "PT": "EUR",  # Portugal
-    "NL": "EUR",  # Netherlands
-    "BE": "EUR",  # Belgium
-    "LU": "EUR",  # Luxembourg
-    "AT": "EUR",  # Austria
-    "FI": "EUR",  # Finland
-    "GR": "EUR",  # Greece
-    "CY": "EUR",  # Cyprus
-    "MT": "EUR",  # Malta
-    "SI": "EUR",  # Slovenia
-    "SK": "EUR",  # Slovakia
-    "EE": "EUR",  # Estonia
-    "LV": "EUR",  # Latvia
-    "LT": "EUR",  # Lithuania
-    "PL": "PLN",  # Poland
-    "CZ": "CZK",  # Czech Republic
-    "HU": "HUF",  # Hungary
-    "RO": "RON",  # Romania
-    "BG": "BGN",  # Bulgaria
-    "HR": "HRK",  # Croatia
-    "RS": "RSD",  # Serbia
-    "BA": "BAM",  # Bosnia and Herzegovina
-    "MK": "MKD",  # North Macedonia
-    "AL": "ALL",  # Albania
-    "ME": "EUR",  # Montenegro (uses EUR)
-    "XK": "EUR",  # Kosovo (uses EUR)
-    "CH": "CHF",  # Switzerland
-    "NO": "NOK",  # Norway
-    "SE": "SEK",  # Sweden
-    "DK": "DKK",  # Denmark
-    "IS": "ISK",  # Iceland
-    "RU": "RUB",  # Russia
-    "UA": "UAH",  # Ukraine
-    "BY": "BYN",  # Belarus
-    "MD": "MDL",  # Moldova
+    async def _fetch(self) -> None:
+        """Fetch and install a new table; the current table is kept if this raises"""
+        try:
+            # exchangerate-api.com (free tier, no API key required)
+            response = await get_client("exchange_rates").get(self.api_url)
+            response.raise_for_status()
+            rates = response.json().get("rates", {})
+            if not rates:
+                raise ValueError("empty rate table")
+        except Exception as e:
+            logger.error(f"Error fetching exchange rates: {e}")
+            raise
+        self._install(rates, datetime.now())
+        await asyncio.to_thread(self._write_snapshot)
     
-    # Oceania
-    "AU": "AUD",  # Australia
-    "NZ": "NZD",  # New Zealand
-    "PG": "PGK",  # Papua New Guinea
-    "FJ": "FJD",  # Fiji
-    "NC": "XPF",  # New Caledonia
-    "PF": "XPF",  # French Polynesia
-    "WS": "WST",  # Samoa
-    "TO": "TOP",  # Tonga
-    "VU": "VUV",  # Vanuatu
-    "SB": "SBD",  # Solomon Islands
-    "KI": "AUD",  # Kiribati (uses AUD)
-    "TV": "AUD",  # Tuvalu (uses AUD)
-    "NR": "AUD",  # Nauru (uses AUD)
-    "PW": "USD",  # Palau (uses USD)
-    "FM": "USD",  # Micronesia (uses USD)
-    "MH": "USD",  # Marshall Islands (uses USD)
+    def _start_fetch(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+            # Failures are logged by _fetch; retrieve them so unawaited tasks don't warn
+            self._inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._inflight
     
-    # Default fallback
-    "XX": "USD",  # Unknown/Default
-}
+    async def refresh(self) -> None:
+        """
+        Fetch a new table; concurrent callers share the same in-flight fetch.
+        
+        Raises:
+            Exception: The fetch failed (the previous table, if any, stays installed)
+        """
+        await asyncio.shield(self._start_fetch())
+    
+    async def get_usd_rates(self) -> Dict[str, float]:
+        """Get the USD rate table, fetching only if no table is available at all"""
+        if not self._snapshot_loaded:
+            self._load_snapshot()
+        
+        if not self.usd_rates:
+            try:
+                await self.refresh()
+            except Exception:
+                # Already logged; callers treat an empty table as "no rates"
+                return {}
+            return self.usd_rates
+        
+        # Serve what we have; refresh ahead of (or after) expiry without blocking
+        age = datetime.now() - self.fetched_at
+        if age >= CACHE_DURATION - REFRESH_AHEAD:
+            self._start_fetch()
+        return self.usd_rates
+    
+    async def get_rates(self, base_currency: str) -> Dict[str, float]:
+        """Get rates for any base currency, derived from the USD table"""
+        usd_rates = await self.get_usd_rates()
+        base_currency = base_currency.upper()
+        
+        derived = self._derived.get(base_currency)
+        if derived is not None:
+            return derived
+        
+        base_rate = usd_rates.get(base_currency)
+        if not base_rate:
+            return {}
+        derived = {code: rate / base_rate for code, rate in usd_rates.items()}
+        self._derived[base_currency] = derived
+        return derived
+
+
+_rate_store = ExchangeRateStore(
+    settings.EXCHANGE_RATE_API_URL,
+    settings.EXCHANGE_RATE_SNAPSHOT_PATH
+)
+
+
+_QUANTUMS = {units: Decimal(1).scaleb(-units) for units in range(5)}
 
 
 class CurrencyService:
@@ -227,60 +160,47 @@ class CurrencyService:
     BASE_CURRENCY = "USD"  # All prices stored in USD
     
     @staticmethod
-    def get_currency_from_country(country_code: str) -> str:
+    def get_currency_from_country(country: str) -> str:
         """
-        Get currency code from country code
+        Get currency code from a country code or name
         
         Args:
-            country_code: ISO 3166-1 alpha-2 country code (e.g., "US", "NG", "GB")
+            country: ISO 3166-1 alpha-2/alpha-3 code or country name (e.g., "NG", "NGA", "Nigeria")
             
         Returns:
-            ISO 4217 currency code (e.g., "USD", "NGN", "GBP")
+            ISO 4217 currency code (e.g., "NGN"), the base currency if unknown
         """
-        country_code = country_code.upper().strip()
-        return COUNTRY_TO_CURRENCY.get(country_code, "USD")
+        return currency_for_country(country, CurrencyService.BASE_CURRENCY)
     
     @staticmethod
     async def get_exchange_rates(base_currency: str = "USD") -> Dict[str, float]:
         """
-        Fetch exchange rates from exchangerate-api.com (free tier)
+        Get exchange rates for a base currency
         
         Args:
             base_currency: Base currency code (default: USD)
             
         Returns:
             Dictionary mapping currency codes to exchange rates
+            (empty if no rates are available or the base is unknown)
         """
-        global _exchange_rate_cache, _cache_timestamp
-        
-        # Check cache
-        if _cache_timestamp and datetime.now() - _cache_timestamp < CACHE_DURATION:
-            if base_currency in _exchange_rate_cache:
-                return _exchange_rate_cache[base_currency]
-        
-        try:
-            # Use exchangerate-api.com (free tier, no API key required)
-            url = f"https://api.exchangerate-api.com/v4/latest/{base_currency}"
-            
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-                
-                rates = data.get("rates", {})
-                
-                # Update cache
-                _exchange_rate_cache[base_currency] = rates
-                _cache_timestamp = datetime.now()
-                
-                return rates
-                
-        except Exception as e:
-            print(f"Error fetching exchange rates: {str(e)}")
-            # Return cached rates if available, or empty dict
-            if base_currency in _exchange_rate_cache:
-                return _exchange_rate_cache[base_currency]
-            return {}
+        return await _rate_store.get_rates(base_currency)
+    
+    @staticmethod
+    async def refresh_rates() -> None:
+        """Refresh the rate table now (scheduled to keep it warm)"""
+        await _rate_store.refresh()
+    
+    @staticmethod
+    def rates_version() -> Optional[datetime]:
+        """Timestamp of the current rate table, for caches derived from it"""
+        return _rate_store.version
+    
+    @staticmethod
+    def round_amount(amount: Decimal, currency: str) -> Decimal:
+        """Round an amount to the currency's ISO 4217 minor units (half up)"""
+        units = CURRENCY_MINOR_UNITS.get(currency.upper(), DEFAULT_MINOR_UNITS)
+        return amount.quantize(_QUANTUMS[units], rounding=ROUND_HALF_UP)
     
     @staticmethod
     async def convert_currency(
@@ -320,8 +240,8 @@ class CurrencyService:
         # Convert amount
         converted_amount = amount * Decimal(str(rate))
         
-        # Round to 2 decimal places
-        return round(converted_amount, 2)
+        # Round to the target currency's minor units
+        return CurrencyService.round_amount(converted_amount, to_currency)
     
     @staticmethod
     async def get_user_currency(user_country: Optional[str]) -> str:
@@ -329,7 +249,7 @@ class CurrencyService:
         Get user's currency based on their country
         
         Args:
-            user_country: User's country code or country name
+            user_country: User's country code or country name (a currency code is passed through)
             
         Returns:
             Currency code
@@ -337,40 +257,32 @@ class CurrencyService:
         if not user_country:
             return CurrencyService.BASE_CURRENCY
         
-        # If it's already a currency code, return it
-        if len(user_country) == 3 and user_country.isupper():
-            return user_country
-        
-        # Try to extract country code from country name or code
-        country_code = user_country.upper().strip()
-        
-        # If it's a 2-letter country code, use it directly
-        if len(country_code) == 2:
-            return CurrencyService.get_currency_from_country(country_code)
+        # Country codes and names first (alpha-3 codes look like currency codes)
+        currency = currency_for_country(user_country, None)
+        if currency:
+            return currency
         
-        # Try to map common country names to codes
-        country_name_to_code = {
-            "NIGERIA": "NG",
-            "KENYA": "KE",
-            "GHANA": "GH",
-            "SOUTH AFRICA": "ZA",
-            "UNITED STATES": "US",
-            "USA": "US",
-            "UNITED KINGDOM": "GB",
-            "UK": "GB",
-            "CANADA": "CA",
-            "AUSTRALIA": "AU",
-            "FRANCE": "FR",
-            "GERMANY": "DE",
-            "ITALY": "IT",
-            "SPAIN": "ES",
-            "BRAZIL": "BR",
-            "INDIA": "IN",
-            "CHINA": "CN",
-            "JAPAN": "JP",
-        }
+        # If it's already a currency code, return it
+        code = user_country.strip().upper()
+        if code in CURRENCY_CODES or code in CURRENCY_MINOR_UNITS:
+            return code
         
-        country_code = country_name_to_code.get(country_code, country_code[:2] if len(country_code) >= 2 else "XX")
+        return CurrencyService.BASE_CURRENCY
+    
+    @staticmethod
+    async def currency_for_user(db: Session, user: User) -> str:
+        """
+        Get the user's currency, resolving it from their country once and
+        storing it on the user row (commits the first time)
+        """
+        if user.currency:
+            return user.currency
         
-        return CurrencyService.get_currency_from_country(country_code)
+        currency = await CurrencyService.get_user_currency(user.country)
+        db.query(User).filter(User.id == user.id).update(
+            {User.currency: currency}, synchronize_session=False
+        )
+        db.commit()
+        user.currency = currency
+        return currency
 
@@ -8,21 +8,70 @@ This service manages the activation of digital gifts that are owned by the platf
 - Celebrant Badges: Display badge on profile
 - Featured Messages: Pin message in tribe room
 
-These gifts are instant and don't require third-party APIs.
+These gifts are instant and don't require third-party APIs. Third-party gift
+cards are queued here and fulfilled in the background by gift_card_service.
 """
 
 from datetime import datetime, timedelta
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from app.models import Gift, GiftTypeEnum, User, BirthdayWall, WallPhoto, Room, Message
 import logging
 
 logger = logging.getLogger(__name__)
 
+# How long each gift type stays active after delivery (digital cards never expire)
+GIFT_ACTIVE_DURATIONS = {
+    GiftTypeEnum.CONFETTI_EFFECT: timedelta(hours=24),
+    GiftTypeEnum.CELEBRANT_BADGE: timedelta(hours=24),
+    GiftTypeEnum.WALL_HIGHLIGHT: timedelta(hours=48),
+    GiftTypeEnum.FEATURED_MESSAGE: timedelta(hours=24),
+}
+MAX_ACTIVE_DURATION = max(GIFT_ACTIVE_DURATIONS.values())
+
+# Checked in order against the lowercased gift name
+BADGE_TYPE_KEYWORDS = [
+    ("golden", "golden"),
+    ("diamond", "diamond"),
+    ("platinum", "platinum"),
+    ("royal", "royal"),
+    ("star", "star"),
+    ("legend", "legend"),
+    ("champion", "champion"),
+    ("superstar", "superstar"),
+    ("hero", "hero"),
+    ("magical", "magical"),
+]
+
+# Active gifts per recipient are cached until the next gift expires, but at
+# most this long so gifts delivered by other workers show up
+ACTIVE_GIFTS_CACHE_DURATION = timedelta(seconds=60)
+_active_gifts_cache: Dict[int, Tuple[Dict[str, Any], datetime]] = {}
+
 
 class DigitalGiftService:
     """Service for activating and managing digital gifts"""
     
+    @staticmethod
+    def badge_type_for(gift_name: str) -> str:
+        """Badge type from the gift name (e.g., "Golden Birthday Badge" -> "golden")"""
+        gift_name_lower = gift_name.lower()
+        for keyword, badge_type in BADGE_TYPE_KEYWORDS:
+            if keyword in gift_name_lower:
+                return badge_type
+        return "default"
+    
+    @staticmethod
+    def mark_delivered(gift: Gift, db: Session) -> None:
+        """Mark a gift delivered now, set its expiry and commit it with the rest of the session's changes"""
+        gift.is_delivered = True
+        gift.delivered_at = datetime.utcnow()
+        duration = GIFT_ACTIVE_DURATIONS.get(gift.gift_type)
+        gift.expires_at = gift.delivered_at + duration if duration else None
+        db.commit()
+        _active_gifts_cache.pop(gift.recipient_id, None)
+    
     @staticmethod
     async def activate_gift(
         gift: Gift,
@@ -62,6 +111,9 @@ class DigitalGiftService:
             elif gift.gift_type == GiftTypeEnum.FEATURED_MESSAGE:
                 return await DigitalGiftService._activate_featured_message(gift, recipient, db)
             
+            elif gift.gift_type == GiftTypeEnum.GIFT_CARD:
+                return DigitalGiftService._queue_gift_card(gift, db)
+            
             else:
                 return {
                     "success": False,
@@ -75,6 +127,29 @@ class DigitalGiftService:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _queue_gift_card(gift: Gift, db: Session) -> Dict[str, Any]:
+        """
+        Queue a third-party gift card for background fulfillment
+        - The card code is stored on the gift once the provider issues it
+        """
+        from app.services.gift_card_service import GiftCardService
+        
+        if not gift.gift_card_provider:
+            return {
+                "success": False,
+                "error": "Gift card has no provider"
+            }
+        
+        GiftCardService.enqueue(db, gift)
+        
+        return {
+            "success": True,
+            "message": "Gift card is being issued",
+            "action": "gift_card_pending",
+            "gift_id": gift.id
+        }
+    
     @staticmethod
     async def _activate_digital_card(
         gift: Gift,
@@ -86,9 +161,7 @@ class DigitalGiftService:
         - Mark as delivered
         - Card can be viewed by recipient in their received gifts
         """
-        gift.is_delivered = True
-        gift.delivered_at = datetime.utcnow()
-        db.commit()
+        DigitalGiftService.mark_delivered(gift, db)
         
         return {
             "success": True,
@@ -108,17 +181,13 @@ class DigitalGiftService:
         - Effect lasts for 24 hours
         - Stored in gift record (expires_at calculated)
         """
-        gift.is_delivered = True
-        gift.delivered_at = datetime.utcnow()
-        # Confetti effect expires in 24 hours
-        # We'll check this when displaying the profile
-        db.commit()
+        DigitalGiftService.mark_delivered(gift, db)
         
         return {
             "success": True,
             "message": "Confetti effect activated",
             "action": "show_confetti",
-            "expires_at": (datetime.utcnow() + timedelta(hours=24)).isoformat()
+            "expires_at": gift.expires_at.isoformat()
         }
     
     @staticmethod
@@ -142,9 +211,7 @@ class DigitalGiftService:
         if not wall:
             # If no wall exists, the highlight will be applied when wall is created
             # Store this in a pending highlights table or in gift metadata
-            gift.is_delivered = True
-            gift.delivered_at = datetime.utcnow()
-            db.commit()
+            DigitalGiftService.mark_delivered(gift, db)
             
             return {
                 "success": True,
@@ -162,9 +229,7 @@ class DigitalGiftService:
             # Store highlight info (we'll add a highlights table or use gift metadata)
             # For now, we'll mark the gift as delivered
             # The frontend will check for active highlights when displaying photos
-            gift.is_delivered = True
-            gift.delivered_at = datetime.utcnow()
-            db.commit()
+            DigitalGiftService.mark_delivered(gift, db)
             
             return {
                 "success": True,
@@ -172,13 +237,11 @@ class DigitalGiftService:
                 "action": "highlight_photo",
                 "photo_id": photo.id,
                 "wall_id": wall.id,
-                "expires_at": (datetime.utcnow() + timedelta(hours=48)).isoformat()
+                "expires_at": gift.expires_at.isoformat()
             }
         else:
             # No photos yet, will apply when photo is uploaded
-            gift.is_delivered = True
-            gift.delivered_at = datetime.utcnow()
-            db.commit()
+            DigitalGiftService.mark_delivered(gift, db)
             
             return {
                 "success": True,
@@ -198,40 +261,16 @@ class DigitalGiftService:
         - Badge displays on profile for 24 hours
         - Badge type stored in gift metadata
         """
-        gift.is_delivered = True
-        gift.delivered_at = datetime.utcnow()
-        db.commit()
+        DigitalGiftService.mark_delivered(gift, db)
         
-        # Extract badge type from gift name (e.g., "Golden Birthday Badge" -> "golden")
-        badge_type = "default"
-        gift_name_lower = gift.gift_name.lower()
-        if "golden" in gift_name_lower:
-            badge_type = "golden"
-        elif "diamond" in gift_name_lower:
-            badge_type = "diamond"
-        elif "platinum" in gift_name_lower:
-            badge_type = "platinum"
-        elif "royal" in gift_name_lower or "royalty" in gift_name_lower:
-            badge_type = "royal"
-        elif "star" in gift_name_lower:
-            badge_type = "star"
-        elif "legend" in gift_name_lower:
-            badge_type = "legend"
-        elif "champion" in gift_name_lower:
-            badge_type = "champion"
-        elif "superstar" in gift_name_lower:
-            badge_type = "superstar"
-        elif "hero" in gift_name_lower:
-            badge_type = "hero"
-        elif "magical" in gift_name_lower:
-            badge_type = "magical"
+        badge_type = DigitalGiftService.badge_type_for(gift.gift_name)
         
         return {
             "success": True,
             "message": "Celebrant badge activated",
             "action": "show_badge",
             "badge_type": badge_type,
-            "expires_at": (datetime.utcnow() + timedelta(hours=24)).isoformat()
+            "expires_at": gift.expires_at.isoformat()
         }
     
     @staticmethod
@@ -254,9 +293,7 @@ class DigitalGiftService:
         
         if not room:
             # Room will be created on birthday, message will be featured then
-            gift.is_delivered = True
-            gift.delivered_at = datetime.utcnow()
-            db.commit()
+            DigitalGiftService.mark_delivered(gift, db)
             
             return {
                 "success": True,
@@ -269,9 +306,7 @@ class DigitalGiftService:
         # Note: We might need to create a message record or store it differently
         # For now, we'll mark the gift as delivered
         # The frontend will check for featured messages when displaying the room
-        gift.is_delivered = True
-        gift.delivered_at = datetime.utcnow()
-        db.commit()
+        DigitalGiftService.mark_delivered(gift, db)
         
         return {
             "success": True,
@@ -279,7 +314,7 @@ class DigitalGiftService:
             "action": "pin_message",
             "room_id": room.id,
             "message_text": gift.message or "Happy Birthday!",
-            "expires_at": (datetime.utcnow() + timedelta(hours=24)).isoformat()
+            "expires_at": gift.expires_at.isoformat()
         }
     
     @staticmethod
@@ -293,8 +328,15 @@ class DigitalGiftService:
         - Badges (within 24 hours)
         - Wall highlights (within 48 hours)
         - Featured messages (within 24 hours)
+        - Digital cards (always)
+        
+        Cached per user until the next of these gifts expires.
         """
         now = datetime.utcnow()
+        cached = _active_gifts_cache.get(user_id)
+        if cached and now < cached[1]:
+            return cached[0]
+        
         active_gifts = {
             "confetti_effects": [],
             "badges": [],
@@ -303,91 +345,59 @@ class DigitalGiftService:
             "digital_cards": []
         }
         
-        # Get all delivered gifts for this user
-        gifts = db.query(Gift).filter(
+        delivered = db.query(Gift).filter(
             Gift.recipient_id == user_id,
             Gift.is_delivered == True,
             Gift.payment_status == "completed"
-        ).all()
+        )
+        
+        # Only gifts delivered within the longest window can still be active
+        timed_gifts = delivered.filter(
+            Gift.gift_type.in_(list(GIFT_ACTIVE_DURATIONS)),
+            Gift.delivered_at > now - MAX_ACTIVE_DURATION,
+            or_(Gift.expires_at > now, Gift.expires_at.is_(None))
+        ).order_by(Gift.delivered_at).all()
         
-        for gift in gifts:
-            if not gift.delivered_at:
+        # Digital cards don't expire, they're always viewable
+        cards = delivered.filter(
+            Gift.gift_type == GiftTypeEnum.DIGITAL_CARD,
+            Gift.delivered_at.isnot(None)
+        ).order_by(Gift.delivered_at).all()
+        
+        valid_until = now + ACTIVE_GIFTS_CACHE_DURATION
+        for gift in timed_gifts:
+            # Gifts delivered before expires_at existed get it derived here
+            expires_at = gift.expires_at or gift.delivered_at + GIFT_ACTIVE_DURATIONS[gift.gift_type]
+            if expires_at <= now:
                 continue
-                
-            delivered_at = gift.delivered_at
-            hours_since_delivery = (now - delivered_at).total_seconds() / 3600
+            valid_until = min(valid_until, expires_at)
             
+            entry = {
+                "gift_id": gift.id,
+                "gift_name": gift.gift_name,
+                "delivered_at": gift.delivered_at.isoformat(),
+                "expires_at": expires_at.isoformat()
+            }
             if gift.gift_type == GiftTypeEnum.CONFETTI_EFFECT:
-                if hours_since_delivery < 24:
-                    active_gifts["confetti_effects"].append({
-                        "gift_id": gift.id,
-                        "gift_name": gift.gift_name,
-                        "delivered_at": delivered_at.isoformat(),
-                        "expires_at": (delivered_at + timedelta(hours=24)).isoformat()
-                    })
-            
+                active_gifts["confetti_effects"].append(entry)
             elif gift.gift_type == GiftTypeEnum.CELEBRANT_BADGE:
-                if hours_since_delivery < 24:
-                    badge_type = "default"
-                    gift_name_lower = gift.gift_name.lower()
-                    if "golden" in gift_name_lower:
-                        badge_type = "golden"
-                    elif "diamond" in gift_name_lower:
-                        badge_type = "diamond"
-                    elif "platinum" in gift_name_lower:
-                        badge_type = "platinum"
-                    elif "royal" in gift_name_lower or "royalty" in gift_name_lower:
-                        badge_type = "royal"
-                    elif "star" in gift_name_lower:
-                        badge_type = "star"
-                    elif "legend" in gift_name_lower:
-                        badge_type = "legend"
-                    elif "champion" in gift_name_lower:
-                        badge_type = "champion"
-                    elif "superstar" in gift_name_lower:
-                        badge_type = "superstar"
-                    elif "hero" in gift_name_lower:
-                        badge_type = "hero"
-                    elif "magical" in gift_name_lower:
-                        badge_type = "magical"
-                    
-                    active_gifts["badges"].append({
-                        "gift_id": gift.id,
-                        "gift_name": gift.gift_name,
-                        "badge_type": badge_type,
-                        "delivered_at": delivered_at.isoformat(),
-                        "expires_at": (delivered_at + timedelta(hours=24)).isoformat()
-                    })
-            
+                entry["badge_type"] = DigitalGiftService.badge_type_for(gift.gift_name)
+                active_gifts["badges"].append(entry)
             elif gift.gift_type == GiftTypeEnum.WALL_HIGHLIGHT:
-                if hours_since_delivery < 48:
-                    active_gifts["wall_highlights"].append({
-                        "gift_id": gift.id,
-                        "gift_name": gift.gift_name,
-                        "delivered_at": delivered_at.isoformat(),
-                        "expires_at": (delivered_at + timedelta(hours=48)).isoformat()
-                    })
-            
+                active_gifts["wall_highlights"].append(entry)
             elif gift.gift_type == GiftTypeEnum.FEATURED_MESSAGE:
-                if hours_since_delivery < 24:
-                    active_gifts["featured_messages"].append({
-                        "gift_id": gift.id,
-                        "gift_name": gift.gift_name,
-                        "message": gift.message,
-                        "sender_id": gift.sender_id,
-                        "delivered_at": delivered_at.isoformat(),
-                        "expires_at": (delivered_at + timedelta(hours=24)).isoformat()
-                    })
-            
-            elif gift.gift_type == GiftTypeEnum.DIGITAL_CARD:
-                # Digital cards don't expire, they're always viewable
-                active_gifts["digital_cards"].append({
-                    "gift_id": gift.id,
-                    "gift_name": gift.gift_name,
-                    "message": gift.message,
-                    "sender_id": gift.sender_id,
-                    "delivered_at": delivered_at.isoformat()
-                })
+                entry["message"] = gift.message
+                entry["sender_id"] = gift.sender_id
+                active_gifts["featured_messages"].append(entry)
+        
+        for gift in cards:
+            active_gifts["digital_cards"].append({
+                "gift_id": gift.id,
+                "gift_name": gift.gift_name,
+                "message": gift.message,
+                "sender_id": gift.sender_id,
+                "delivered_at": gift.delivered_at.isoformat()
+            })
         
+        _active_gifts_cache[user_id] = (active_gifts, valid_until)
         return active_gifts
-
@@ -6,10 +6,32 @@ import os
 import hashlib
 import hmac
 import json
+import secrets
+import time
+import uuid
 from typing import Dict, Optional
 from decimal import Decimal
-import httpx
 from app.core.config import settings
+from app.core.http_client import register_client, get_client
+
+register_client(
+    "flutterwave",
+    timeout=30.0,
+    max_connections=50,
+    max_keepalive_connections=20
+)
+
+
+def _uuid7() -> uuid.UUID:
+    """RFC 9562 UUIDv7: 48-bit Unix milliseconds, version, variant, 74 random bits"""
+    unix_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(secrets.token_bytes(10), "big")
+    value = (unix_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                      # version
+    value |= (rand >> 62 & 0xFFF) << 64     # rand_a (12 bits)
+    value |= 0b10 << 62                     # variant
+    value |= rand & ((1 << 62) - 1)         # rand_b (62 bits)
+    return uuid.UUID(int=value)
 
 
 class FlutterwaveService:
@@ -72,15 +94,13 @@ class FlutterwaveService:
         if meta_data:
             payload["meta"] = meta_data
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                headers=FlutterwaveService.get_headers(),
-                json=payload,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await get_client("flutterwave").post(
+            url,
+            headers=FlutterwaveService.get_headers(),
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
     
     @staticmethod
     async def verify_payment(transaction_id: str) -> Dict:
@@ -95,14 +115,33 @@ class FlutterwaveService:
         """
         url = f"{FlutterwaveService.BASE_URL}/transactions/{transaction_id}/verify"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers=FlutterwaveService.get_headers(),
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await get_client("flutterwave").get(
+            url,
+            headers=FlutterwaveService.get_headers()
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    async def verify_by_reference(tx_ref: str) -> Dict:
+        """
+        Verify a payment transaction by our transaction reference
+        
+        Args:
+            tx_ref: Transaction reference the payment was initialized with
+            
+        Returns:
+            Transaction verification response
+        """
+        url = f"{FlutterwaveService.BASE_URL}/transactions/verify_by_reference"
+        
+        response = await get_client("flutterwave").get(
+            url,
+            headers=FlutterwaveService.get_headers(),
+            params={"tx_ref": tx_ref}
+        )
+        response.raise_for_status()
+        return response.json()
     
     @staticmethod
     def verify_webhook_signature(payload: str, signature: str) -> bool:
@@ -127,9 +166,12 @@ class FlutterwaveService:
         return hmac.compare_digest(expected_signature, signature)
     
     @staticmethod
-    def generate_tx_ref(gift_id: int) -> str:
-        """Generate unique transaction reference"""
-        import secrets
-        random_suffix = secrets.token_hex(4)
-        return f"HBM-GIFT-{gift_id}-{random_suffix}"
+    def generate_tx_ref() -> str:
+        """
+        Generate a unique transaction reference before the gift is inserted.
+        
+        UUIDv7: time-ordered, so new references stay clustered at the end of
+        the payment_intent_id index.
+        """
+        return f"HBM-GIFT-{_uuid7()}"
 
@@ -1,28 +1,71 @@
 """
-Gift Card Service - Handles integration with third-party gift card providers
+Gift Card Service - Fulfills third-party gift cards in the background
 
-This service provides a unified interface for purchasing and delivering gift cards
-from various providers like Amazon, Netflix, Spotify, etc.
+When a gift card's payment completes, activation stores a job in
+gift_card_jobs and returns immediately; checkout never waits on a provider.
+A small pool of worker tasks claims due jobs, purchases the card from the
+provider registered under the catalog item's provider_key, stores the code
+on the gift and marks it delivered.
 
-Integration Options:
-1. Tango Card API (https://www.tangocard.com/) - Aggregator for multiple brands
-2. Giftbit API (https://www.giftbit.com/) - Gift card marketplace
-3. Blackhawk Network - Enterprise gift card solutions
-4. Direct API integrations (if available from providers)
+Each provider has its own token bucket (requests per second) and circuit
+breaker: after FAILURE_THRESHOLD consecutive failures its jobs are left
+alone for BREAKER_COOLDOWN, then a single trial purchase decides whether the
+circuit closes again. Both are per process.
 
-For now, this is a placeholder structure that can be implemented when you:
-1. Sign up for a gift card API service
-2. Get API credentials
-3. Implement the actual API calls
+Claims, retries and the worker pool come from leased_queue. Failed purchases
+are retried with jittered exponential backoff and dead-lettered after
+MAX_ATTEMPTS, on a permanent error, or when no provider is registered for the
+job. `python database/replay_queue.py --queue gift_cards` re-queues them.
+
+Real integrations (Tango Card, Giftbit, direct brand APIs) subclass
+GiftCardProviderClient and call register_provider() at import time. With
+GIFT_CARD_SIMULATED_PROVIDER enabled, a simulated provider is registered for
+every brand so the whole flow can run without credentials.
 """
 
-from typing import Optional, Dict, Any
+import asyncio
+import logging
+import random
+import secrets
+import time
+from datetime import datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import insert_or_ignore
+from app.models import Gift, GiftCardJob
+from app.services.digital_gift_service import DigitalGiftService
+from app.services.leased_queue import LeasedQueue, QueueWorker
 
 logger = logging.getLogger(__name__)
 
+WORKER_CONCURRENCY = 4
+# Idle workers poll this often (new jobs also wake them immediately)
+POLL_INTERVAL_SECONDS = 5.0
+# A claimed job is re-claimable once this lease runs out (crashed worker)
+CLAIM_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 8
+RETRY_BACKOFF_BASE = timedelta(seconds=30)
+RETRY_BACKOFF_MAX = timedelta(hours=1)
+
+# Circuit breaker
+FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN = timedelta(seconds=60)
+
+gift_card_queue = LeasedQueue(
+    GiftCardJob,
+    enqueued_at=GiftCardJob.created_at,
+    done_status="fulfilled",
+    lease=CLAIM_LEASE,
+    max_attempts=MAX_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX,
+    claim_batch=WORKER_CONCURRENCY * 2
+)
+
 
 class GiftCardProvider(str, Enum):
     """Supported gift card providers"""
@@ -43,152 +86,273 @@ class GiftCardProvider(str, Enum):
     MASTERCLASS = "masterclass"
 
 
-class GiftCardService:
+class GiftCardFulfillmentError(Exception):
+    """A provider could not issue a card; retryable=False dead-letters the job"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class GiftCardProviderClient:
     """
-    Service for purchasing and managing gift cards from third-party providers
-    
-    This is a placeholder implementation. To make it work:
-    
-    1. Choose a gift card API provider (recommended: Tango Card or Giftbit)
-    2. Sign up and get API credentials
-    3. Install their SDK or use their REST API
-    4. Implement the purchase_gift_card method
-    5. Add error handling and webhook support for delivery status
+    Base class for gift card provider integrations.
+
+    Subclasses implement purchase(); rate_per_second and burst size the
+    provider's token bucket.
     """
-    
-    def __init__(self):
-        # TODO: Initialize API client with credentials from environment variables
-        # Example:
-        # self.tango_client = TangoCardClient(
-        #     api_key=os.getenv("TANGO_CARD_API_KEY"),
-        #     environment=os.getenv("TANGO_CARD_ENV", "sandbox")
-        # )
-        pass
-    
-    async def purchase_gift_card(
-        self,
-        provider: GiftCardProvider,
-        amount: Decimal,
-        currency: str = "USD",
-        recipient_email: Optional[str] = None,
-        recipient_name: Optional[str] = None,
-        message: Optional[str] = None
-    ) -> Dict[str, Any]:
+    rate_per_second: float = 5.0
+    burst: int = 5
+
+    async def purchase(self, reference: str, amount: Decimal, currency: str) -> Dict[str, Any]:
         """
-        Purchase a gift card from a provider
-        
+        Buy a gift card.
+
         Args:
-            provider: The gift card provider (Amazon, Netflix, etc.)
-            amount: The gift card amount
-            currency: Currency code (default: USD)
-            recipient_email: Email to send the gift card to
-            recipient_name: Name of the recipient
-            message: Optional message to include
-            
+            reference: Our idempotency key for the order; a retry with the same
+                reference must not issue a second card
+            amount: Face value
+            currency: Currency code
+
         Returns:
-            Dict containing:
-                - success: bool
-                - gift_card_code: str (the actual code)
-                - gift_card_url: str (link to redeem)
-                - provider_reference: str (provider's transaction ID)
-                - error: Optional[str]
+            Dict with "code" and "reference" (the provider's order id)
+
+        Raises:
+            GiftCardFulfillmentError: The provider refused or failed the order
         """
-        
-        # TODO: Implement actual API call
-        # Example with Tango Card:
-        # try:
-        #     response = await self.tango_client.create_order(
-        #         account_identifier=provider.value,
-        #         amount=amount,
-        #         recipient_email=recipient_email,
-        #         message=message
-        #     )
-        #     return {
-        #         "success": True,
-        #         "gift_card_code": response.gift_card_code,
-        #         "gift_card_url": response.gift_card_url,
-        #         "provider_reference": response.order_id
-        #     }
-        # except Exception as e:
-        #     logger.error(f"Failed to purchase gift card: {e}")
-        #     return {
-        #         "success": False,
-        #         "error": str(e)
-        #     }
-        
-        # Placeholder response
-        logger.warning(f"Gift card purchase not implemented. Provider: {provider}, Amount: {amount}")
-        return {
-            "success": False,
-            "error": "Gift card service not yet configured. Please integrate with a gift card API provider."
+        raise NotImplementedError
+
+
+class SimulatedGiftCardProvider(GiftCardProviderClient):
+    """Issues fake codes after a short delay, failing a fraction of orders"""
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, rate_per_second: float = 5.0, burst: int = 5):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.orders: Dict[str, Dict[str, Any]] = {}
+
+    async def purchase(self, reference: str, amount: Decimal, currency: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        if reference in self.orders:
+            return self.orders[reference]
+        if random.random() < self.failure_rate:
+            raise GiftCardFulfillmentError("Simulated provider error")
+        order = {
+            "code": "-".join(secrets.token_hex(2).upper() for _ in range(4)),
+            "reference": f"sim_{secrets.token_hex(8)}"
         }
-    
-    async def check_gift_card_status(
-        self,
-        provider_reference: str
-    ) -> Dict[str, Any]:
+        self.orders[reference] = order
+        return order
+
+
+class TokenBucket:
+    """Allows rate_per_second acquisitions on average, in bursts of up to capacity"""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: timedelta = BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown.total_seconds()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def available(self) -> bool:
+        """Whether a call would currently be allowed (does not reserve it)"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_in_flight)
+
+    def allow(self) -> bool:
+        """Reserve a call; in half-open state only one trial is let through"""
+        if not self.available():
+            return False
+        if self.state == "half_open":
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+
+_providers: Dict[str, GiftCardProviderClient] = {}
+_buckets: Dict[str, TokenBucket] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def register_provider(key: str, client: GiftCardProviderClient) -> None:
+    """Register the client that fulfills catalog items with this provider_key"""
+    _providers[key] = client
+    _buckets[key] = TokenBucket(client.rate_per_second, client.burst)
+    _breakers[key] = CircuitBreaker()
+
+
+def get_provider(key: str) -> Optional[GiftCardProviderClient]:
+    return _providers.get(key)
+
+
+if settings.GIFT_CARD_SIMULATED_PROVIDER:
+    _simulated_provider = SimulatedGiftCardProvider()
+    for _provider in GiftCardProvider:
+        register_provider(_provider.value, _simulated_provider)
+
+
+class GiftCardService:
+    """Service for the gift card fulfillment queue"""
+
+    @staticmethod
+    def enqueue(db: Session, gift: Gift) -> Optional[int]:
         """
-        Check the status of a gift card order
-        
-        Args:
-            provider_reference: The provider's transaction/order ID
-            
+        Queue fulfillment of a paid gift card (commits); safe to call repeatedly.
+
         Returns:
-            Dict with status information
+            The new job id, or None if the gift already has a job
         """
-        # TODO: Implement status check
-        return {
-            "status": "unknown",
-            "error": "Status check not implemented"
-        }
-    
-    def get_supported_providers(self) -> list[GiftCardProvider]:
-        """Get list of supported gift card providers"""
-        return list(GiftCardProvider)
-    
-    def is_provider_available(self, provider: GiftCardProvider) -> bool:
-        """Check if a provider is available for purchase"""
-        # TODO: Check provider availability from API
-        return True
+        now = datetime.utcnow()
+        job_id = insert_or_ignore(db, GiftCardJob, {
+            "gift_id": gift.id,
+            "provider_key": gift.gift_card_provider,
+            "amount": gift.amount,
+            "currency": gift.currency,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        }, ["gift_id"])
+        db.commit()
+        if job_id is not None:
+            gift_card_worker.notify()
+        return job_id
 
+    @staticmethod
+    def blocked_providers() -> List[str]:
+        """Providers whose circuit currently rejects calls"""
+        return [key for key, breaker in _breakers.items() if not breaker.available()]
 
-# Example integration guide for Tango Card:
-"""
-To integrate with Tango Card API:
+    @staticmethod
+    def claim_next(db: Session, now: Optional[datetime] = None) -> Optional[GiftCardJob]:
+        """Claim one due job for processing (commits); jobs for providers with an open circuit are skipped"""
+        blocked = GiftCardService.blocked_providers()
+        criteria = [GiftCardJob.provider_key.notin_(blocked)] if blocked else []
+        return gift_card_queue.claim_next(db, *criteria, now=now)
 
-1. Sign up at https://www.tangocard.com/
-2. Get API credentials (API Key, Platform Name, Platform Key)
-3. Install SDK: pip install tangocard-sdk
-4. Update this service:
+    @staticmethod
+    def _finish(db: Session, job: GiftCardJob, **values) -> None:
+        gift_card_queue.finish(db, job.id, **values)
+        db.commit()
 
-from tangocard import TangoCardClient
+    @staticmethod
+    async def process_claimed(db: Session, job: GiftCardJob) -> str:
+        """
+        Purchase the card for a claimed job and record the outcome (commits).
 
-class GiftCardService:
-    def __init__(self):
-        self.client = TangoCardClient(
-            api_key=os.getenv("TANGO_CARD_API_KEY"),
-            platform_name=os.getenv("TANGO_CARD_PLATFORM_NAME"),
-            platform_key=os.getenv("TANGO_CARD_PLATFORM_KEY"),
-            environment=os.getenv("TANGO_CARD_ENV", "sandbox")
-        )
-    
-    async def purchase_gift_card(self, provider, amount, ...):
-        # Map provider to Tango Card catalog item
-        catalog_item = self._map_provider_to_catalog(provider)
-        
-        # Create order
-        order = await self.client.create_order(
-            account_identifier=catalog_item,
-            amount=int(amount * 100),  # Convert to cents
-            recipient_email=recipient_email,
-            message=message
+        Returns:
+            The job's new status
+        """
+        gift = db.query(Gift).filter(Gift.id == job.gift_id).first()
+        if gift is None or gift.is_delivered:
+            GiftCardService._finish(db, job, status="fulfilled", fulfilled_at=datetime.utcnow())
+            return "fulfilled"
+
+        provider = get_provider(job.provider_key)
+        if provider is None:
+            GiftCardService._finish(db, job, status="dead", last_error=f"No provider registered for {job.provider_key}")
+            logger.error(f"Gift card job {job.id} dead-lettered: no provider {job.provider_key}")
+            return "dead"
+
+        breaker = _breakers[job.provider_key]
+        if not breaker.allow():
+            # Circuit opened after the claim; hand the job back without using an attempt
+            GiftCardService._finish(
+                db, job,
+                status="pending",
+                attempts=GiftCardJob.attempts - 1,
+                next_attempt_at=datetime.utcnow() + BREAKER_COOLDOWN
+            )
+            return "pending"
+
+        await _buckets[job.provider_key].acquire()
+        try:
+            order = await provider.purchase(f"gift-{job.gift_id}", Decimal(job.amount), job.currency)
+        except Exception as e:
+            permanent = isinstance(e, GiftCardFulfillmentError) and not e.retryable
+            if permanent:
+                # The provider answered; it is not unhealthy
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            status = gift_card_queue.fail(db, job, e, permanent=permanent)
+            db.commit()
+            if status == "dead":
+                logger.error(f"Gift card job {job.id} dead-lettered: {e}")
+            else:
+                logger.warning(f"Gift card job {job.id} failed (attempt {job.attempts}): {e}")
+            return status
+
+        breaker.record_success()
+        # The code, the delivery and the job's outcome are committed together
+        gift.gift_card_code = order["code"]
+        gift_card_queue.finish(
+            db, job.id,
+            status="fulfilled",
+            provider_reference=order.get("reference"),
+            fulfilled_at=datetime.utcnow(),
+            last_error=None
         )
-        
-        return {
-            "success": True,
-            "gift_card_code": order.gift_card_code,
-            "gift_card_url": order.gift_card_url,
-            "provider_reference": order.order_id
-        }
-"""
+        DigitalGiftService.mark_delivered(gift, db)
+        return "fulfilled"
+
+    @staticmethod
+    def requeue(
+        db: Session,
+        job_ids: Optional[List[int]] = None,
+        statuses: tuple = ("dead",),
+        stuck_for: Optional[timedelta] = None
+    ) -> int:
+        """Put jobs back in the queue with a fresh attempt budget (commits); see LeasedQueue.requeue"""
+        return gift_card_queue.requeue(db, job_ids, statuses, stuck_for)
+
 
+gift_card_worker = QueueWorker(
+    "gift-card-worker",
+    GiftCardService.claim_next,
+    GiftCardService.process_claimed,
+    concurrency=WORKER_CONCURRENCY,
+    poll_interval=POLL_INTERVAL_SECONDS
+)
@@ -0,0 +1,188 @@
+"""
+Gift Catalog Service
+Serves the gift catalog, pre-converted into every currency we have a rate for.
+
+The active catalog rows are loaded once and kept in memory. From those rows
+and the current USD rate table, the materializer builds every currency's
+response body in a single pass (prices rounded to each currency's ISO 4217
+minor units), serializes it once and tags it with an ETag. Catalog requests
+are then a dictionary lookup.
+
+The materialized catalog is rebuilt when the rate table changes (checked on
+request, no DB access needed) and when catalog rows change (checked by the
+gift_catalog_refresh job, or immediately after invalidate()). Rebuilds run in
+a worker thread, never on the event loop, and once per rate table version.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+
+from app.core.database import SessionLocal
+from app.models import GiftCatalog
+from app.services.currency_service import CurrencyService
+
+logger = logging.getLogger(__name__)
+
+# (body bytes, etag) for one currency
+CatalogEntry = Tuple[bytes, str]
+
+_lock = threading.Lock()
+# Serializes rebuilds for a new rate table, so concurrent requests do it once
+_rebuild_lock = threading.Lock()
+# Active catalog rows as plain dicts, in display order
+_rows: Optional[List[Dict]] = None
+# (row count, last updated_at) of the rows above
+_catalog_fingerprint: Optional[Tuple] = None
+# Rate table version the entries were built from
+_rates_version: Optional[datetime] = None
+_entries: Dict[str, CatalogEntry] = {}
+
+
+class GiftCatalogService:
+    """Service for the materialized, per-currency gift catalog"""
+
+    @staticmethod
+    def _fingerprint(db: Session) -> Tuple:
+        count, last_updated = db.query(
+            func.count(GiftCatalog.id),
+            func.max(GiftCatalog.updated_at)
+        ).one()
+        return (count, last_updated)
+
+    @staticmethod
+    def _load_rows(db: Session) -> List[Dict]:
+        gifts = db.query(GiftCatalog).filter(
+            GiftCatalog.is_active == True
+        ).order_by(GiftCatalog.display_order).all()
+        return [
+            {
+                "id": gift.id,
+                "name": gift.name,
+                "description": gift.description,
+                "gift_type": gift.gift_type.value,
+                "price": Decimal(gift.price),
+                "image_url": gift.image_url,
+                "is_featured": gift.is_featured
+            }
+            for gift in gifts
+        ]
+
+    @staticmethod
+    def _materialize(rows: List[Dict], usd_rates: Dict[str, float]) -> Dict[str, CatalogEntry]:
+        """Build the serialized catalog body and ETag for every currency"""
+        base = CurrencyService.BASE_CURRENCY
+        base_prices = [row["price"] for row in rows]
+        base_floats = [float(price) for price in base_prices]
+
+        entries = {}
+        for currency, rate in usd_rates.items():
+            if not rate:
+                continue
+            rate = Decimal(str(rate))
+            gifts = [
+                {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "description": row["description"],
+                    "gift_type": row["gift_type"],
+                    "price": float(CurrencyService.round_amount(price * rate, currency)),
+                    "currency": currency,
+                    "base_price": base_float,
+                    "base_currency": base,
+                    "image_url": row["image_url"],
+                    "is_featured": row["is_featured"]
+                }
+                for row, price, base_float in zip(rows, base_prices, base_floats)
+            ]
+            body = json.dumps(
+                {"gifts": gifts, "user_currency": currency},
+                separators=(",", ":")
+            ).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            entries[currency] = (body, etag)
+
+        if base not in entries:
+            entries.update(GiftCatalogService._materialize(rows, {base: 1.0}))
+        return entries
+
+    @staticmethod
+    def _rebuild(rows: List[Dict], fingerprint: Optional[Tuple], usd_rates: Dict[str, float]) -> None:
+        global _rows, _catalog_fingerprint, _rates_version, _entries
+        version = CurrencyService.rates_version()
+        entries = GiftCatalogService._materialize(rows, usd_rates)
+        with _lock:
+            _rows = rows
+            _catalog_fingerprint = fingerprint
+            _rates_version = version
+            _entries = entries
+
+    @staticmethod
+    def _rebuild_for_rates(usd_rates: Dict[str, float]) -> None:
+        """Rebuild the loaded rows for a new rate table unless another caller already did"""
+        with _rebuild_lock:
+            if _rows is None or CurrencyService.rates_version() == _rates_version:
+                return
+            GiftCatalogService._rebuild(_rows, _catalog_fingerprint, usd_rates)
+
+    @staticmethod
+    def refresh(db: Session, usd_rates: Dict[str, float], force: bool = False) -> bool:
+        """
+        Reload catalog rows and rebuild if they changed since the last build.
+
+        Returns:
+            True if the catalog was rebuilt
+        """
+        fingerprint = GiftCatalogService._fingerprint(db)
+        if not force and _rows is not None and fingerprint == _catalog_fingerprint:
+            return False
+        GiftCatalogService._rebuild(GiftCatalogService._load_rows(db), fingerprint, usd_rates)
+        return True
+
+    @staticmethod
+    def invalidate() -> None:
+        """Drop the materialized catalog so the next request reloads the rows"""
+        global _rows
+        with _lock:
+            _rows = None
+
+    @staticmethod
+    async def get_catalog(currency: str) -> CatalogEntry:
+        """
+        Get the serialized catalog and ETag for a currency.
+
+        Falls back to the base currency when there is no rate for `currency`.
+        Only touches the database when no rows are loaded yet.
+        """
+        usd_rates = await CurrencyService.get_exchange_rates(CurrencyService.BASE_CURRENCY)
+
+        if _rows is None:
+            await asyncio.to_thread(GiftCatalogService._refresh_in_session, usd_rates, True)
+        elif CurrencyService.rates_version() != _rates_version:
+            await asyncio.to_thread(GiftCatalogService._rebuild_for_rates, usd_rates)
+
+        entries = _entries
+        return entries.get(currency) or entries[CurrencyService.BASE_CURRENCY]
+
+    @staticmethod
+    def _refresh_in_session(usd_rates: Dict[str, float], force: bool = False) -> bool:
+        db = SessionLocal()
+        try:
+            return GiftCatalogService.refresh(db, usd_rates, force)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def run_refresh() -> bool:
+        """Scheduled entry point: rebuild the catalog if its rows changed"""
+        usd_rates = await CurrencyService.get_exchange_rates(CurrencyService.BASE_CURRENCY)
+        rebuilt = await asyncio.to_thread(GiftCatalogService._refresh_in_session, usd_rates)
+        if rebuilt:
+            logger.info(f"Gift catalog materialized for {len(_entries)} currencies")
+        return rebuilt
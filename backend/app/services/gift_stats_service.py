@@ -0,0 +1,97 @@
+"""
+Gift Statistics Service
+Maintains the per-user gift counters (users.gifts_sent_count and
+users.gifts_received_count) so gift history endpoints can report totals
+without counting over the gifts table.
+
+Like the lists they total, gifts_sent_count counts every gift a user has
+sent, whatever its payment status, while gifts_received_count only counts
+completed gifts. Counters are adjusted in the caller's transaction when a
+gift is created (sent) and when its payment completes (received); a nightly
+reconciler recomputes them from gifts to repair any drift.
+"""
+from collections import Counter
+from typing import Dict, Iterable
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import SessionLocal
+from app.models import Gift, User
+
+logger = logging.getLogger(__name__)
+
+
+class GiftStatsService:
+    """Service for maintaining per-user gift counters"""
+
+    @staticmethod
+    def _increment(db: Session, column_name: str, user_ids: Iterable[int]) -> None:
+        counts = Counter(user_ids)
+        if not counts:
+            return
+        table = User.__table__
+        column = table.c[column_name]
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_user_id")).values(
+                {column_name: column + bindparam("b_delta")}
+            ),
+            [{"b_user_id": user_id, "b_delta": delta} for user_id, delta in counts.items()]
+        )
+
+    @staticmethod
+    def record_sent(db: Session, sender_id: int) -> None:
+        """Count a newly created gift for its sender (not committed here)"""
+        GiftStatsService._increment(db, "gifts_sent_count", [sender_id])
+
+    @staticmethod
+    def record_received(db: Session, recipient_ids: Iterable[int]) -> None:
+        """Count gifts whose payment just completed for their recipients (not committed here)"""
+        GiftStatsService._increment(db, "gifts_received_count", recipient_ids)
+
+    @staticmethod
+    def reconcile(db: Session) -> Dict[str, int]:
+        """
+        Recompute both counters from the gifts table, writing only users that drifted.
+
+        The caller is responsible for committing.
+
+        Returns:
+            Dict with the number of users corrected per counter
+        """
+        sent = select(func.count(Gift.id)).where(
+            Gift.sender_id == User.id
+        ).scalar_subquery()
+        received = select(func.count(Gift.id)).where(
+            Gift.recipient_id == User.id,
+            Gift.payment_status == "completed"
+        ).scalar_subquery()
+
+        sent_corrected = db.execute(
+            update(User).where(User.gifts_sent_count != sent).values(
+                gifts_sent_count=sent
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        received_corrected = db.execute(
+            update(User).where(User.gifts_received_count != received).values(
+                gifts_received_count=received
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+        return {"sent_corrected": sent_corrected, "received_corrected": received_corrected}
+
+    @staticmethod
+    def run_reconciliation() -> Dict[str, int]:
+        """Scheduled entry point: reconcile gift counters in its own session"""
+        db = SessionLocal()
+        try:
+            result = GiftStatsService.reconcile(db)
+            db.commit()
+            if any(result.values()):
+                logger.warning(f"Gift counter drift repaired: {result}")
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,276 @@
+"""
+Leased Queue
+Claim, retry and re-queue machinery shared by the tables that background
+workers drain: the payment webhook inbox, the gift card job queue and the
+payment outbox.
+
+A queue table has status, attempts, next_attempt_at and locked_until
+columns. A due item is claimed with a conditional UPDATE that moves it to
+"processing" under a lease and counts the attempt, so concurrent workers (in
+this or other processes) never work on the same item at once, and an item
+whose worker died is claimed again once its lease runs out. Failures are
+retried with jittered exponential backoff.
+
+QueueWorker runs a small pool of asyncio tasks that claim and process items,
+polling when idle and woken early by notify(). database/replay_queue.py
+re-queues dead or stuck items.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = ("pending", "processing")
+
+
+class LeasedQueue:
+    """Leased claims, backoff and re-queueing over one queue table"""
+
+    def __init__(
+        self,
+        model,
+        enqueued_at,
+        done_status: str,
+        dead_status: str = "dead",
+        lease: timedelta = timedelta(minutes=5),
+        max_attempts: int = 8,
+        backoff_base: timedelta = timedelta(seconds=30),
+        backoff_max: timedelta = timedelta(hours=1),
+        claim_batch: int = 8
+    ):
+        """
+        Args:
+            model: Mapped class of the queue table
+            enqueued_at: Column recording when an item was queued (for stuck items)
+            done_status: Status of items that finished successfully
+            dead_status: Status of items that will not be retried
+            lease: How long a claim holds an item before it can be re-claimed
+            max_attempts: Attempts before a failing item is given up on
+            backoff_base: Retry delay ceiling after the first attempt (doubles per attempt)
+            backoff_max: Largest retry delay ceiling
+            claim_batch: Due candidates read per claim
+        """
+        self.model = model
+        self.enqueued_at = enqueued_at
+        self.done_status = done_status
+        self.dead_status = dead_status
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.claim_batch = claim_batch
+
+    def due(self, now: datetime):
+        """Criterion for items that can be claimed at `now`"""
+        model = self.model
+        return or_(
+            (model.status == "pending") & (model.next_attempt_at <= now),
+            (model.status == "processing") & (model.locked_until <= now)
+        )
+
+    def claim_next(self, db: Session, *criteria, now: Optional[datetime] = None) -> Optional[Any]:
+        """
+        Claim one due item matching `criteria` (commits).
+
+        Returns:
+            The claimed item, or None if nothing was due
+        """
+        model = self.model
+        now = now or datetime.utcnow()
+        due = self.due(now)
+        candidates = db.query(model.id).filter(due, *criteria).order_by(
+            model.next_attempt_at
+        ).limit(self.claim_batch).all()
+
+        for (item_id,) in candidates:
+            claimed = db.execute(
+                update(model).where(
+                    model.id == item_id,
+                    due
+                ).values(
+                    status="processing",
+                    locked_until=now + self.lease,
+                    attempts=model.attempts + 1
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return db.query(model).filter(model.id == item_id).first()
+        return None
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Jittered exponential backoff after `attempts` failed attempts"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return timedelta(seconds=random.uniform(ceiling.total_seconds() / 2, ceiling.total_seconds()))
+
+    def finish(self, db: Session, item_id: int, *criteria, **values) -> int:
+        """
+        Record an attempt's outcome and release the lease (does not commit).
+
+        Returns:
+            Number of rows updated (0 if `criteria` no longer match)
+        """
+        model = self.model
+        return db.execute(
+            update(model).where(model.id == item_id, *criteria).values(
+                locked_until=None, **values
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def fail(self, db: Session, item, error: Exception, permanent: bool = False) -> str:
+        """
+        Reschedule a failed attempt, or give up after max_attempts (does not commit).
+
+        Returns:
+            The item's new status
+        """
+        if permanent or item.attempts >= self.max_attempts:
+            self.finish(db, item.id, status=self.dead_status, last_error=str(error))
+            return self.dead_status
+        self.finish(
+            db, item.id,
+            status="pending",
+            last_error=str(error),
+            next_attempt_at=datetime.utcnow() + self.retry_delay(item.attempts)
+        )
+        return "pending"
+
+    def stuck(self, stuck_for: timedelta):
+        """Criterion for items still retrying that were queued longer ago than `stuck_for`"""
+        return self.model.status.in_(RETRYABLE_STATUSES) & (
+            self.enqueued_at <= datetime.utcnow() - stuck_for
+        )
+
+    def requeue(
+        self,
+        db: Session,
+        item_ids: Optional[List[int]] = None,
+        statuses: Optional[tuple] = None,
+        stuck_for: Optional[timedelta] = None
+    ) -> int:
+        """
+        Put items back in the queue with a fresh attempt budget (commits).
+
+        Args:
+            item_ids: Only these items (any status except done)
+            statuses: Otherwise, every item in these statuses (default: dead items)
+            stuck_for: Also re-queue pending/processing items queued longer ago than this
+
+        Returns:
+            Number of items re-queued
+        """
+        model = self.model
+        if item_ids:
+            selector = model.id.in_(item_ids) & (model.status != self.done_status)
+        else:
+            selector = model.status.in_((self.dead_status,) if statuses is None else statuses)
+            if stuck_for is not None:
+                selector = or_(selector, self.stuck(stuck_for))
+
+        requeued = db.execute(
+            update(model).where(selector).values(
+                status="pending",
+                attempts=0,
+                next_attempt_at=datetime.utcnow(),
+                locked_until=None
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return requeued
+
+    def dead_or_stuck(self, db: Session, stuck_for: timedelta) -> list:
+        """Dead items and items still retrying that were queued longer ago than `stuck_for`"""
+        model = self.model
+        return db.query(model).filter(
+            or_(model.status == self.dead_status, self.stuck(stuck_for))
+        ).order_by(self.enqueued_at).all()
+
+
+class QueueWorker:
+    """Pool of asyncio tasks draining a queue"""
+
+    def __init__(
+        self,
+        name: str,
+        claim: Callable[[Session], Optional[Any]],
+        process: Callable[[Session, Any], Awaitable[Any]],
+        concurrency: int = 4,
+        poll_interval: float = 5.0
+    ):
+        """
+        Args:
+            name: Used for task names and log messages
+            claim: Claims the next due item (commits), or returns None
+            process: Processes a claimed item and records its outcome
+            concurrency: Number of worker tasks
+            poll_interval: Seconds an idle worker waits before looking again
+        """
+        self.name = name
+        self.claim = claim
+        self.process = process
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"{self.name}-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers; an item interrupted mid-processing is re-claimed after its lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers (called after a new item is stored)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> bool:
+        """Claim and process a single due item. Returns False if none was due."""
+        db = SessionLocal()
+        try:
+            item = self.claim(db)
+            if item is None:
+                return False
+            await self.process(db, item)
+            return True
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before looking, so a notify() during the lookup is not lost
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,101 @@
+"""
+Lifecycle Service
+Flips the stored state of rooms, birthday walls and buddy pairings once they
+expire, so is_active / is_read_only / is_sealed can be trusted (and counted)
+without re-deriving them from timestamps.
+
+Each sweep issues set-based UPDATEs batched by primary key range, committing
+per batch so no single statement locks a large part of a table.
+"""
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import SessionLocal
+from app.models import Room, BirthdayWall, BirthdayBuddy
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 5000
+
+
+class LifecycleService:
+    """Service for closing, archiving and sealing expired records"""
+
+    @staticmethod
+    def _sweep_table(db: Session, model, expired, values: Dict) -> int:
+        """
+        Apply `values` to every active row matching `expired`, in id-range batches.
+
+        Returns:
+            Number of rows updated
+        """
+        min_id, max_id = db.query(func.min(model.id), func.max(model.id)).filter(
+            model.is_active == True,
+            expired
+        ).one()
+        if min_id is None:
+            return 0
+
+        updated = 0
+        for low in range(min_id, max_id + 1, SWEEP_BATCH_SIZE):
+            stmt = update(model).where(
+                model.id >= low,
+                model.id < low + SWEEP_BATCH_SIZE,
+                model.is_active == True,
+                expired
+            ).values(**values).execution_options(synchronize_session=False)
+            updated += db.execute(stmt).rowcount or 0
+            db.commit()
+        return updated
+
+    @staticmethod
+    def sweep(db: Session, now: datetime = None) -> Dict[str, int]:
+        """
+        Close expired rooms, archive and seal expired walls, and end expired buddy pairings.
+
+        Returns:
+            Dict with the number of rooms, walls and buddies updated
+        """
+        now = now or datetime.utcnow()
+
+        rooms_closed = LifecycleService._sweep_table(
+            db, Room, Room.closes_at <= now,
+            {"is_active": False, "is_read_only": True, "updated_at": now}
+        )
+        walls_archived = LifecycleService._sweep_table(
+            db, BirthdayWall, BirthdayWall.closes_at <= now,
+            {
+                "is_active": False,
+                "is_sealed": True,
+                "sealed_at": func.coalesce(BirthdayWall.sealed_at, now),
+                "updated_at": now
+            }
+        )
+        buddies_expired = LifecycleService._sweep_table(
+            db, BirthdayBuddy, BirthdayBuddy.expires_at <= now,
+            {"is_active": False}
+        )
+
+        return {
+            "rooms_closed": rooms_closed,
+            "walls_archived": walls_archived,
+            "buddies_expired": buddies_expired
+        }
+
+    @staticmethod
+    def run_sweep() -> Dict[str, int]:
+        """Scheduled entry point: run one lifecycle sweep in its own session"""
+        db = SessionLocal()
+        try:
+            result = LifecycleService.sweep(db)
+            if any(result.values()):
+                logger.info(f"Lifecycle sweep: {result}")
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,212 @@
+"""
+Message Partition Service
+Maintains the monthly partitions of the messages table on PostgreSQL.
+
+Each run creates partitions a few months ahead, then archives old ones: a
+partition whose month ended more than MESSAGE_RETENTION_DAYS ago, and which
+holds no messages from a still-active room, is detached, exported (with its
+reactions) to gzipped CSV files in MESSAGE_ARCHIVE_DIR, and dropped.
+
+Runs hold a PostgreSQL session-level advisory lock for their whole
+duration, so with several app processes only one maintains the partitions
+at a time; the others skip the run. On other databases, and on PostgreSQL
+databases whose messages table is not partitioned (created without the
+partitioning migration), the run is skipped as well.
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import gzip
+import logging
+import re
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MONTHS_AHEAD = 2
+# pg_try_advisory_lock key held by the maintenance run ("msgp")
+MAINTENANCE_LOCK_KEY = 0x6D736770
+PARTITION_NAME_RE = re.compile(r"^messages_y(\d{4})m(\d{2})$")
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month_start: date) -> str:
+    return f"messages_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+class MessagePartitionService:
+    """Service for creating and archiving monthly message partitions"""
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        """Check whether messages is a partitioned table on this database"""
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return db.execute(text("""
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'messages'
+        """)).first() is not None
+
+    @staticmethod
+    def list_partitions(db: Session) -> List[str]:
+        """Names of the monthly partitions currently attached to messages"""
+        rows = db.execute(text("""
+            SELECT child.relname FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = 'messages' AND child.relispartition
+        """)).all()
+        return sorted(name for (name,) in rows if PARTITION_NAME_RE.match(name))
+
+    @staticmethod
+    def ensure_partitions(db: Session, today: Optional[date] = None) -> int:
+        """
+        Create any missing partitions from this month to PARTITION_MONTHS_AHEAD ahead.
+
+        Returns:
+            Number of partitions created
+        """
+        today = today or date.today()
+        existing = set(MessagePartitionService.list_partitions(db))
+        # Same-named tables that are not attached partitions (e.g. detached by hand)
+        unattached = {name for (name,) in db.execute(text("""
+            SELECT relname FROM pg_class
+            WHERE relkind IN ('r', 'p') AND NOT relispartition AND relname LIKE 'messages\\_y%'
+        """)).all()}
+        month = date(today.year, today.month, 1)
+        created = 0
+        for _ in range(PARTITION_MONTHS_AHEAD + 1):
+            name = partition_name(month)
+            if name in unattached:
+                logger.warning(f"Skipping partition {name}: a table with that name exists but is not attached")
+            elif name not in existing:
+                upper = _add_months(month, 1)
+                db.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF messages "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+                created += 1
+            month = _add_months(month, 1)
+        return created
+
+    @staticmethod
+    def _export_table(db: Session, query: str, path: Path) -> None:
+        cursor = db.connection().connection.cursor()
+        try:
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", f)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def archive_partition(db: Session, name: str, archive_dir: Path) -> None:
+        """Detach a partition, export it and its reactions, then drop it (commits)"""
+        db.execute(text(f"ALTER TABLE messages DETACH PARTITION {name}"))
+
+        MessagePartitionService._export_table(
+            db, f"SELECT * FROM {name} ORDER BY id", archive_dir / f"{name}.csv.gz"
+        )
+        MessagePartitionService._export_table(
+            db,
+            f"SELECT r.* FROM message_reactions r JOIN {name} m ON m.id = r.message_id ORDER BY r.id",
+            archive_dir / f"{name}_reactions.csv.gz"
+        )
+
+        db.execute(text(f"""
+            DELETE FROM message_reactions r USING {name} m
+            WHERE m.id = r.message_id
+        """))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+
+    @staticmethod
+    def archive_expired(db: Session, now: Optional[datetime] = None) -> List[str]:
+        """
+        Archive every partition past the retention window whose rooms are all closed.
+
+        Returns:
+            Names of the archived partitions
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=settings.MESSAGE_RETENTION_DAYS)
+        archive_dir = Path(settings.MESSAGE_ARCHIVE_DIR)
+
+        archived = []
+        for name in MessagePartitionService.list_partitions(db):
+            year, month = map(int, PARTITION_NAME_RE.match(name).groups())
+            month_end = datetime.combine(_add_months(date(year, month, 1), 1), datetime.min.time())
+            if month_end > cutoff:
+                continue
+
+            has_live_room = db.execute(text(f"""
+                SELECT 1 FROM {name} m
+                JOIN rooms r ON r.id = m.room_id
+                WHERE r.is_active = true
+                LIMIT 1
+            """)).first()
+            if has_live_room:
+                continue
+
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            MessagePartitionService.archive_partition(db, name, archive_dir)
+            archived.append(name)
+        return archived
+
+    @staticmethod
+    def run_maintenance() -> Dict:
+        """
+        Scheduled entry point: create upcoming partitions and archive expired ones.
+
+        The session is bound to one connection for the whole run, since the
+        advisory lock belongs to the connection that took it and the run
+        commits several times.
+
+        Returns:
+            {"created", "archived"}, or {"skipped": reason} if nothing was done
+        """
+        if engine.dialect.name != "postgresql":
+            return {"skipped": "not postgresql"}
+
+        connection = engine.connect()
+        db = SessionLocal(bind=connection)
+        locked = False
+        try:
+            if not MessagePartitionService.is_partitioned(db):
+                logger.info("Skipping message partition maintenance: messages is not partitioned")
+                return {"skipped": "messages is not partitioned"}
+
+            locked = db.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+            ).scalar()
+            db.commit()
+            if not locked:
+                logger.info("Skipping message partition maintenance: another process is running it")
+                return {"skipped": "locked"}
+
+            created = MessagePartitionService.ensure_partitions(db)
+            db.commit()
+            archived = MessagePartitionService.archive_expired(db)
+
+            result = {"created": created, "archived": archived}
+            if created or archived:
+                logger.info(f"Message partition maintenance: {result}")
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if locked:
+                db.rollback()
+                db.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+                db.commit()
+            db.close()
+            connection.close()
@@ -0,0 +1,133 @@
+"""
+Message Ingestion Queue
+Group-commits chat messages from concurrent senders.
+
+Senders enqueue a message and await a future. A single flusher task drains
+the queue every few milliseconds, writes everything it collected with one
+multi-row INSERT ... RETURNING and one commit, then resolves each sender's
+future with its own message id. A sender only gets an id once its message
+is durable, but hundreds of senders share a single fsync.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
+
+from app.core.database import SessionLocal
+from app.models import Message
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many messages are waiting...
+MAX_BATCH_SIZE = 500
+# ...or when the oldest waiting message is this old
+MAX_BATCH_WAIT_SECONDS = 0.005
+
+
+class MessageIngestQueue:
+    """Asyncio queue coalescing message inserts into group commits"""
+
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_seconds: float = MAX_BATCH_WAIT_SECONDS
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self) -> None:
+        """Start the flusher on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self._run(), name="message-ingest-flusher")
+
+    async def stop(self) -> None:
+        """Flush everything already enqueued, then stop the flusher"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+
+    async def submit(self, room_id: int, user_id: int, content: str) -> Dict:
+        """
+        Enqueue a message and wait until it has been committed.
+
+        Returns:
+            Dict with the message id and created_at
+        """
+        future = asyncio.get_running_loop().create_future()
+        now = datetime.utcnow()
+        row = {
+            "room_id": room_id,
+            "user_id": user_id,
+            "content": content,
+            "created_at": now,
+            "updated_at": now,  # Equal timestamps mean "not edited"
+        }
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[Dict, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            try:
+                results = await asyncio.to_thread(
+                    MessageIngestQueue.insert_batch, [row for row, _ in batch]
+                )
+                for (row, future), message_id in zip(batch, results):
+                    if not future.done():
+                        future.set_result({"id": message_id, "created_at": row["created_at"]})
+            except Exception as e:
+                logger.error(f"Message batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def insert_batch(rows: List[Dict]) -> List[int]:
+        """Insert rows in one statement and one commit, returning ids in row order"""
+        db = SessionLocal()
+        try:
+            table = Message.__table__
+            result = db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                rows
+            )
+            ids = [message_id for (message_id,) in result]
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+message_queue = MessageIngestQueue()
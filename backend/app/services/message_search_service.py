@@ -0,0 +1,163 @@
+"""
+Message Search Service
+Full-text search over chat messages for moderators.
+
+On PostgreSQL, messages carry a generated `search_vector` tsvector column
+with a GIN index (added by the add_message_search_vector migration, or by
+create_all via the DDL in app/models/room.py), so matching is an index
+lookup. Other databases (SQLite in local runs), and PostgreSQL databases
+that lack the column, use an in-process inverted index that is brought up to
+date incrementally before each search.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from sqlalchemy import func, inspect, literal_column, or_
+from sqlalchemy.orm import Session
+import logging
+import re
+import threading
+
+from app.models import Message
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration; 'simple' avoids language-specific stemming
+SEARCH_CONFIG = "simple"
+MAX_SEARCH_RESULTS = 200
+# Message ids per IN list when filtering fallback index candidates
+CANDIDATE_CHUNK_SIZE = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class InvertedMessageIndex:
+    """In-process token -> message id index, synced incrementally from the messages table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[int]] = {}
+        self._tokens_by_message: Dict[int, Set[str]] = {}
+        self._max_id = 0
+        self._synced_at: Optional[datetime] = None
+
+    def _index(self, message_id: int, content: str) -> None:
+        for token in self._tokens_by_message.pop(message_id, ()):
+            postings = self._postings.get(token)
+            if postings:
+                postings.discard(message_id)
+        tokens = set(tokenize(content))
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(message_id)
+        self._tokens_by_message[message_id] = tokens
+
+    def sync(self, db: Session) -> None:
+        """Index new messages and re-index messages edited since the last sync"""
+        with self._lock:
+            started_at = datetime.utcnow()
+            changed = Message.id > self._max_id
+            if self._synced_at is not None:
+                changed = or_(changed, Message.updated_at >= self._synced_at)
+            for message_id, content in db.query(Message.id, Message.content).filter(changed).yield_per(1000):
+                self._index(message_id, content)
+                self._max_id = max(self._max_id, message_id)
+            self._synced_at = started_at
+
+    def candidates(self, query: str) -> Set[int]:
+        """IDs of messages containing every token of the query"""
+        tokens = tokenize(query)
+        if not tokens:
+            return set()
+        with self._lock:
+            postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+            result = set(postings[0])
+            for other in postings[1:]:
+                result &= other
+        return result
+
+
+_fallback_index = InvertedMessageIndex()
+
+# engine url -> whether messages.search_vector exists (checked once per engine)
+_search_vector_available: Dict[str, bool] = {}
+
+
+def _has_search_vector(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _search_vector_available:
+        columns = {column["name"] for column in inspect(bind).get_columns("messages")}
+        _search_vector_available[key] = "search_vector" in columns
+        if not _search_vector_available[key]:
+            logger.warning("messages.search_vector is missing; using the in-process search index")
+    return _search_vector_available[key]
+
+
+class MessageSearchService:
+    """Service for moderator message search"""
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: str,
+        room_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        include_deleted: bool = True,
+        limit: int = 50
+    ) -> List:
+        """
+        Find messages matching a search query, newest first.
+
+        On PostgreSQL the query uses websearch syntax ("quoted phrases",
+        -excluded words, OR); the fallback index matches messages containing
+        all query words.
+        """
+        columns = (
+            Message.id,
+            Message.room_id,
+            Message.user_id,
+            Message.content,
+            Message.is_flagged,
+            Message.is_deleted,
+            Message.created_at
+        )
+
+        limit = min(limit, MAX_SEARCH_RESULTS)
+
+        def narrow(search):
+            if room_id is not None:
+                search = search.filter(Message.room_id == room_id)
+            if user_id is not None:
+                search = search.filter(Message.user_id == user_id)
+            if start_date is not None:
+                search = search.filter(Message.created_at >= start_date)
+            if end_date is not None:
+                search = search.filter(Message.created_at < end_date)
+            if not include_deleted:
+                search = search.filter(Message.is_deleted == False)
+            return search.order_by(Message.created_at.desc()).limit(limit)
+
+        if _has_search_vector(db):
+            ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+            return narrow(db.query(*columns).filter(
+                literal_column("messages.search_vector").op("@@")(ts_query)
+            )).all()
+
+        _fallback_index.sync(db)
+        candidate_ids = sorted(_fallback_index.candidates(query))
+
+        # Common words can match most of the table; bound each IN list and
+        # keep the newest `limit` rows across chunks
+        results = []
+        for start in range(0, len(candidate_ids), CANDIDATE_CHUNK_SIZE):
+            chunk = candidate_ids[start:start + CANDIDATE_CHUNK_SIZE]
+            results.extend(narrow(db.query(*columns).filter(Message.id.in_(chunk))).all())
+        results.sort(key=lambda row: row.created_at, reverse=True)
+        return results[:limit]
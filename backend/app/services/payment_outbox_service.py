@@ -0,0 +1,219 @@
+"""
+Payment Outbox Service
+Makes payment provider calls for new gifts outside the checkout transaction.
+
+send_gift inserts the gift and an outbox entry describing the provider call
+in one transaction and commits. Only then is the call dispatched, so no
+database connection is held while the provider responds; the outcome is
+recorded afterwards in a short separate transaction.
+
+The checkout request holds the entry's first attempt under a lease. A call
+that fails is retried with jittered exponential backoff by the
+payment_outbox_relay job, which claims due entries with the same lease; an
+entry whose request died before recording an outcome is re-claimed once its
+lease runs out (claims and backoff come from leased_queue). Only after
+MAX_ATTEMPTS is the entry failed, together with its still-pending gift. Flutterwave initialization is keyed on the gift's
+tx_ref, so running it again is safe.
+
+The payer gets the payment link from the checkout response or, when the call
+only succeeded on a retry, from the payment status endpoint (payment_link()),
+which only hands it to the gift's sender.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models import Gift, PaymentOutbox
+from app.services.flutterwave_service import FlutterwaveService
+from app.services.leased_queue import LeasedQueue
+
+logger = logging.getLogger(__name__)
+
+# Well past the slowest dispatch (provider timeout plus retries)
+CLAIM_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 6
+RETRY_BACKOFF_BASE = timedelta(seconds=30)
+RETRY_BACKOFF_MAX = timedelta(minutes=30)
+# Entries dispatched per relay run
+RELAY_BATCH_SIZE = 50
+
+FLUTTERWAVE_INITIALIZE = "flutterwave.initialize"
+
+outbox_queue = LeasedQueue(
+    PaymentOutbox,
+    enqueued_at=PaymentOutbox.created_at,
+    done_status="sent",
+    dead_status="failed",
+    lease=CLAIM_LEASE,
+    max_attempts=MAX_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX,
+    claim_batch=10
+)
+
+
+async def _initialize_flutterwave(payload: Dict[str, Any]) -> Dict:
+    # Amounts are stored as strings in the JSON payload
+    return await FlutterwaveService.initialize_payment(**{**payload, "amount": Decimal(str(payload["amount"]))})
+
+
+# operation -> coroutine taking the entry's payload
+_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict]]] = {
+    FLUTTERWAVE_INITIALIZE: _initialize_flutterwave,
+}
+
+
+class ClaimedEntry(NamedTuple):
+    """An outbox entry held under lease, detached from the session"""
+    id: int
+    gift_id: int
+    operation: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class PaymentOutboxService:
+    """Service for the payment call outbox"""
+
+    @staticmethod
+    def add(db: Session, gift_id: int, operation: str, payload: Dict[str, Any]) -> ClaimedEntry:
+        """
+        Record a provider call in the caller's transaction (flushes, does not commit).
+
+        The entry is created already claimed for its first attempt, which the
+        caller makes once the transaction has committed.
+
+        Returns:
+            The claimed entry, to dispatch after the commit
+        """
+        now = datetime.utcnow()
+        entry = PaymentOutbox(
+            gift_id=gift_id,
+            operation=operation,
+            payload=json.dumps(payload, default=str),
+            status="processing",
+            attempts=1,
+            next_attempt_at=now,
+            locked_until=now + CLAIM_LEASE,
+            created_at=now
+        )
+        db.add(entry)
+        db.flush()
+        return ClaimedEntry(entry.id, gift_id, operation, payload, 1)
+
+    @staticmethod
+    def claim_next(db: Session, now: Optional[datetime] = None) -> Optional[ClaimedEntry]:
+        """
+        Claim one due entry for dispatch (commits).
+
+        Concurrent relays (and the checkout request that created the entry)
+        never dispatch it at the same time.
+        """
+        entry = outbox_queue.claim_next(db, now=now)
+        if entry is None:
+            return None
+        claim = ClaimedEntry(entry.id, entry.gift_id, entry.operation, json.loads(entry.payload), entry.attempts)
+        # Release the connection before the provider call
+        db.commit()
+        return claim
+
+    @staticmethod
+    async def dispatch(db: Session, entry: ClaimedEntry) -> Dict:
+        """
+        Make a claimed entry's provider call and record the outcome (commits).
+
+        Nothing touches the database until the provider has answered. The
+        outcome is only recorded while this claim still holds the entry, so
+        an attempt that outlived its lease can't overwrite a later one. A
+        failure is scheduled for retry, or after MAX_ATTEMPTS fails the entry
+        and its pending gift; the error is re-raised either way.
+
+        Returns:
+            The provider response
+        """
+        # This claim still holds the entry
+        held = (PaymentOutbox.status == "processing", PaymentOutbox.attempts == entry.attempts)
+        try:
+            response = await _HANDLERS[entry.operation](entry.payload)
+        except Exception as e:
+            now = datetime.utcnow()
+            if entry.attempts >= MAX_ATTEMPTS:
+                values = {"status": "failed", "dispatched_at": now}
+                logger.error(f"Payment outbox entry {entry.id} failed after {entry.attempts} attempts: {e}")
+            else:
+                values = {"status": "pending", "next_attempt_at": now + outbox_queue.retry_delay(entry.attempts)}
+                logger.warning(f"Payment outbox entry {entry.id} failed (attempt {entry.attempts}): {e}")
+            recorded = outbox_queue.finish(db, entry.id, *held, last_error=str(e), **values)
+            if recorded and values["status"] == "failed":
+                db.execute(
+                    update(Gift).where(
+                        Gift.id == entry.gift_id,
+                        Gift.payment_status == "pending"
+                    ).values(payment_status="failed", updated_at=now).execution_options(synchronize_session=False)
+                )
+            db.commit()
+            raise
+
+        outbox_queue.finish(
+            db, entry.id, *held,
+            status="sent",
+            last_error=None,
+            response=json.dumps(response, default=str),
+            dispatched_at=datetime.utcnow()
+        )
+        db.commit()
+        return response
+
+    @staticmethod
+    def payment_link(db: Session, gift_id: int, sender_id: int) -> Optional[str]:
+        """Payment link from the gift's dispatched Flutterwave initialization, if sender_id sent the gift"""
+        row = db.query(PaymentOutbox.response).join(Gift, Gift.id == PaymentOutbox.gift_id).filter(
+            PaymentOutbox.gift_id == gift_id,
+            Gift.sender_id == sender_id,
+            PaymentOutbox.operation == FLUTTERWAVE_INITIALIZE,
+            PaymentOutbox.status == "sent"
+        ).order_by(PaymentOutbox.id.desc()).first()
+        if not row or not row.response:
+            return None
+        return (json.loads(row.response).get("data") or {}).get("link")
+
+    @staticmethod
+    async def relay(db: Session, limit: int = RELAY_BATCH_SIZE) -> int:
+        """
+        Dispatch up to limit due entries, one at a time.
+
+        Returns:
+            Number of entries dispatched successfully
+        """
+        sent = 0
+        for _ in range(limit):
+            entry = PaymentOutboxService.claim_next(db)
+            if entry is None:
+                break
+            try:
+                await PaymentOutboxService.dispatch(db, entry)
+                sent += 1
+            except Exception:
+                # Outcome already recorded and logged by dispatch
+                pass
+        return sent
+
+    @staticmethod
+    async def run_relay() -> int:
+        """Scheduled entry point: dispatch due outbox entries in its own session"""
+        db = SessionLocal()
+        try:
+            sent = await PaymentOutboxService.relay(db)
+            if sent:
+                logger.info(f"Payment outbox relay dispatched {sent} entries")
+            return sent
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,209 @@
+"""
+Payment Reconciliation Service
+Settles gifts whose payment webhook never arrived.
+
+The payment_reconciliation job walks stale pending Flutterwave gifts in id
+batches, verifies each batch concurrently with Flutterwave by tx_ref (at most
+MAX_CONCURRENT_VERIFICATIONS requests in flight), then applies the outcomes
+with one UPDATE per outcome and activates the newly completed gifts. A gift
+is re-checked at most every RECHECK_INTERVAL and is marked failed once it has
+been pending for GIVE_UP_AFTER without a successful payment.
+
+Completion is conditional on the gift still being pending, so the job and the
+webhook worker can settle the same gift without double activation.
+
+Clients poll payment status through get_status(), a short-lived cached read
+that also carries the payment link while the gift is pending.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy import case, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models import Gift, PaymentProviderEnum
+from app.services.flutterwave_service import FlutterwaveService
+from app.services.digital_gift_service import DigitalGiftService
+from app.services.payment_webhook_service import PaymentWebhookService
+from app.services.gift_stats_service import GiftStatsService
+
+logger = logging.getLogger(__name__)
+
+# Give the webhook a chance before reconciling
+STALE_AFTER = timedelta(minutes=2)
+RECHECK_INTERVAL = timedelta(minutes=15)
+GIVE_UP_AFTER = timedelta(days=1)
+BATCH_SIZE = 100
+MAX_CONCURRENT_VERIFICATIONS = 10
+
+PENDING_STATUS_CACHE_DURATION = timedelta(seconds=5)
+SETTLED_STATUS_CACHE_DURATION = timedelta(minutes=1)
+MAX_STATUS_CACHE_ENTRIES = 10000
+
+# gift_id -> (status dict, cached_at)
+_status_cache: Dict[int, Tuple[Dict, datetime]] = {}
+
+
+class PaymentReconciliationService:
+    """Service for reconciling pending payments with the provider"""
+
+    @staticmethod
+    def select_batch(db: Session, now: datetime, after_id: int = 0) -> List[Gift]:
+        """Next batch of pending Flutterwave gifts due for a check, by id"""
+        return db.query(Gift).filter(
+            Gift.payment_status == "pending",
+            Gift.payment_provider == PaymentProviderEnum.FLUTTERWAVE,
+            Gift.payment_intent_id.isnot(None),
+            Gift.created_at <= now - STALE_AFTER,
+            or_(Gift.payment_checked_at.is_(None), Gift.payment_checked_at <= now - RECHECK_INTERVAL),
+            Gift.id > after_id
+        ).order_by(Gift.id).limit(BATCH_SIZE).all()
+
+    @staticmethod
+    async def _verify(semaphore: asyncio.Semaphore, tx_ref: str) -> Optional[Dict]:
+        """Verification response, or None if Flutterwave has no transaction for tx_ref"""
+        async with semaphore:
+            try:
+                return await FlutterwaveService.verify_by_reference(tx_ref)
+            except httpx.HTTPStatusError as e:
+                # Flutterwave answers 400/404 for an unknown tx_ref
+                if e.response.status_code in (400, 404):
+                    return None
+                raise
+
+    @staticmethod
+    async def reconcile_batch(db: Session, gifts: List[Gift], now: datetime) -> Dict[str, int]:
+        """
+        Verify a batch concurrently and apply the results in bulk (commits).
+
+        Returns:
+            Dict with the number of gifts completed, failed and not checked (errors)
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_VERIFICATIONS)
+        results = await asyncio.gather(
+            *(PaymentReconciliationService._verify(semaphore, gift.payment_intent_id) for gift in gifts),
+            return_exceptions=True
+        )
+
+        checked_ids = []
+        failed_ids = []
+        completed: Dict[int, str] = {}  # gift_id -> provider transaction id
+        errors = 0
+        for gift, result in zip(gifts, results):
+            if isinstance(result, Exception):
+                # Transient; leave payment_checked_at alone so the next run retries
+                logger.warning(f"Reconciliation check for gift {gift.id} failed: {result}")
+                errors += 1
+                continue
+
+            checked_ids.append(gift.id)
+            tx_ref = gift.payment_intent_id
+            if result is not None:
+                mismatch = PaymentWebhookService.verification_mismatch(gift, tx_ref, result)
+                if mismatch is None:
+                    completed[gift.id] = str(result["data"]["id"])
+                    continue
+                if (result.get("data") or {}).get("status") == "failed":
+                    failed_ids.append(gift.id)
+                    continue
+            if gift.created_at <= now - GIVE_UP_AFTER:
+                failed_ids.append(gift.id)
+
+        pending = Gift.payment_status == "pending"
+        if checked_ids:
+            db.execute(
+                update(Gift).where(Gift.id.in_(checked_ids), pending).values(
+                    payment_checked_at=now
+                ).execution_options(synchronize_session=False)
+            )
+        if failed_ids:
+            db.execute(
+                update(Gift).where(Gift.id.in_(failed_ids), pending).values(
+                    payment_status="failed",
+                    updated_at=now
+                ).execution_options(synchronize_session=False)
+            )
+        newly_completed = []
+        if completed:
+            rows = db.execute(
+                update(Gift).where(Gift.id.in_(list(completed)), pending).values(
+                    payment_status="completed",
+                    payment_transaction_id=case(completed, value=Gift.id),
+                    updated_at=now
+                ).returning(Gift.id, Gift.recipient_id).execution_options(synchronize_session=False)
+            ).all()
+            newly_completed = [gift_id for gift_id, _ in rows]
+            GiftStatsService.record_received(db, [recipient_id for _, recipient_id in rows])
+        db.commit()
+
+        if newly_completed:
+            db.expire_all()
+            for gift in db.query(Gift).filter(Gift.id.in_(newly_completed), Gift.is_delivered == False).all():
+                await DigitalGiftService.activate_gift(gift, db)
+
+        return {"completed": len(newly_completed), "failed": len(failed_ids), "errors": errors}
+
+    @staticmethod
+    async def reconcile(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Reconcile every pending gift currently due for a check"""
+        now = now or datetime.utcnow()
+        totals = {"checked": 0, "completed": 0, "failed": 0, "errors": 0}
+        after_id = 0
+        while True:
+            gifts = PaymentReconciliationService.select_batch(db, now, after_id)
+            if not gifts:
+                return totals
+            after_id = gifts[-1].id
+            result = await PaymentReconciliationService.reconcile_batch(db, gifts, now)
+            totals["checked"] += len(gifts)
+            for key, value in result.items():
+                totals[key] += value
+
+    @staticmethod
+    async def run_reconciliation() -> Dict[str, int]:
+        """Scheduled entry point: reconcile pending payments in its own session"""
+        db = SessionLocal()
+        try:
+            result = await PaymentReconciliationService.reconcile(db)
+            if result["checked"]:
+                logger.info(f"Payment reconciliation: {result}")
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_status(db: Session, gift_id: int) -> Optional[Dict]:
+        """
+        Payment status of a gift, cached briefly (longer once settled).
+
+        Returns:
+            Status dict, or None if the gift does not exist
+        """
+        now = datetime.utcnow()
+        cached = _status_cache.get(gift_id)
+        if cached:
+            status, cached_at = cached
+            settled = status["payment_status"] in ("failed", "refunded") or status["is_delivered"]
+            duration = SETTLED_STATUS_CACHE_DURATION if settled else PENDING_STATUS_CACHE_DURATION
+            if now - cached_at < duration:
+                return status
+
+        row = db.query(Gift.id, Gift.payment_status, Gift.is_delivered).filter(Gift.id == gift_id).first()
+        if not row:
+            return None
+
+        status = {
+            "gift_id": row.id,
+            "payment_status": row.payment_status,
+            "is_delivered": row.is_delivered
+        }
+        if len(_status_cache) >= MAX_STATUS_CACHE_ENTRIES:
+            _status_cache.clear()
+        _status_cache[gift_id] = (status, now)
+        return status
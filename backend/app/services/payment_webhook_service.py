@@ -0,0 +1,258 @@
+"""
+Payment Webhook Service
+Stores provider webhooks in an inbox and processes them in the background.
+
+The webhook endpoint verifies the signature, inserts the event into
+payment_webhook_events (ignoring redeliveries of a transaction id it already
+has) and responds immediately. A small pool of worker tasks claims due
+events, verifies the payment with the provider, completes and activates the
+gift, and marks the event processed. Processing is idempotent: a gift is
+only moved to completed once and only activated while undelivered.
+
+Claims, retries and the worker pool come from leased_queue. Failures are
+retried with jittered exponential backoff; after MAX_ATTEMPTS (or on a
+permanent error such as a verification mismatch) the event is dead-lettered.
+`python database/replay_queue.py --queue webhooks` re-queues dead or stuck
+events.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.database import insert_or_ignore
+from app.models import Gift, PaymentWebhookEvent
+from app.services.flutterwave_service import FlutterwaveService
+from app.services.digital_gift_service import DigitalGiftService
+from app.services.gift_stats_service import GiftStatsService
+from app.services.leased_queue import LeasedQueue, QueueWorker
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = 4
+# Idle workers poll this often (new events also wake them immediately)
+POLL_INTERVAL_SECONDS = 5.0
+# A claimed event is re-claimable once this lease runs out (crashed worker)
+CLAIM_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 8
+RETRY_BACKOFF_BASE = timedelta(seconds=30)
+RETRY_BACKOFF_MAX = timedelta(hours=1)
+
+webhook_queue = LeasedQueue(
+    PaymentWebhookEvent,
+    enqueued_at=PaymentWebhookEvent.received_at,
+    done_status="processed",
+    lease=CLAIM_LEASE,
+    max_attempts=MAX_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF_BASE,
+    backoff_max=RETRY_BACKOFF_MAX,
+    claim_batch=WORKER_CONCURRENCY * 2
+)
+
+
+class PermanentWebhookError(Exception):
+    """Processing can never succeed; dead-letter without retrying"""
+
+
+class InvalidWebhookPayload(ValueError):
+    """The webhook body is not a UTF-8 JSON object; reject it instead of storing it"""
+
+
+class PaymentWebhookService:
+    """Service for the payment webhook inbox"""
+
+    @staticmethod
+    def parse_payload(body: bytes) -> Dict:
+        """
+        Decode a webhook body.
+
+        Raises:
+            InvalidWebhookPayload: Not UTF-8, not JSON, or not an object with an object "data"
+        """
+        try:
+            webhook_data = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise InvalidWebhookPayload(f"Webhook body is not UTF-8 JSON: {e}") from e
+        if not isinstance(webhook_data, dict):
+            raise InvalidWebhookPayload("Webhook body is not a JSON object")
+        if not isinstance(webhook_data.get("data") or {}, dict):
+            raise InvalidWebhookPayload("Webhook data is not a JSON object")
+        return webhook_data
+
+    @staticmethod
+    def record_event(db: Session, body: bytes, provider: str = "flutterwave") -> Optional[int]:
+        """
+        Store a webhook event (commits).
+
+        Returns:
+            The new event id, or None if the transaction was already recorded
+
+        Raises:
+            InvalidWebhookPayload: The body can't be stored (nothing is written)
+        """
+        webhook_data = PaymentWebhookService.parse_payload(body)
+        data = webhook_data.get("data") or {}
+        transaction_id = data.get("id")
+        if transaction_id is None:
+            transaction_id = "sha256:" + hashlib.sha256(body).hexdigest()
+
+        now = datetime.utcnow()
+        event_id = insert_or_ignore(db, PaymentWebhookEvent, {
+            "provider": provider,
+            "transaction_id": str(transaction_id),
+            "event_type": webhook_data.get("event"),
+            "tx_ref": data.get("tx_ref"),
+            "payload": body.decode("utf-8"),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "received_at": now
+        }, ["transaction_id"])
+        db.commit()
+        return event_id
+
+    @staticmethod
+    def claim_next(db: Session, now: Optional[datetime] = None) -> Optional[PaymentWebhookEvent]:
+        """Claim one due event for processing (commits)"""
+        return webhook_queue.claim_next(db, now=now)
+
+    @staticmethod
+    def _find_gift(db: Session, tx_ref: str) -> Optional[Gift]:
+        # Equality on the unique payment_intent_id index
+        return db.query(Gift).filter(Gift.payment_intent_id == tx_ref).first()
+
+    @staticmethod
+    async def complete_payment(db: Session, gift: Gift, tx_ref: str, transaction_id: str) -> bool:
+        """
+        Mark a verified gift completed and activate it; safe to call repeatedly.
+
+        Only the call whose conditional UPDATE moved the gift to completed
+        activates it, so a concurrent webhook event or reconciliation run
+        for the same gift can't deliver it twice.
+
+        Returns:
+            True if this call moved the gift to completed
+        """
+        completed = db.execute(
+            update(Gift).where(
+                Gift.id == gift.id,
+                Gift.payment_status != "completed"
+            ).values(
+                payment_status="completed",
+                payment_transaction_id=str(transaction_id),
+                updated_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        if completed:
+            GiftStatsService.record_received(db, [gift.recipient_id])
+        db.commit()
+        if not completed:
+            return False
+
+        db.refresh(gift)
+        if not gift.is_delivered:
+            await DigitalGiftService.activate_gift(gift, db)
+        return True
+
+    @staticmethod
+    def verification_mismatch(gift: Gift, tx_ref: str, verification: Dict) -> Optional[str]:
+        """
+        Check a Flutterwave verification response against the gift being paid for.
+
+        Returns:
+            Why the payment cannot be accepted, or None if it is a successful payment for the gift
+        """
+        verified = verification.get("data") or {}
+        if verification.get("status") != "success" or verified.get("status") != "successful":
+            return f"Verification failed: {verification.get('message') or verified.get('status')}"
+        if verified.get("tx_ref") != tx_ref:
+            return "Verified tx_ref does not match"
+        if (
+            str(verified.get("currency", "")).upper() != str(gift.currency).upper()
+            or Decimal(str(verified.get("amount", 0))) < Decimal(gift.amount)
+        ):
+            return "Verified amount or currency does not match gift"
+        return None
+
+    @staticmethod
+    async def process_event(db: Session, event: PaymentWebhookEvent) -> None:
+        """Apply one webhook event; raises to retry, PermanentWebhookError to dead-letter"""
+        webhook_data = json.loads(event.payload)
+        data = webhook_data.get("data") or {}
+        if webhook_data.get("event") != "charge.completed":
+            return
+
+        tx_ref = data.get("tx_ref")
+        gift = PaymentWebhookService._find_gift(db, tx_ref) if tx_ref else None
+        if not gift:
+            raise PermanentWebhookError(f"No gift for tx_ref {tx_ref}")
+
+        if data.get("status") == "failed":
+            db.execute(
+                update(Gift).where(
+                    Gift.id == gift.id,
+                    Gift.payment_status == "pending"
+                ).values(payment_status="failed").execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return
+
+        if data.get("status") != "successful":
+            return
+        if gift.payment_status == "completed" and gift.is_delivered:
+            return
+
+        # Never trust the webhook body alone: confirm with Flutterwave
+        verification = await FlutterwaveService.verify_payment(event.transaction_id)
+        mismatch = PaymentWebhookService.verification_mismatch(gift, tx_ref, verification)
+        if mismatch:
+            raise PermanentWebhookError(mismatch)
+
+        await PaymentWebhookService.complete_payment(db, gift, tx_ref, event.transaction_id)
+
+    @staticmethod
+    async def process_claimed(db: Session, event: PaymentWebhookEvent) -> str:
+        """
+        Process a claimed event and record the outcome (commits).
+
+        Returns:
+            The event's new status
+        """
+        try:
+            await PaymentWebhookService.process_event(db, event)
+        except Exception as e:
+            db.rollback()
+            status = webhook_queue.fail(db, event, e, permanent=isinstance(e, PermanentWebhookError))
+            db.commit()
+            if status == "dead":
+                logger.error(f"Webhook event {event.id} dead-lettered: {e}")
+            else:
+                logger.warning(f"Webhook event {event.id} failed (attempt {event.attempts}): {e}")
+            return status
+
+        webhook_queue.finish(db, event.id, status="processed", processed_at=datetime.utcnow(), last_error=None)
+        db.commit()
+        return "processed"
+
+    @staticmethod
+    def requeue(
+        db: Session,
+        event_ids: Optional[List[int]] = None,
+        statuses: tuple = ("dead",),
+        stuck_for: Optional[timedelta] = None
+    ) -> int:
+        """Put events back in the queue with a fresh attempt budget (commits); see LeasedQueue.requeue"""
+        return webhook_queue.requeue(db, event_ids, statuses, stuck_for)
+
+
+webhook_worker = QueueWorker(
+    "payment-webhook-worker",
+    PaymentWebhookService.claim_next,
+    PaymentWebhookService.process_claimed,
+    concurrency=WORKER_CONCURRENCY,
+    poll_interval=POLL_INTERVAL_SECONDS
+)
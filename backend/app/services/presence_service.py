@@ -0,0 +1,149 @@
+"""
+Presence Service
+Tracks who is currently in a room from client heartbeats.
+
+Heartbeats are recorded in memory only; RoomParticipant.last_seen is written
+behind in periodic batches by the presence_flush job, so a heartbeat never
+costs a database write. Room membership is checked against the database once
+and then cached.
+
+State is per process: with several workers, presence reflects the clients
+whose heartbeats reach this worker.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+import logging
+import threading
+
+from app.core.database import SessionLocal
+from app.models import RoomParticipant
+
+logger = logging.getLogger(__name__)
+
+# A user is online if their last heartbeat is this recent
+ONLINE_WINDOW = timedelta(seconds=60)
+MEMBERSHIP_CACHE_DURATION = timedelta(minutes=5)
+
+_lock = threading.Lock()
+# room_id -> {user_id: last heartbeat}
+_heartbeats: Dict[int, Dict[int, datetime]] = {}
+# (room_id, user_id) -> last heartbeat not yet written to the DB
+_pending_last_seen: Dict[Tuple[int, int], datetime] = {}
+# (room_id, user_id) -> cached_at, for confirmed members only
+_membership_cache: Dict[Tuple[int, int], datetime] = {}
+
+
+class PresenceService:
+    """Service for in-memory room presence with write-behind last_seen"""
+
+    @staticmethod
+    def is_member(db: Session, room_id: int, user_id: int) -> bool:
+        """Check room membership, caching positive answers for a short while"""
+        key = (room_id, user_id)
+        cached = _membership_cache.get(key)
+        if cached and datetime.utcnow() - cached < MEMBERSHIP_CACHE_DURATION:
+            return True
+
+        is_member = db.query(RoomParticipant.id).filter(
+            RoomParticipant.room_id == room_id,
+            RoomParticipant.user_id == user_id
+        ).first() is not None
+        if is_member:
+            _membership_cache[key] = datetime.utcnow()
+        return is_member
+
+    @staticmethod
+    def touch(room_id: int, user_id: int) -> None:
+        """Record activity from a user already known to be a room member"""
+        now = datetime.utcnow()
+        with _lock:
+            _heartbeats.setdefault(room_id, {})[user_id] = now
+            _pending_last_seen[(room_id, user_id)] = now
+
+    @staticmethod
+    def heartbeat(db: Session, room_id: int, user_id: int) -> bool:
+        """
+        Record a heartbeat.
+
+        Returns:
+            False if the user is not a member of the room
+        """
+        if not PresenceService.is_member(db, room_id, user_id):
+            return False
+        PresenceService.touch(room_id, user_id)
+        return True
+
+    @staticmethod
+    def get_online_user_ids(room_id: int) -> List[int]:
+        """User IDs with a heartbeat in the room within ONLINE_WINDOW, most recent first"""
+        cutoff = datetime.utcnow() - ONLINE_WINDOW
+        with _lock:
+            seen = list(_heartbeats.get(room_id, {}).items())
+        online = [(user_id, at) for user_id, at in seen if at >= cutoff]
+        online.sort(key=lambda item: item[1], reverse=True)
+        return [user_id for user_id, _ in online]
+
+    @staticmethod
+    def get_online_count(room_id: int) -> int:
+        return len(PresenceService.get_online_user_ids(room_id))
+
+    @staticmethod
+    def flush(db: Session) -> int:
+        """
+        Write pending last_seen values in one batched UPDATE and prune stale presence.
+
+        Returns:
+            Number of participants updated
+        """
+        with _lock:
+            pending = dict(_pending_last_seen)
+            _pending_last_seen.clear()
+
+            cutoff = datetime.utcnow() - ONLINE_WINDOW
+            for room_id in list(_heartbeats):
+                room = _heartbeats[room_id]
+                for user_id in [u for u, at in room.items() if at < cutoff]:
+                    del room[user_id]
+                if not room:
+                    del _heartbeats[room_id]
+
+        now = datetime.utcnow()
+        for key in [k for k, at in _membership_cache.items() if now - at >= MEMBERSHIP_CACHE_DURATION]:
+            _membership_cache.pop(key, None)
+
+        if not pending:
+            return 0
+
+        table = RoomParticipant.__table__
+        stmt = update(table).where(
+            table.c.room_id == bindparam("b_room_id"),
+            table.c.user_id == bindparam("b_user_id")
+        ).values(last_seen=bindparam("b_last_seen"))
+        try:
+            db.execute(stmt, [
+                {"b_room_id": room_id, "b_user_id": user_id, "b_last_seen": last_seen}
+                for (room_id, user_id), last_seen in pending.items()
+            ])
+            db.commit()
+        except Exception:
+            # Put the values back so the next flush retries them
+            with _lock:
+                for key, last_seen in pending.items():
+                    if _pending_last_seen.get(key, last_seen) <= last_seen:
+                        _pending_last_seen[key] = last_seen
+            raise
+        return len(pending)
+
+    @staticmethod
+    def run_flush() -> int:
+        """Scheduled entry point: flush pending last_seen values in its own session"""
+        db = SessionLocal()
+        try:
+            return PresenceService.flush(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
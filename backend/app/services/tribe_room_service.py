@@ -0,0 +1,140 @@
+"""
+Tribe Room Service
+Pre-provisions birthday tribe rooms ahead of midnight so the first requests
+of a birthday only ever read the room.
+
+Rooms are bulk-created with INSERT ... ON CONFLICT DO NOTHING on the unique
+room_identifier, which makes provisioning idempotent and safe to run from
+several workers or from the request path at the same time.
+
+A tribe room stays open while its birthday is the local date somewhere on
+Earth, so members in every timezone get their full day.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import SessionLocal, dialect_insert, insert_or_ignore
+from app.models import Room, RoomParticipant, RoomTypeEnum
+from app.utils.timezones import observed_tribe_ids, global_day_window
+
+logger = logging.getLogger(__name__)
+
+# Today plus this many days ahead are kept provisioned
+PROVISION_DAYS_AHEAD = 1
+
+
+class TribeRoomService:
+    """Service for provisioning and joining birthday tribe rooms"""
+    
+    @staticmethod
+    def room_identifier(tribe_id: str, day: date) -> str:
+        """Unique identifier of a tribe's room for a given birthday"""
+        return f"tribe_{tribe_id}_{day.year}"
+    
+    @staticmethod
+    def provision_rooms(db: Session, start_day: date, days: int = 1) -> int:
+        """
+        Create the tribe rooms for `days` consecutive days in one statement.
+        
+        Args:
+            db: Database session (not committed here)
+            start_day: First birthday date to provision
+            days: Number of consecutive days
+            
+        Returns:
+            Number of rooms actually created
+        """
+        now = datetime.utcnow()
+        rows: List[Dict] = []
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            opens_at, closes_at = global_day_window(day)
+            for tribe_id in observed_tribe_ids(day):
+                rows.append({
+                    "room_type": RoomTypeEnum.TRIBE,
+                    "room_identifier": TribeRoomService.room_identifier(tribe_id, day),
+                    "name": f"Birthday Tribe {tribe_id}",
+                    "opens_at": opens_at,
+                    "closes_at": closes_at,
+                    "is_active": True,
+                    "is_read_only": False,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+        
+        stmt = dialect_insert(db, Room.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=["room_identifier"]
+        )
+        return db.execute(stmt).rowcount or 0
+    
+    @staticmethod
+    def run_provisioning() -> int:
+        """Scheduled entry point: make sure today's and tomorrow's rooms exist"""
+        db = SessionLocal()
+        try:
+            created = TribeRoomService.provision_rooms(
+                db, date.today(), days=PROVISION_DAYS_AHEAD + 1
+            )
+            db.commit()
+            if created:
+                logger.info(f"Provisioned {created} tribe room(s)")
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_room_for_member(
+        db: Session,
+        tribe_id: str,
+        day: date,
+        user_id: int
+    ) -> Optional[Room]:
+        """
+        Get a tribe's room for `day` and make sure the user participates.
+        
+        The common case is a single read that returns the room together with
+        the user's participation. Only a user's first visit writes, and that
+        write is an idempotent upsert.
+        """
+        identifier = TribeRoomService.room_identifier(tribe_id, day)
+        
+        def find_room():
+            return db.query(Room, RoomParticipant.id).outerjoin(
+                RoomParticipant,
+                and_(
+                    RoomParticipant.room_id == Room.id,
+                    RoomParticipant.user_id == user_id
+                )
+            ).filter(
+                Room.room_identifier == identifier
+            ).first()
+        
+        result = find_room()
+        if result is None:
+            # Scheduler hasn't provisioned this room yet (e.g. fresh deploy)
+            TribeRoomService.provision_rooms(db, day, days=1)
+            db.commit()
+            result = find_room()
+            if result is None:
+                return None
+        
+        room, participant_id = result
+        if participant_id is None:
+            now = datetime.utcnow()
+            insert_or_ignore(db, RoomParticipant, {
+                "room_id": room.id,
+                "user_id": user_id,
+                "is_guest": False,
+                "is_birthday_mate": True,
+                "joined_at": now,
+                "last_seen": now
+            }, ["room_id", "user_id"])
+            db.commit()
+        
+        return room
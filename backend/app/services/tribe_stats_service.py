@@ -0,0 +1,209 @@
+"""
+Tribe Statistics Service
+Maintains the precomputed tribe_stats table so tribe endpoints never have to
+count or GROUP BY over the users table.
+
+Counts are adjusted in the caller's transaction on signup and deactivation,
+and a nightly reconciler rebuilds them from users to repair any drift.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import SessionLocal, dialect_insert
+from app.models import User, TribeStats
+
+logger = logging.getLogger(__name__)
+
+# Short-lived per-process cache of tribe member counts (tribe_id -> (count, cached_at))
+_member_count_cache: Dict[str, Tuple[int, datetime]] = {}
+MEMBER_COUNT_CACHE_DURATION = timedelta(seconds=60)
+
+
+class TribeStatsService:
+    """Service for reading and maintaining precomputed tribe member counts"""
+
+    @staticmethod
+    def record_member_change(
+        db: Session,
+        tribe_id: str,
+        country: str,
+        gender,
+        delta: int
+    ) -> None:
+        """
+        Adjust the active member count for a tribe/country/gender bucket.
+
+        Runs as a single atomic upsert inside the caller's transaction, so the
+        count commits (or rolls back) together with the user row change.
+
+        Args:
+            db: Database session (not committed here)
+            tribe_id: Tribe ID (MM-DD)
+            country: User's country
+            gender: GenderEnum value
+            delta: +1 on signup, -1 on deactivation
+        """
+        now = datetime.utcnow()
+        stmt = dialect_insert(db, TribeStats.__table__).values(
+            tribe_id=tribe_id,
+            country=country,
+            gender=gender,
+            member_count=max(delta, 0),
+            updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tribe_id", "country", "gender"],
+            set_={
+                "member_count": TribeStats.__table__.c.member_count + delta,
+                "updated_at": now
+            }
+        )
+        db.execute(stmt)
+        _member_count_cache.pop(tribe_id, None)
+
+    @staticmethod
+    def get_member_count(db: Session, tribe_id: str) -> int:
+        """Get the number of active members in a tribe"""
+        total = db.query(func.sum(TribeStats.member_count)).filter(
+            TribeStats.tribe_id == tribe_id
+        ).scalar()
+        return int(total or 0)
+
+    @staticmethod
+    def get_cached_member_count(db: Session, tribe_id: str) -> int:
+        """Get a tribe's member count, served from a short-lived cache"""
+        cached = _member_count_cache.get(tribe_id)
+        if cached and datetime.utcnow() - cached[1] < MEMBER_COUNT_CACHE_DURATION:
+            return cached[0]
+
+        count = TribeStatsService.get_member_count(db, tribe_id)
+        _member_count_cache[tribe_id] = (count, datetime.utcnow())
+        return count
+
+    @staticmethod
+    def get_breakdown(db: Session, tribe_id: str) -> Dict[str, Dict[str, int]]:
+        """Get active member counts for a tribe split by gender and by country"""
+        rows = db.query(
+            TribeStats.country,
+            TribeStats.gender,
+            TribeStats.member_count
+        ).filter(
+            TribeStats.tribe_id == tribe_id,
+            TribeStats.member_count > 0
+        ).all()
+
+        by_gender: Dict[str, int] = {}
+        by_country: Dict[str, int] = {}
+        for country, gender, count in rows:
+            gender_key = gender.value if hasattr(gender, "value") else str(gender)
+            by_gender[gender_key] = by_gender.get(gender_key, 0) + count
+            by_country[country] = by_country.get(country, 0) + count
+
+        return {"by_gender": by_gender, "by_country": by_country}
+
+    @staticmethod
+    def get_tribe_sizes(db: Session, limit: int = 20) -> List[Tuple[str, int]]:
+        """Get (tribe_id, member_count) for the largest tribes"""
+        member_count = func.sum(TribeStats.member_count)
+        return db.query(
+            TribeStats.tribe_id,
+            member_count.label("member_count")
+        ).group_by(
+            TribeStats.tribe_id
+        ).having(
+            member_count > 0
+        ).order_by(
+            member_count.desc()
+        ).limit(limit).all()
+
+    @staticmethod
+    def count_tribes(db: Session) -> int:
+        """Get the number of tribes with at least one active member"""
+        return db.query(func.count(func.distinct(TribeStats.tribe_id))).filter(
+            TribeStats.member_count > 0
+        ).scalar() or 0
+
+    @staticmethod
+    def reconcile(db: Session) -> Dict[str, int]:
+        """
+        Rebuild tribe_stats from the users table, fixing any drift.
+
+        Only buckets whose stored count differs from the real count are
+        written. The caller is responsible for committing.
+
+        Returns:
+            Dict with the number of buckets checked, corrected, and removed
+        """
+        actual = {
+            (tribe_id, country, gender): count
+            for tribe_id, country, gender, count in db.query(
+                User.tribe_id,
+                User.country,
+                User.gender,
+                func.count(User.id)
+            ).filter(
+                User.is_active == True
+            ).group_by(
+                User.tribe_id, User.country, User.gender
+            ).all()
+        }
+
+        stored = {
+            (row.tribe_id, row.country, row.gender): row
+            for row in db.query(TribeStats).all()
+        }
+
+        corrected = 0
+        removed = 0
+        now = datetime.utcnow()
+
+        for key, count in actual.items():
+            row = stored.get(key)
+            if row is None:
+                tribe_id, country, gender = key
+                db.add(TribeStats(
+                    tribe_id=tribe_id,
+                    country=country,
+                    gender=gender,
+                    member_count=count,
+                    updated_at=now
+                ))
+                corrected += 1
+            elif row.member_count != count:
+                row.member_count = count
+                row.updated_at = now
+                corrected += 1
+
+        for key, row in stored.items():
+            if key not in actual:
+                db.delete(row)
+                removed += 1
+
+        _member_count_cache.clear()
+
+        return {
+            "checked": len(actual),
+            "corrected": corrected,
+            "removed": removed
+        }
+
+    @staticmethod
+    def run_reconciliation() -> Dict[str, int]:
+        """Scheduled entry point: reconcile tribe_stats in its own session"""
+        db = SessionLocal()
+        try:
+            result = TribeStatsService.reconcile(db)
+            db.commit()
+            if result["corrected"] or result["removed"]:
+                logger.warning(f"Tribe stats drift repaired: {result}")
+            else:
+                logger.info(f"Tribe stats reconciled: {result}")
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
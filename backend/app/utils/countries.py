@@ -0,0 +1,348 @@
+"""
+Country and currency resolution.
+
+Users type their country freely at signup ("Nigeria", "NG", "Côte d'Ivoire",
+"U.S.A."), so every ISO 3166-1 country is indexed at import under its alpha-2
+and alpha-3 codes, its ISO short name and common alternative names. Keys are
+normalized (diacritics stripped, casefolded, punctuation and a leading "the"
+dropped), so resolving a country is one normalization and one dict lookup.
+
+Each country maps to its ISO 4217 currency and that currency's minor units.
+"""
+import re
+import unicodedata
+from typing import Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_CURRENCY = "USD"
+
+# ISO 4217 minor units for currencies that don't use 2 decimal places
+CURRENCY_MINOR_UNITS = {
+    # No minor unit
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0,
+    "KRW": 0, "PYG": 0, "RWF": 0, "UGX": 0, "UYI": 0, "VND": 0, "VUV": 0,
+    "XAF": 0, "XOF": 0, "XPF": 0,
+    # Three decimal places
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+    # Four decimal places
+    "CLF": 4, "UYW": 4,
+}
+DEFAULT_MINOR_UNITS = 2
+
+
+class CountryInfo(NamedTuple):
+    alpha2: str
+    alpha3: str
+    name: str
+    currency: Optional[str]  # None where no currency is issued (Antarctica)
+    minor_units: int
+
+
+# (alpha-2, alpha-3, ISO short name, currency, other names)
+_COUNTRY_DATA: Tuple[Tuple[str, str, str, Optional[str], Tuple[str, ...]], ...] = (
+    ("AF", "AFG", "Afghanistan", "AFN", ()),
+    ("AX", "ALA", "Åland Islands", "EUR", ()),
+    ("AL", "ALB", "Albania", "ALL", ()),
+    ("DZ", "DZA", "Algeria", "DZD", ()),
+    ("AS", "ASM", "American Samoa", "USD", ()),
+    ("AD", "AND", "Andorra", "EUR", ()),
+    ("AO", "AGO", "Angola", "AOA", ()),
+    ("AI", "AIA", "Anguilla", "XCD", ()),
+    ("AQ", "ATA", "Antarctica", None, ()),
+    ("AG", "ATG", "Antigua and Barbuda", "XCD", ("Antigua",)),
+    ("AR", "ARG", "Argentina", "ARS", ()),
+    ("AM", "ARM", "Armenia", "AMD", ()),
+    ("AW", "ABW", "Aruba", "AWG", ()),
+    ("AU", "AUS", "Australia", "AUD", ()),
+    ("AT", "AUT", "Austria", "EUR", ()),
+    ("AZ", "AZE", "Azerbaijan", "AZN", ()),
+    ("BS", "BHS", "Bahamas", "BSD", ()),
+    ("BH", "BHR", "Bahrain", "BHD", ()),
+    ("BD", "BGD", "Bangladesh", "BDT", ()),
+    ("BB", "BRB", "Barbados", "BBD", ()),
+    ("BY", "BLR", "Belarus", "BYN", ()),
+    ("BE", "BEL", "Belgium", "EUR", ()),
+    ("BZ", "BLZ", "Belize", "BZD", ()),
+    ("BJ", "BEN", "Benin", "XOF", ()),
+    ("BM", "BMU", "Bermuda", "BMD", ()),
+    ("BT", "BTN", "Bhutan", "BTN", ()),
+    ("BO", "BOL", "Bolivia (Plurinational State of)", "BOB", ("Bolivia",)),
+    ("BQ", "BES", "Bonaire, Sint Eustatius and Saba", "USD", ("Caribbean Netherlands", "Bonaire")),
+    ("BA", "BIH", "Bosnia and Herzegovina", "BAM", ("Bosnia",)),
+    ("BW", "BWA", "Botswana", "BWP", ()),
+    ("BV", "BVT", "Bouvet Island", "NOK", ()),
+    ("BR", "BRA", "Brazil", "BRL", ("Brasil",)),
+    ("IO", "IOT", "British Indian Ocean Territory", "USD", ()),
+    ("BN", "BRN", "Brunei Darussalam", "BND", ("Brunei",)),
+    ("BG", "BGR", "Bulgaria", "EUR", ()),
+    ("BF", "BFA", "Burkina Faso", "XOF", ()),
+    ("BI", "BDI", "Burundi", "BIF", ()),
+    ("CV", "CPV", "Cabo Verde", "CVE", ("Cape Verde",)),
+    ("KH", "KHM", "Cambodia", "KHR", ()),
+    ("CM", "CMR", "Cameroon", "XAF", ()),
+    ("CA", "CAN", "Canada", "CAD", ()),
+    ("KY", "CYM", "Cayman Islands", "KYD", ()),
+    ("CF", "CAF", "Central African Republic", "XAF", ()),
+    ("TD", "TCD", "Chad", "XAF", ()),
+    ("CL", "CHL", "Chile", "CLP", ()),
+    ("CN", "CHN", "China", "CNY", ("People's Republic of China", "PRC")),
+    ("CX", "CXR", "Christmas Island", "AUD", ()),
+    ("CC", "CCK", "Cocos (Keeling) Islands", "AUD", ("Cocos Islands",)),
+    ("CO", "COL", "Colombia", "COP", ()),
+    ("KM", "COM", "Comoros", "KMF", ()),
+    ("CG", "COG", "Congo", "XAF", ("Republic of the Congo", "Congo-Brazzaville", "Congo Republic")),
+    ("CD", "COD", "Congo, Democratic Republic of the", "CDF", (
+        "Democratic Republic of the Congo", "DR Congo", "DRC", "Congo-Kinshasa",
+    )),
+    ("CK", "COK", "Cook Islands", "NZD", ()),
+    ("CR", "CRI", "Costa Rica", "CRC", ()),
+    ("CI", "CIV", "Côte d'Ivoire", "XOF", ("Ivory Coast",)),
+    ("HR", "HRV", "Croatia", "EUR", ()),
+    ("CU", "CUB", "Cuba", "CUP", ()),
+    ("CW", "CUW", "Curaçao", "XCG", ()),
+    ("CY", "CYP", "Cyprus", "EUR", ()),
+    ("CZ", "CZE", "Czechia", "CZK", ("Czech Republic",)),
+    ("DK", "DNK", "Denmark", "DKK", ()),
+    ("DJ", "DJI", "Djibouti", "DJF", ()),
+    ("DM", "DMA", "Dominica", "XCD", ()),
+    ("DO", "DOM", "Dominican Republic", "DOP", ()),
+    ("EC", "ECU", "Ecuador", "USD", ()),
+    ("EG", "EGY", "Egypt", "EGP", ()),
+    ("SV", "SLV", "El Salvador", "USD", ()),
+    ("GQ", "GNQ", "Equatorial Guinea", "XAF", ()),
+    ("ER", "ERI", "Eritrea", "ERN", ()),
+    ("EE", "EST", "Estonia", "EUR", ()),
+    ("SZ", "SWZ", "Eswatini", "SZL", ("Swaziland",)),
+    ("ET", "ETH", "Ethiopia", "ETB", ()),
+    ("FK", "FLK", "Falkland Islands (Malvinas)", "FKP", ("Falkland Islands",)),
+    ("FO", "FRO", "Faroe Islands", "DKK", ()),
+    ("FJ", "FJI", "Fiji", "FJD", ()),
+    ("FI", "FIN", "Finland", "EUR", ()),
+    ("FR", "FRA", "France", "EUR", ()),
+    ("GF", "GUF", "French Guiana", "EUR", ()),
+    ("PF", "PYF", "French Polynesia", "XPF", ()),
+    ("TF", "ATF", "French Southern Territories", "EUR", ()),
+    ("GA", "GAB", "Gabon", "XAF", ()),
+    ("GM", "GMB", "Gambia", "GMD", ()),
+    ("GE", "GEO", "Georgia", "GEL", ()),
+    ("DE", "DEU", "Germany", "EUR", ("Deutschland",)),
+    ("GH", "GHA", "Ghana", "GHS", ()),
+    ("GI", "GIB", "Gibraltar", "GIP", ()),
+    ("GR", "GRC", "Greece", "EUR", ("Hellenic Republic",)),
+    ("GL", "GRL", "Greenland", "DKK", ()),
+    ("GD", "GRD", "Grenada", "XCD", ()),
+    ("GP", "GLP", "Guadeloupe", "EUR", ()),
+    ("GU", "GUM", "Guam", "USD", ()),
+    ("GT", "GTM", "Guatemala", "GTQ", ()),
+    ("GG", "GGY", "Guernsey", "GBP", ()),
+    ("GN", "GIN", "Guinea", "GNF", ()),
+    ("GW", "GNB", "Guinea-Bissau", "XOF", ()),
+    ("GY", "GUY", "Guyana", "GYD", ()),
+    ("HT", "HTI", "Haiti", "HTG", ()),
+    ("HM", "HMD", "Heard Island and McDonald Islands", "AUD", ()),
+    ("VA", "VAT", "Holy See", "EUR", ("Vatican City", "Vatican")),
+    ("HN", "HND", "Honduras", "HNL", ()),
+    ("HK", "HKG", "Hong Kong", "HKD", ()),
+    ("HU", "HUN", "Hungary", "HUF", ()),
+    ("IS", "ISL", "Iceland", "ISK", ()),
+    ("IN", "IND", "India", "INR", ()),
+    ("ID", "IDN", "Indonesia", "IDR", ()),
+    ("IR", "IRN", "Iran (Islamic Republic of)", "IRR", ("Iran",)),
+    ("IQ", "IRQ", "Iraq", "IQD", ()),
+    ("IE", "IRL", "Ireland", "EUR", ()),
+    ("IM", "IMN", "Isle of Man", "GBP", ()),
+    ("IL", "ISR", "Israel", "ILS", ()),
+    ("IT", "ITA", "Italy", "EUR", ()),
+    ("JM", "JAM", "Jamaica", "JMD", ()),
+    ("JP", "JPN", "Japan", "JPY", ()),
+    ("JE", "JEY", "Jersey", "GBP", ()),
+    ("JO", "JOR", "Jordan", "JOD", ()),
+    ("KZ", "KAZ", "Kazakhstan", "KZT", ()),
+    ("KE", "KEN", "Kenya", "KES", ()),
+    ("KI", "KIR", "Kiribati", "AUD", ()),
+    ("KP", "PRK", "Korea (Democratic People's Republic of)", "KPW", ("North Korea",)),
+    ("KR", "KOR", "Korea, Republic of", "KRW", ("South Korea", "Korea")),
+    ("XK", "XKX", "Kosovo", "EUR", ()),  # User-assigned code, widely used
+    ("KW", "KWT", "Kuwait", "KWD", ()),
+    ("KG", "KGZ", "Kyrgyzstan", "KGS", ()),
+    ("LA", "LAO", "Lao People's Democratic Republic", "LAK", ("Laos",)),
+    ("LV", "LVA", "Latvia", "EUR", ()),
+    ("LB", "LBN", "Lebanon", "LBP", ()),
+    ("LS", "LSO", "Lesotho", "LSL", ()),
+    ("LR", "LBR", "Liberia", "LRD", ()),
+    ("LY", "LBY", "Libya", "LYD", ()),
+    ("LI", "LIE", "Liechtenstein", "CHF", ()),
+    ("LT", "LTU", "Lithuania", "EUR", ()),
+    ("LU", "LUX", "Luxembourg", "EUR", ()),
+    ("MO", "MAC", "Macao", "MOP", ("Macau",)),
+    ("MG", "MDG", "Madagascar", "MGA", ()),
+    ("MW", "MWI", "Malawi", "MWK", ()),
+    ("MY", "MYS", "Malaysia", "MYR", ()),
+    ("MV", "MDV", "Maldives", "MVR", ()),
+    ("ML", "MLI", "Mali", "XOF", ()),
+    ("MT", "MLT", "Malta", "EUR", ()),
+    ("MH", "MHL", "Marshall Islands", "USD", ()),
+    ("MQ", "MTQ", "Martinique", "EUR", ()),
+    ("MR", "MRT", "Mauritania", "MRU", ()),
+    ("MU", "MUS", "Mauritius", "MUR", ()),
+    ("YT", "MYT", "Mayotte", "EUR", ()),
+    ("MX", "MEX", "Mexico", "MXN", ("México",)),
+    ("FM", "FSM", "Micronesia (Federated States of)", "USD", ("Micronesia",)),
+    ("MD", "MDA", "Moldova, Republic of", "MDL", ("Moldova",)),
+    ("MC", "MCO", "Monaco", "EUR", ()),
+    ("MN", "MNG", "Mongolia", "MNT", ()),
+    ("ME", "MNE", "Montenegro", "EUR", ()),
+    ("MS", "MSR", "Montserrat", "XCD", ()),
+    ("MA", "MAR", "Morocco", "MAD", ()),
+    ("MZ", "MOZ", "Mozambique", "MZN", ()),
+    ("MM", "MMR", "Myanmar", "MMK", ("Burma",)),
+    ("NA", "NAM", "Namibia", "NAD", ()),
+    ("NR", "NRU", "Nauru", "AUD", ()),
+    ("NP", "NPL", "Nepal", "NPR", ()),
+    ("NL", "NLD", "Netherlands, Kingdom of the", "EUR", ("Netherlands", "Holland")),
+    ("NC", "NCL", "New Caledonia", "XPF", ()),
+    ("NZ", "NZL", "New Zealand", "NZD", ()),
+    ("NI", "NIC", "Nicaragua", "NIO", ()),
+    ("NE", "NER", "Niger", "XOF", ()),
+    ("NG", "NGA", "Nigeria", "NGN", ()),
+    ("NU", "NIU", "Niue", "NZD", ()),
+    ("NF", "NFK", "Norfolk Island", "AUD", ()),
+    ("MK", "MKD", "North Macedonia", "MKD", ("Macedonia",)),
+    ("MP", "MNP", "Northern Mariana Islands", "USD", ()),
+    ("NO", "NOR", "Norway", "NOK", ()),
+    ("OM", "OMN", "Oman", "OMR", ()),
+    ("PK", "PAK", "Pakistan", "PKR", ()),
+    ("PW", "PLW", "Palau", "USD", ()),
+    ("PS", "PSE", "Palestine, State of", "ILS", ("Palestine",)),
+    ("PA", "PAN", "Panama", "PAB", ()),
+    ("PG", "PNG", "Papua New Guinea", "PGK", ()),
+    ("PY", "PRY", "Paraguay", "PYG", ()),
+    ("PE", "PER", "Peru", "PEN", ()),
+    ("PH", "PHL", "Philippines", "PHP", ()),
+    ("PN", "PCN", "Pitcairn", "NZD", ("Pitcairn Islands",)),
+    ("PL", "POL", "Poland", "PLN", ()),
+    ("PT", "PRT", "Portugal", "EUR", ()),
+    ("PR", "PRI", "Puerto Rico", "USD", ()),
+    ("QA", "QAT", "Qatar", "QAR", ()),
+    ("RE", "REU", "Réunion", "EUR", ()),
+    ("RO", "ROU", "Romania", "RON", ()),
+    ("RU", "RUS", "Russian Federation", "RUB", ("Russia",)),
+    ("RW", "RWA", "Rwanda", "RWF", ()),
+    ("BL", "BLM", "Saint Barthélemy", "EUR", ()),
+    ("SH", "SHN", "Saint Helena, Ascension and Tristan da Cunha", "SHP", ("Saint Helena",)),
+    ("KN", "KNA", "Saint Kitts and Nevis", "XCD", ()),
+    ("LC", "LCA", "Saint Lucia", "XCD", ()),
+    ("MF", "MAF", "Saint Martin (French part)", "EUR", ("Saint Martin",)),
+    ("PM", "SPM", "Saint Pierre and Miquelon", "EUR", ()),
+    ("VC", "VCT", "Saint Vincent and the Grenadines", "XCD", ("Saint Vincent",)),
+    ("WS", "WSM", "Samoa", "WST", ()),
+    ("SM", "SMR", "San Marino", "EUR", ()),
+    ("ST", "STP", "Sao Tome and Principe", "STN", ()),
+    ("SA", "SAU", "Saudi Arabia", "SAR", ()),
+    ("SN", "SEN", "Senegal", "XOF", ()),
+    ("RS", "SRB", "Serbia", "RSD", ()),
+    ("SC", "SYC", "Seychelles", "SCR", ()),
+    ("SL", "SLE", "Sierra Leone", "SLE", ()),
+    ("SG", "SGP", "Singapore", "SGD", ()),
+    ("SX", "SXM", "Sint Maarten (Dutch part)", "XCG", ("Sint Maarten",)),
+    ("SK", "SVK", "Slovakia", "EUR", ()),
+    ("SI", "SVN", "Slovenia", "EUR", ()),
+    ("SB", "SLB", "Solomon Islands", "SBD", ()),
+    ("SO", "SOM", "Somalia", "SOS", ()),
+    ("ZA", "ZAF", "South Africa", "ZAR", ()),
+    ("GS", "SGS", "South Georgia and the South Sandwich Islands", "GBP", ()),
+    ("SS", "SSD", "South Sudan", "SSP", ()),
+    ("ES", "ESP", "Spain", "EUR", ("España",)),
+    ("LK", "LKA", "Sri Lanka", "LKR", ()),
+    ("SD", "SDN", "Sudan", "SDG", ()),
+    ("SR", "SUR", "Suriname", "SRD", ()),
+    ("SJ", "SJM", "Svalbard and Jan Mayen", "NOK", ()),
+    ("SE", "SWE", "Sweden", "SEK", ()),
+    ("CH", "CHE", "Switzerland", "CHF", ()),
+    ("SY", "SYR", "Syrian Arab Republic", "SYP", ("Syria",)),
+    ("TW", "TWN", "Taiwan, Province of China", "TWD", ("Taiwan",)),
+    ("TJ", "TJK", "Tajikistan", "TJS", ()),
+    ("TZ", "TZA", "Tanzania, United Republic of", "TZS", ("Tanzania",)),
+    ("TH", "THA", "Thailand", "THB", ()),
+    ("TL", "TLS", "Timor-Leste", "USD", ("East Timor",)),
+    ("TG", "TGO", "Togo", "XOF", ()),
+    ("TK", "TKL", "Tokelau", "NZD", ()),
+    ("TO", "TON", "Tonga", "TOP", ()),
+    ("TT", "TTO", "Trinidad and Tobago", "TTD", ("Trinidad",)),
+    ("TN", "TUN", "Tunisia", "TND", ()),
+    ("TR", "TUR", "Türkiye", "TRY", ("Turkey",)),
+    ("TM", "TKM", "Turkmenistan", "TMT", ()),
+    ("TC", "TCA", "Turks and Caicos Islands", "USD", ()),
+    ("TV", "TUV", "Tuvalu", "AUD", ()),
+    ("UG", "UGA", "Uganda", "UGX", ()),
+    ("UA", "UKR", "Ukraine", "UAH", ()),
+    ("AE", "ARE", "United Arab Emirates", "AED", ("UAE", "Emirates")),
+    ("GB", "GBR", "United Kingdom of Great Britain and Northern Ireland", "GBP", (
+        "United Kingdom", "UK", "Great Britain", "Britain",
+        "England", "Scotland", "Wales", "Northern Ireland",
+    )),
+    ("US", "USA", "United States of America", "USD", ("United States", "America")),
+    ("UM", "UMI", "United States Minor Outlying Islands", "USD", ()),
+    ("UY", "URY", "Uruguay", "UYU", ()),
+    ("UZ", "UZB", "Uzbekistan", "UZS", ()),
+    ("VU", "VUT", "Vanuatu", "VUV", ()),
+    ("VE", "VEN", "Venezuela (Bolivarian Republic of)", "VES", ("Venezuela",)),
+    ("VN", "VNM", "Viet Nam", "VND", ("Vietnam",)),
+    ("VG", "VGB", "Virgin Islands (British)", "USD", ("British Virgin Islands",)),
+    ("VI", "VIR", "Virgin Islands (U.S.)", "USD", ("US Virgin Islands",)),
+    ("WF", "WLF", "Wallis and Futuna", "XPF", ()),
+    ("EH", "ESH", "Western Sahara", "MAD", ()),
+    ("YE", "YEM", "Yemen", "YER", ()),
+    ("ZM", "ZMB", "Zambia", "ZMW", ()),
+    ("ZW", "ZWE", "Zimbabwe", "USD", ()),  # USD is what is used for payments
+)
+
+# Dots and apostrophes are dropped ("U.S.A." -> "usa"), other punctuation separates words
+_DROPPED = re.compile(r"[.'’]")
+_SEPARATORS = re.compile(r"[^\w]+")
+
+
+def normalize_country(value: str) -> str:
+    """Lookup key for a country name or code: "Côte d'Ivoire" -> "cote divoire" """
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    value = _DROPPED.sub("", value.casefold().replace("&", " and "))
+    words = _SEPARATORS.sub(" ", value).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def _build_index() -> Tuple[Tuple[CountryInfo, ...], Dict[str, CountryInfo]]:
+    countries = []
+    index: Dict[str, CountryInfo] = {}
+    for alpha2, alpha3, name, currency, other_names in _COUNTRY_DATA:
+        minor_units = CURRENCY_MINOR_UNITS.get(currency, DEFAULT_MINOR_UNITS)
+        country = CountryInfo(alpha2, alpha3, name, currency, minor_units)
+        countries.append(country)
+        for key in (alpha2, alpha3, name) + other_names:
+            index.setdefault(normalize_country(key), country)
+    return tuple(countries), index
+
+
+COUNTRIES, _COUNTRY_INDEX = _build_index()
+
+# ISO 3166-1 alpha-2 -> ISO 4217
+COUNTRY_TO_CURRENCY: Dict[str, str] = {
+    country.alpha2: country.currency for country in COUNTRIES if country.currency
+}
+CURRENCY_CODES = frozenset(COUNTRY_TO_CURRENCY.values())
+
+
+def resolve_country(value: Optional[str]) -> Optional[CountryInfo]:
+    """Country for a code or name in any common spelling, or None if unknown"""
+    if not value:
+        return None
+    return _COUNTRY_INDEX.get(normalize_country(value))
+
+
+def currency_for_country(value: Optional[str], default: str = DEFAULT_CURRENCY) -> str:
+    """ISO 4217 currency for a country code or name, `default` if unknown"""
+    country = resolve_country(value)
+    if country is None or country.currency is None:
+        return default
+    return country.currency
@@ -0,0 +1,266 @@
+"""
+Timezone resolution and local birthday windows.
+
+Users only give us a country and a state, so each user is mapped to a single
+IANA timezone: a per-state zone for countries that span several zones, the
+country's zone otherwise, and UTC when we don't know the country. Countries
+are resolved through the ISO index in app/utils/countries.py, so any spelling
+or code it recognises ("NG", "nigeria", "Côte d'Ivoire") finds the same zone.
+
+All datetimes returned here are naive UTC, matching the rest of the schema.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import calendar
+
+from app.utils.countries import normalize_country, resolve_country
+
+DEFAULT_TIMEZONE = "UTC"
+
+# Earliest and latest UTC offsets in use, bounding when any local day can start/end
+EARLIEST_UTC_OFFSET = timedelta(hours=14)
+LATEST_UTC_OFFSET = timedelta(hours=12)
+
+# ISO 3166-1 alpha-2 -> IANA timezone
+COUNTRY_TIMEZONES = {
+    # Africa
+    "NG": "Africa/Lagos",  # Nigeria
+    "GH": "Africa/Accra",  # Ghana
+    "KE": "Africa/Nairobi",  # Kenya
+    "ZA": "Africa/Johannesburg",  # South Africa
+    "EG": "Africa/Cairo",  # Egypt
+    "ET": "Africa/Addis_Ababa",  # Ethiopia
+    "TZ": "Africa/Dar_es_Salaam",  # Tanzania
+    "UG": "Africa/Kampala",  # Uganda
+    "RW": "Africa/Kigali",  # Rwanda
+    "CM": "Africa/Douala",  # Cameroon
+    "SN": "Africa/Dakar",  # Senegal
+    "CI": "Africa/Abidjan",  # Ivory Coast
+    "MA": "Africa/Casablanca",  # Morocco
+    "DZ": "Africa/Algiers",  # Algeria
+    "TN": "Africa/Tunis",  # Tunisia
+    "ZM": "Africa/Lusaka",  # Zambia
+    "ZW": "Africa/Harare",  # Zimbabwe
+    "BW": "Africa/Gaborone",  # Botswana
+    "NA": "Africa/Windhoek",  # Namibia
+    "MW": "Africa/Blantyre",  # Malawi
+    "MZ": "Africa/Maputo",  # Mozambique
+    "AO": "Africa/Luanda",  # Angola
+    "BJ": "Africa/Porto-Novo",  # Benin
+    "TG": "Africa/Lome",  # Togo
+    "SL": "Africa/Freetown",  # Sierra Leone
+    "LR": "Africa/Monrovia",  # Liberia
+    "GM": "Africa/Banjul",  # Gambia
+    "ML": "Africa/Bamako",  # Mali
+    "NE": "Africa/Niamey",  # Niger
+    "BF": "Africa/Ouagadougou",  # Burkina Faso
+    "SD": "Africa/Khartoum",  # Sudan
+    # Europe
+    "GB": "Europe/London",  # United Kingdom
+    "IE": "Europe/Dublin",  # Ireland
+    "FR": "Europe/Paris",  # France
+    "DE": "Europe/Berlin",  # Germany
+    "IT": "Europe/Rome",  # Italy
+    "ES": "Europe/Madrid",  # Spain
+    "PT": "Europe/Lisbon",  # Portugal
+    "NL": "Europe/Amsterdam",  # Netherlands
+    "BE": "Europe/Brussels",  # Belgium
+    "CH": "Europe/Zurich",  # Switzerland
+    "AT": "Europe/Vienna",  # Austria
+    "SE": "Europe/Stockholm",  # Sweden
+    "NO": "Europe/Oslo",  # Norway
+    "DK": "Europe/Copenhagen",  # Denmark
+    "FI": "Europe/Helsinki",  # Finland
+    "PL": "Europe/Warsaw",  # Poland
+    "GR": "Europe/Athens",  # Greece
+    "TR": "Europe/Istanbul",  # Turkey
+    "UA": "Europe/Kyiv",  # Ukraine
+    "RO": "Europe/Bucharest",  # Romania
+    # Middle East / Asia
+    "SA": "Asia/Riyadh",  # Saudi Arabia
+    "AE": "Asia/Dubai",  # United Arab Emirates
+    "QA": "Asia/Qatar",  # Qatar
+    "KW": "Asia/Kuwait",  # Kuwait
+    "BH": "Asia/Bahrain",  # Bahrain
+    "OM": "Asia/Muscat",  # Oman
+    "IL": "Asia/Jerusalem",  # Israel
+    "LB": "Asia/Beirut",  # Lebanon
+    "JO": "Asia/Amman",  # Jordan
+    "IR": "Asia/Tehran",  # Iran
+    "IN": "Asia/Kolkata",  # India
+    "PK": "Asia/Karachi",  # Pakistan
+    "BD": "Asia/Dhaka",  # Bangladesh
+    "LK": "Asia/Colombo",  # Sri Lanka
+    "NP": "Asia/Kathmandu",  # Nepal
+    "CN": "Asia/Shanghai",  # China
+    "HK": "Asia/Hong_Kong",  # Hong Kong
+    "TW": "Asia/Taipei",  # Taiwan
+    "JP": "Asia/Tokyo",  # Japan
+    "KR": "Asia/Seoul",  # South Korea
+    "SG": "Asia/Singapore",  # Singapore
+    "MY": "Asia/Kuala_Lumpur",  # Malaysia
+    "TH": "Asia/Bangkok",  # Thailand
+    "VN": "Asia/Ho_Chi_Minh",  # Vietnam
+    "PH": "Asia/Manila",  # Philippines
+    "ID": "Asia/Jakarta",  # Indonesia
+    # Oceania
+    "AU": "Australia/Sydney",  # Australia
+    "NZ": "Pacific/Auckland",  # New Zealand
+    "FJ": "Pacific/Fiji",  # Fiji
+    "WS": "Pacific/Apia",  # Samoa
+    "KI": "Pacific/Kiritimati",  # Kiribati
+    # Americas
+    "US": "America/New_York",  # United States
+    "CA": "America/Toronto",  # Canada
+    "MX": "America/Mexico_City",  # Mexico
+    "BR": "America/Sao_Paulo",  # Brazil
+    "AR": "America/Argentina/Buenos_Aires",  # Argentina
+    "CO": "America/Bogota",  # Colombia
+    "CL": "America/Santiago",  # Chile
+    "PE": "America/Lima",  # Peru
+    "VE": "America/Caracas",  # Venezuela
+    "EC": "America/Guayaquil",  # Ecuador
+    "GT": "America/Guatemala",  # Guatemala
+    "CU": "America/Havana",  # Cuba
+    "DO": "America/Santo_Domingo",  # Dominican Republic
+    "JM": "America/Jamaica",  # Jamaica
+    "TT": "America/Port_of_Spain",  # Trinidad and Tobago
+}
+
+
+# Countries spanning several zones, keyed by (alpha-2, state)
+STATE_TIMEZONES = {
+    # United States
+    ("US", "Alabama"): "America/Chicago",
+    ("US", "Alaska"): "America/Anchorage",
+    ("US", "Arizona"): "America/Phoenix",
+    ("US", "Arkansas"): "America/Chicago",
+    ("US", "California"): "America/Los_Angeles",
+    ("US", "Colorado"): "America/Denver",
+    ("US", "Hawaii"): "Pacific/Honolulu",
+    ("US", "Idaho"): "America/Boise",
+    ("US", "Illinois"): "America/Chicago",
+    ("US", "Iowa"): "America/Chicago",
+    ("US", "Kansas"): "America/Chicago",
+    ("US", "Louisiana"): "America/Chicago",
+    ("US", "Minnesota"): "America/Chicago",
+    ("US", "Mississippi"): "America/Chicago",
+    ("US", "Missouri"): "America/Chicago",
+    ("US", "Montana"): "America/Denver",
+    ("US", "Nebraska"): "America/Chicago",
+    ("US", "Nevada"): "America/Los_Angeles",
+    ("US", "New Mexico"): "America/Denver",
+    ("US", "North Dakota"): "America/Chicago",
+    ("US", "Oklahoma"): "America/Chicago",
+    ("US", "Oregon"): "America/Los_Angeles",
+    ("US", "South Dakota"): "America/Chicago",
+    ("US", "Tennessee"): "America/Chicago",
+    ("US", "Texas"): "America/Chicago",
+    ("US", "Utah"): "America/Denver",
+    ("US", "Washington"): "America/Los_Angeles",
+    ("US", "Wisconsin"): "America/Chicago",
+    ("US", "Wyoming"): "America/Denver",
+    # Canada
+    ("CA", "British Columbia"): "America/Vancouver",
+    ("CA", "Alberta"): "America/Edmonton",
+    ("CA", "Saskatchewan"): "America/Regina",
+    ("CA", "Manitoba"): "America/Winnipeg",
+    ("CA", "Nova Scotia"): "America/Halifax",
+    ("CA", "New Brunswick"): "America/Moncton",
+    ("CA", "Prince Edward Island"): "America/Halifax",
+    ("CA", "Newfoundland and Labrador"): "America/St_Johns",
+    ("CA", "Yukon"): "America/Whitehorse",
+    ("CA", "Northwest Territories"): "America/Yellowknife",
+    # Australia
+    ("AU", "Western Australia"): "Australia/Perth",
+    ("AU", "South Australia"): "Australia/Adelaide",
+    ("AU", "Northern Territory"): "Australia/Darwin",
+    ("AU", "Queensland"): "Australia/Brisbane",
+    ("AU", "Victoria"): "Australia/Melbourne",
+    ("AU", "Tasmania"): "Australia/Hobart",
+    # Brazil
+    ("BR", "Amazonas"): "America/Manaus",
+    ("BR", "Acre"): "America/Rio_Branco",
+    ("BR", "Mato Grosso"): "America/Cuiaba",
+    ("BR", "Mato Grosso do Sul"): "America/Campo_Grande",
+    ("BR", "Rondônia"): "America/Porto_Velho",
+    ("BR", "Roraima"): "America/Boa_Vista",
+    # Mexico
+    ("MX", "Baja California"): "America/Tijuana",
+    ("MX", "Sonora"): "America/Hermosillo",
+    ("MX", "Chihuahua"): "America/Chihuahua",
+    ("MX", "Sinaloa"): "America/Mazatlan",
+    ("MX", "Quintana Roo"): "America/Cancun",
+    # Indonesia
+    ("ID", "Bali"): "Asia/Makassar",
+    ("ID", "Papua"): "Asia/Jayapura",
+}
+
+
+# (alpha-2, normalized state) -> IANA timezone
+_STATE_TIMEZONE_INDEX = {
+    (alpha2, normalize_country(state)): tz_name
+    for (alpha2, state), tz_name in STATE_TIMEZONES.items()
+}
+
+
+@lru_cache(maxsize=4096)
+def resolve_timezone(country: str, state: str = None) -> str:
+    """Get the IANA timezone name for a country/state, falling back to UTC"""
+    info = resolve_country(country)
+    if info is None:
+        return DEFAULT_TIMEZONE
+    return (
+        _STATE_TIMEZONE_INDEX.get((info.alpha2, normalize_country(state or "")))
+        or COUNTRY_TIMEZONES.get(info.alpha2)
+        or DEFAULT_TIMEZONE
+    )
+
+
+@lru_cache(maxsize=None)
+def _zone(tz_name: str):
+    try:
+        return ZoneInfo(tz_name)
+    except ZoneInfoNotFoundError:
+        return timezone.utc
+
+
+def observed_birthday(month: int, day: int, year: int) -> date:
+    """Date a birthday is celebrated in a year (Feb 29 falls on Feb 28 in common years)"""
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return date(year, month, day)
+
+
+def observed_tribe_ids(day: date) -> list:
+    """Tribe IDs (MM-DD) whose birthday is celebrated on a given date"""
+    tribe_ids = [f"{day.month:02d}-{day.day:02d}"]
+    if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+        tribe_ids.append("02-29")
+    return tribe_ids
+
+
+def local_day_window(day: date, tz_name: str) -> Tuple[datetime, datetime]:
+    """
+    UTC interval [opens_at, closes_at) covering a local calendar day.
+
+    Computed from local midnights, so DST-shortened/lengthened days are exact.
+    """
+    zone = _zone(tz_name)
+    start = datetime.combine(day, time.min, tzinfo=zone)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+    return (
+        start.astimezone(timezone.utc).replace(tzinfo=None),
+        end.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+def global_day_window(day: date) -> Tuple[datetime, datetime]:
+    """UTC interval during which `day` is the local date somewhere on Earth"""
+    midnight = datetime.combine(day, time.min)
+    return (
+        midnight - EARLIEST_UTC_OFFSET,
+        midnight + timedelta(days=1) + LATEST_UTC_OFFSET,
+    )
@@ -9,7 +9,23 @@ import logging
 
 from app.core.config import settings
 from app.core.security import limiter, RateLimitExceeded, _rate_limit_exceeded_handler
+from app.core.scheduler import register_job, start_scheduler, stop_scheduler
+from app.core.http_client import start_http_clients, close_http_clients
 from app.api.routes import auth, users, tribes, rooms, gifts, admin, upload, buddy, ai, payments
+from app.services.tribe_stats_service import TribeStatsService
+from app.services.tribe_room_service import TribeRoomService
+from app.services.birthday_window_service import BirthdayWindowService
+from app.services.lifecycle_service import LifecycleService
+from app.services.message_queue import message_queue
+from app.services.payment_webhook_service import webhook_worker
+from app.services.gift_card_service import gift_card_worker
+from app.services.payment_reconciliation_service import PaymentReconciliationService
+from app.services.payment_outbox_service import PaymentOutboxService
+from app.services.gift_stats_service import GiftStatsService
+from app.services.message_partition_service import MessagePartitionService
+from app.services.presence_service import PresenceService
+from app.services.currency_service import CurrencyService, CACHE_DURATION, REFRESH_AHEAD
+from app.services.gift_catalog_service import GiftCatalogService
 
 load_dotenv()
 
@@ -93,8 +109,43 @@ async def lifespan(app: FastAPI):
     # Run migrations automatically
     run_migrations()
     
+    # Pooled outbound HTTP clients (used by requests and jobs alike)
+    start_http_clients()
+    
+    # Background maintenance jobs
+    register_job("tribe_stats_reconcile", 24 * 60 * 60, TribeStatsService.run_reconciliation)
+    register_job("gift_stats_reconcile", 24 * 60 * 60, GiftStatsService.run_reconciliation)
+    register_job("tribe_room_provisioning", 60 * 60, TribeRoomService.run_provisioning)
+    register_job("birthday_window_precompute", 60 * 60, BirthdayWindowService.run_precompute)
+    register_job("lifecycle_sweep", 60, LifecycleService.run_sweep)
+    register_job("message_partition_maintenance", 24 * 60 * 60, MessagePartitionService.run_maintenance)
+    register_job("presence_flush", 30, PresenceService.run_flush, run_at_startup=False)
+    register_job(
+        "exchange_rate_refresh",
+        (CACHE_DURATION - REFRESH_AHEAD).total_seconds(),
+        CurrencyService.refresh_rates
+    )
+    register_job("gift_catalog_refresh", 5 * 60, GiftCatalogService.run_refresh)
+    register_job("payment_reconciliation", 5 * 60, PaymentReconciliationService.run_reconciliation)
+    register_job("payment_outbox_relay", 30, PaymentOutboxService.run_relay)
+    start_scheduler()
+    
+    # Group-commit queue for chat messages
+    await message_queue.start()
+    
+    # Background processing of stored payment webhooks
+    await webhook_worker.start()
+    
+    # Background gift card fulfillment
+    await gift_card_worker.start()
+    
     yield
     # Shutdown
+    await gift_card_worker.stop()
+    await webhook_worker.stop()
+    await message_queue.stop()
+    await stop_scheduler()
+    await close_http_clients()
     print("👋 Happy Birthday Mate API shutting down...")
 
 
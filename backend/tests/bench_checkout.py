@@ -0,0 +1,153 @@
+"""
+Benchmark POST /api/gifts/send under concurrency.
+
+Runs the app in-process (httpx ASGITransport) on a throwaway SQLite database
+against a local Flutterwave stand-in with a fixed initialization latency,
+and reports throughput, latency percentiles, errors and the peak number of
+database connections checked out of the pool.
+
+    cd backend && python -m tests.bench_checkout --requests 200 --concurrency 10 20 40
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='hbm-bench-')}/bench.db"
+os.environ.setdefault("FLUTTERWAVE_SECRET_KEY", "sk_test")
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402
+import app.models as models  # noqa: E402
+from app.core import auth as core_auth  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.flutterwave_service import FlutterwaveService  # noqa: E402
+from tests.fake_flutterwave import FakeFlutterwave  # noqa: E402
+
+
+def _setup():
+    """Sender, recipient and a catalog item; returns (sender, recipient id, catalog id)"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = []
+        for n in (1, 2):
+            user = models.User(
+                firebase_uid=f"bench-{n}",
+                email=f"bench{n}@example.com",
+                first_name=f"Bench{n}",
+                date_of_birth=date(1990, 5, 5),
+                gender=models.GenderEnum.FEMALE,
+                country="United States",
+                state="California",
+                currency="USD",
+                profile_picture_url="https://example.com/p.png",
+                birth_month=5,
+                birth_day=5,
+                tribe_id="05-05",
+                consent_given=True,
+                is_active=True
+            )
+            db.add(user)
+            users.append(user)
+        item = models.GiftCatalog(
+            gift_type=models.GiftTypeEnum.DIGITAL_CARD,
+            name="Card",
+            description="A card",
+            price=5,
+            currency="USD",
+            is_active=True
+        )
+        db.add(item)
+        db.commit()
+        sender = users[0]
+        recipient_id, item_id = users[1].id, item.id
+        db.refresh(sender)
+        db.expunge(sender)
+        return sender, recipient_id, item_id
+    finally:
+        db.close()
+
+
+async def _run(total: int, concurrency: int, recipient_id: int, item_id: int) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    connections = {"current": 0, "peak": 0}
+
+    # Pool events fire inside the blocking calls, where a sampling task couldn't run
+    def on_checkout(*_):
+        connections["current"] += 1
+        connections["peak"] = max(connections["peak"], connections["current"])
+
+    def on_checkin(*_):
+        connections["current"] -= 1
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def checkout():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/gifts/send", json={
+                    "recipient_id": recipient_id,
+                    "gift_catalog_id": item_id,
+                    "payment_provider": "flutterwave"
+                })
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or not (response.json().get("payment_data") or {}).get("payment_url"):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(checkout() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    event.remove(engine, "checkout", on_checkout)
+    event.remove(engine, "checkin", on_checkin)
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000),
+        "errors": errors,
+        "peak_db_connections": connections["peak"]
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--latency-ms", type=int, default=200, help="Flutterwave initialization latency")
+    args = parser.parse_args()
+
+    flutterwave = FakeFlutterwave().start()
+    flutterwave.initialize_delay = args.latency_ms / 1000
+    FlutterwaveService.BASE_URL = flutterwave.base_url
+
+    sender, recipient_id, item_id = _setup()
+
+    async def current_user():
+        return sender
+
+    main.app.dependency_overrides[core_auth.get_current_user] = current_user
+    main.app.state.limiter.enabled = False
+    try:
+        for concurrency in args.concurrency:
+            print(asyncio.run(_run(args.requests, concurrency, recipient_id, item_id)))
+    finally:
+        flutterwave.stop()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,89 @@
+"""
+Benchmark message ingestion: one INSERT and commit per message vs the group-commit queue.
+
+Writes to a throwaway SQLite database. Each sender posts messages back to
+back; throughput, latency percentiles and the number of commits are reported
+for both paths at each concurrency.
+
+    cd backend && python -m tests.bench_message_queue --messages 2000 --concurrency 1 10 50 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='hbm-bench-')}/bench.db"
+
+from sqlalchemy import event  # noqa: E402
+
+import app.models as models  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.message_queue import MessageIngestQueue  # noqa: E402
+
+
+def _insert_one(room_id: int, user_id: int, content: str) -> int:
+    """The path without the queue: one session, INSERT and commit per message"""
+    db = SessionLocal()
+    try:
+        message = models.Message(room_id=room_id, user_id=user_id, content=content)
+        db.add(message)
+        db.commit()
+        return message.id
+    finally:
+        db.close()
+
+
+async def _run(path: str, total: int, concurrency: int) -> dict:
+    queue = MessageIngestQueue()
+    if path == "queued":
+        await queue.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    commits = {"count": 0}
+
+    def on_commit(*_):
+        commits["count"] += 1
+    event.listen(engine, "commit", on_commit)
+
+    async def send(n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            if path == "queued":
+                await queue.submit(1, n % 100 + 1, f"message {n}")
+            else:
+                await asyncio.to_thread(_insert_one, 1, n % 100 + 1, f"message {n}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(n) for n in range(total)))
+    elapsed = time.perf_counter() - started
+    await queue.stop()
+    event.remove(engine, "commit", on_commit)
+
+    latencies.sort()
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "messages": total,
+        "msgs_per_s": round(total / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        "commits": commits["count"]
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    for concurrency in args.concurrency:
+        for path in ("direct", "queued"):
+            print(asyncio.run(_run(path, args.messages, concurrency)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,44 @@
+"""
+Benchmark sanitize_input against the original implementation.
+
+The original is the reference copy kept in tests/test_sanitize_input.py.
+Each input class is timed with timeit; the two implementations produce
+identical output (which is asserted before timing).
+
+    cd backend && python -m tests.bench_sanitize_input --number 20000
+"""
+import argparse
+import timeit
+
+from app.core.security import sanitize_input
+from tests.test_sanitize_input import _reference_sanitize
+
+INPUTS = {
+    "plain": "Happy birthday! Hope your day is as amazing as you are 🎉",
+    "apostrophe": "It's your day, enjoy it & eat lots of cake",
+    "long_plain": "Wishing you the very best on your birthday. " * 22,
+    "markup": '<b>Happy</b> birthday <a href="x" onclick="alert(1)">friend</a>',
+    "hostile": "<script>alert('x')</script><iframe src=javascript:evil()><style>*{}</style>",
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=20000, help="Calls per input and implementation")
+    args = parser.parse_args()
+
+    for name, text in INPUTS.items():
+        assert sanitize_input(text) == _reference_sanitize(text)
+        before = min(timeit.repeat(lambda: _reference_sanitize(text), number=args.number, repeat=3))
+        after = min(timeit.repeat(lambda: sanitize_input(text), number=args.number, repeat=3))
+        print({
+            "input": name,
+            "chars": len(text),
+            "before_us": round(before / args.number * 1e6, 2),
+            "after_us": round(after / args.number * 1e6, 2),
+            "speedup": round(before / after, 1),
+        })
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,108 @@
+"""
+Benchmark random tribe-member sampling: ORDER BY random() vs the indexed random_key scan.
+
+Fills a throwaway SQLite database with a synthetic user table (by default a
+million users, a tenth of them in one popular tribe, the rest spread over the
+year) and times both strategies on the popular tribe and on a typical one.
+
+    cd backend && python -m tests.bench_tribe_sampling --users 1000000 --calls 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='hbm-bench-')}/bench.db"
+
+from sqlalchemy import func, insert  # noqa: E402
+
+import app.models as models  # noqa: E402
+from app.api.routes.users import TRIBE_MEMBER_COLUMNS, _sample_tribe_members  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+
+POPULAR_TRIBE = "09-09"
+TYPICAL_TRIBE = "03-14"
+BATCH_SIZE = 50_000
+
+
+def _fill(users: int, popular_share: float) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    table = models.User.__table__
+    with engine.begin() as conn:
+        for start in range(0, users, BATCH_SIZE):
+            rows = []
+            for n in range(start, min(users, start + BATCH_SIZE)):
+                if rng.random() < popular_share:
+                    month, day = 9, 9
+                else:
+                    month, day = rng.randint(1, 12), rng.randint(1, 28)
+                rows.append({
+                    "firebase_uid": f"uid-{n}",
+                    "email": f"user{n}@example.com",
+                    "first_name": f"User{n}",
+                    "date_of_birth": date(1990, month, day),
+                    "gender": models.GenderEnum.FEMALE,
+                    "country": "Nigeria",
+                    "state": "Lagos",
+                    "profile_picture_url": "https://example.com/p.png",
+                    "birth_month": month,
+                    "birth_day": day,
+                    "tribe_id": f"{month:02d}-{day:02d}",
+                    "random_key": rng.random(),
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            conn.execute(insert(table), rows)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _order_by_random(db, tribe_id: str, limit: int) -> list:
+    """The previous strategy"""
+    return db.query(*TRIBE_MEMBER_COLUMNS).filter(
+        models.User.tribe_id == tribe_id,
+        models.User.is_active == True
+    ).order_by(func.random()).limit(limit).all()
+
+
+def _time(sample, db, tribe_id: str, limit: int, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        assert len(sample(db, tribe_id, limit)) == limit
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--popular-share", type=float, default=0.1, help=f"Share of users in {POPULAR_TRIBE}")
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _fill(args.users, args.popular_share)
+    print(f"Filled {args.users} users in {time.perf_counter() - started:.0f}s")
+
+    db = SessionLocal()
+    try:
+        for tribe_id in (POPULAR_TRIBE, TYPICAL_TRIBE):
+            size = db.query(func.count(models.User.id)).filter(models.User.tribe_id == tribe_id).scalar()
+            print({
+                "tribe": tribe_id,
+                "members": size,
+                "limit": args.limit,
+                "order_by_random_ms": round(_time(_order_by_random, db, tribe_id, args.limit, args.calls), 3),
+                "random_key_ms": round(_time(_sample_tribe_members, db, tribe_id, args.limit, args.calls), 3),
+            })
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main_cli()
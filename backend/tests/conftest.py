@@ -0,0 +1,158 @@
+"""
+Shared fixtures: the app against a throwaway SQLite database.
+
+The environment is set before anything from app/ is imported, since
+settings and the engine are built at import time.
+"""
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="hbm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.setdefault("FLUTTERWAVE_SECRET_KEY", "sk_test")
+
+from datetime import date  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+import app.models as models  # noqa: E402
+from app.core import auth as core_auth  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.digital_gift_service import DigitalGiftService  # noqa: E402
+from app.services.flutterwave_service import FlutterwaveService  # noqa: E402
+from tests.fake_flutterwave import FakeFlutterwave  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def _clean_tables():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class _CurrentUser:
+    user = None
+
+
+@pytest.fixture
+def client():
+    """Test client whose authenticated user is set with login()"""
+    app = main.app
+    app.state.limiter.enabled = False
+
+    async def current_user():
+        return _CurrentUser.user
+
+    app.dependency_overrides[core_auth.get_current_user] = current_user
+    app.dependency_overrides[core_auth.get_optional_user] = current_user
+    app.dependency_overrides[core_auth.require_admin] = current_user
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        _CurrentUser.user = None
+
+
+@pytest.fixture
+def login():
+    def _login(user_id: int):
+        session = SessionLocal()
+        try:
+            user = session.get(models.User, user_id)
+            session.expunge(user)
+        finally:
+            session.close()
+        _CurrentUser.user = user
+        return user
+    return _login
+
+
+@pytest.fixture
+def make_user(client):
+    """Sign a user up through the API; returns the signup response"""
+    counter = iter(range(1, 10_000))
+
+    def _make_user(country: str = "Nigeria", date_of_birth: date = date(1990, 5, 5)):
+        n = next(counter)
+        response = client.post("/api/auth/signup", json={
+            "firebase_uid": f"uid-{n:08d}",
+            "email": f"user{n}@example.com",
+            "first_name": f"User{n}",
+            "date_of_birth": date_of_birth.isoformat(),
+            "gender": "female",
+            "country": country,
+            "state": "Lagos",
+            "profile_picture_url": "https://example.com/p.png",
+            "consent_given": True
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return _make_user
+
+
+@pytest.fixture
+def flutterwave(monkeypatch):
+    """Fake Flutterwave API that FlutterwaveService talks to for the test"""
+    fake = FakeFlutterwave().start()
+    monkeypatch.setattr(FlutterwaveService, "BASE_URL", fake.base_url)
+    try:
+        yield fake
+    finally:
+        fake.stop()
+
+
+@pytest.fixture
+def make_gift(db, make_user):
+    """Insert a pending Flutterwave gift between two new users"""
+    def _make_gift(
+        gift_type=models.GiftTypeEnum.DIGITAL_CARD,
+        amount=5,
+        currency="USD",
+        tx_ref=None,
+        payment_status="pending",
+        **fields
+    ):
+        sender = make_user(country="United States")
+        recipient = make_user(country="United States")
+        gift = models.Gift(
+            sender_id=sender["id"],
+            recipient_id=recipient["id"],
+            gift_type=gift_type,
+            gift_name="Card",
+            amount=amount,
+            currency=currency,
+            payment_provider=models.PaymentProviderEnum.FLUTTERWAVE,
+            payment_status=payment_status,
+            payment_intent_id=tx_ref or FlutterwaveService.generate_tx_ref(),
+            **fields
+        )
+        db.add(gift)
+        db.commit()
+        return gift
+    return _make_gift
+
+
+@pytest.fixture
+def activations(monkeypatch):
+    """Record DigitalGiftService.activate_gift calls (gift ids) instead of delivering"""
+    calls = []
+
+    async def activate(gift, db):
+        calls.append(gift.id)
+        return {"success": True}
+    monkeypatch.setattr(DigitalGiftService, "activate_gift", activate)
+    return calls
@@ -0,0 +1,109 @@
+"""
+Local stand-in for the Flutterwave API.
+
+Serves the endpoints FlutterwaveService calls (payment initialization and
+transaction verification by id or tx_ref) from an in-memory transaction
+table, with switches for failures and latency.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeFlutterwave:
+    """Threaded HTTP server answering like Flutterwave's v3 API"""
+
+    def __init__(self):
+        # transaction id -> {tx_ref, amount, currency, status}
+        self.transactions: Dict[str, Dict] = {}
+        self.initialized: Dict[str, Dict] = {}  # tx_ref -> initialization body
+        self.calls = 0
+        self.fail_initialize = False
+        self.fail_verify = 0  # answer the next N verifications with a 500
+        self.initialize_delay = 0.0
+        self.verify_delay = 0.0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def add_transaction(self, transaction_id: int, tx_ref: str, amount, currency: str, status: str = "successful"):
+        self.transactions[str(transaction_id)] = {
+            "tx_ref": tx_ref,
+            "amount": float(amount),
+            "currency": currency,
+            "status": status
+        }
+
+    def start(self) -> "FakeFlutterwave":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, code: int, body: Dict):
+                raw = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.calls += 1
+                    failing = fake.fail_verify > 0
+                    if failing:
+                        fake.fail_verify -= 1
+                if fake.verify_delay:
+                    time.sleep(fake.verify_delay)
+                if failing:
+                    return self._send(500, {"status": "error", "message": "Internal error"})
+
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if parts[-1] == "verify":
+                    found = {parts[-2]: fake.transactions.get(parts[-2])}
+                elif parts[-1] == "verify_by_reference":
+                    tx_ref = parse_qs(url.query).get("tx_ref", [""])[0]
+                    found = {tid: t for tid, t in fake.transactions.items() if t["tx_ref"] == tx_ref}
+                else:
+                    return self._send(404, {"status": "error", "message": "Not found"})
+
+                for transaction_id, transaction in found.items():
+                    if transaction:
+                        return self._send(200, {"status": "success", "data": {"id": int(transaction_id), **transaction}})
+                return self._send(404, {"status": "error", "message": "No transaction was found for this id"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.calls += 1
+                if fake.initialize_delay:
+                    time.sleep(fake.initialize_delay)
+                if fake.fail_initialize:
+                    return self._send(500, {"status": "error", "message": "Internal error"})
+                fake.initialized[body.get("tx_ref", "")] = body
+                self._send(200, {
+                    "status": "success",
+                    "data": {"link": f"https://checkout.example/pay/{body.get('tx_ref', '')}"}
+                })
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.request_queue_size = 256
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
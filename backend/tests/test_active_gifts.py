@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.models import GiftTypeEnum
+from app.services import digital_gift_service
+from app.services.digital_gift_service import DigitalGiftService
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(digital_gift_service, "_active_gifts_cache", {})
+
+
+@pytest.fixture
+def recipient(make_user):
+    return make_user()["id"]
+
+
+@pytest.fixture
+def delivered_gift(db, make_user, recipient):
+    """Insert a completed gift delivered `hours_ago`; legacy gifts have no stored expires_at"""
+    sender = make_user()["id"]
+
+    def _delivered_gift(gift_type, hours_ago, legacy=False, **fields):
+        delivered_at = datetime.utcnow() - timedelta(hours=hours_ago)
+        duration = digital_gift_service.GIFT_ACTIVE_DURATIONS.get(gift_type)
+        gift = models.Gift(
+            sender_id=sender,
+            recipient_id=recipient,
+            gift_type=gift_type,
+            gift_name=fields.pop("gift_name", "Gift"),
+            amount=1,
+            currency="USD",
+            payment_provider=models.PaymentProviderEnum.FLUTTERWAVE,
+            payment_status=fields.pop("payment_status", "completed"),
+            is_delivered=True,
+            delivered_at=delivered_at,
+            expires_at=None if legacy or not duration else delivered_at + duration,
+            **fields
+        )
+        db.add(gift)
+        db.commit()
+        return gift.id
+    return _delivered_gift
+
+
+def _ids(active, kind):
+    return [entry["gift_id"] for entry in active[kind]]
+
+
+def test_only_gifts_inside_their_window_are_active(db, recipient, delivered_gift):
+    confetti = delivered_gift(GiftTypeEnum.CONFETTI_EFFECT, hours_ago=2)
+    delivered_gift(GiftTypeEnum.CONFETTI_EFFECT, hours_ago=25)
+    highlight = delivered_gift(GiftTypeEnum.WALL_HIGHLIGHT, hours_ago=30)
+    badge = delivered_gift(GiftTypeEnum.CELEBRANT_BADGE, hours_ago=1, gift_name="Golden Star")
+    card = delivered_gift(GiftTypeEnum.DIGITAL_CARD, hours_ago=24 * 30)
+    delivered_gift(GiftTypeEnum.FEATURED_MESSAGE, hours_ago=1, payment_status="pending")
+
+    active = DigitalGiftService.get_active_gifts_for_user(recipient, db)
+
+    assert _ids(active, "confetti_effects") == [confetti]
+    assert _ids(active, "wall_highlights") == [highlight]
+    assert _ids(active, "badges") == [badge]
+    assert active["badges"][0]["badge_type"] == "golden"
+    assert _ids(active, "digital_cards") == [card]
+    assert active["featured_messages"] == []
+
+
+def test_gifts_without_stored_expiry_use_their_type_duration(db, recipient, delivered_gift):
+    delivered_gift(GiftTypeEnum.CONFETTI_EFFECT, hours_ago=30, legacy=True)
+    highlight = delivered_gift(GiftTypeEnum.WALL_HIGHLIGHT, hours_ago=30, legacy=True)
+
+    active = DigitalGiftService.get_active_gifts_for_user(recipient, db)
+
+    assert active["confetti_effects"] == []
+    assert _ids(active, "wall_highlights") == [highlight]
+    delivered_at = datetime.fromisoformat(active["wall_highlights"][0]["delivered_at"])
+    assert datetime.fromisoformat(active["wall_highlights"][0]["expires_at"]) == delivered_at + timedelta(hours=48)
+
+
+def test_cache_lasts_until_the_first_expiry_and_deliveries_invalidate_it(db, recipient, delivered_gift):
+    confetti = delivered_gift(GiftTypeEnum.CONFETTI_EFFECT, hours_ago=23.99)  # Expires in 36s
+    first = DigitalGiftService.get_active_gifts_for_user(recipient, db)
+    expires_at = datetime.fromisoformat(first["confetti_effects"][0]["expires_at"])
+    assert digital_gift_service._active_gifts_cache[recipient][1] == expires_at
+
+    # Served from the cache: a gift added behind its back is not seen yet
+    card = delivered_gift(GiftTypeEnum.DIGITAL_CARD, hours_ago=0)
+    assert DigitalGiftService.get_active_gifts_for_user(recipient, db) is first
+
+    # A delivery in this process drops the recipient's entry
+    DigitalGiftService.mark_delivered(db.get(models.Gift, card), db)
+    refreshed = DigitalGiftService.get_active_gifts_for_user(recipient, db)
+    assert _ids(refreshed, "confetti_effects") == [confetti]
+    assert _ids(refreshed, "digital_cards") == [card]
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import app.models as models
+from app.services.lifecycle_service import LifecycleService
+
+
+def _closed_wall(db, owner_id):
+    now = datetime.utcnow()
+    wall = models.BirthdayWall(
+        owner_id=owner_id,
+        opens_at=now - timedelta(days=3),
+        closes_at=now - timedelta(minutes=1),
+        birthday_year=now.year,
+        public_url_code="wall-code"
+    )
+    db.add(wall)
+    db.commit()
+    return wall
+
+
+def test_wall_is_archived_only_once_swept(client, db, make_user):
+    owner = make_user()
+    visitor = make_user()
+    _closed_wall(db, owner["id"])
+
+    # Past closes_at, but the sweep hasn't archived it yet
+    before = client.get("/api/rooms/birthday-wall/wall-code", params={"user_id": visitor["id"]})
+    assert before.status_code == 200
+    assert before.json()["is_archived"] is False
+    assert before.json()["is_open"] is True
+
+    assert LifecycleService.sweep(db)["walls_archived"] == 1
+
+    denied = client.get("/api/rooms/birthday-wall/wall-code", params={"user_id": visitor["id"]})
+    assert denied.status_code == 403
+    archived = client.get("/api/rooms/birthday-wall/wall-code", params={"user_id": owner["id"]})
+    assert archived.json()["is_archived"] is True
+    assert archived.json()["is_open"] is False
+
+
+def test_archive_listing_reads_stored_state(client, db, make_user):
+    owner = make_user()
+    _closed_wall(db, owner["id"])
+
+    def listed():
+        response = client.get(f"/api/rooms/birthday-wall/user/{owner['id']}/archive")
+        assert response.status_code == 200, response.text
+        return response.json()["archive"][0]["walls"][0]
+
+    assert listed()["is_archived"] is False
+    LifecycleService.sweep(db)
+    assert listed()["is_archived"] is True
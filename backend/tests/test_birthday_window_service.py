@@ -0,0 +1,66 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+
+import app.models as models
+from app.core.database import engine
+from app.services.birthday_window_service import BirthdayWindowService
+from app.utils.timezones import resolve_timezone
+
+
+@pytest.fixture
+def statements():
+    """SQL statements executed while the fixture is active"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_precomputed_window_is_read_with_one_select(db, make_user, statements):
+    today = date.today()
+    user = make_user(country="Nigeria", date_of_birth=date(1990, today.month, today.day))
+    assert BirthdayWindowService.precompute(db, today, 1) == 1
+    db.commit()
+    member = db.get(models.User, user["id"])
+    statements.clear()
+
+    window = BirthdayWindowService.get_current_window(db, member)
+
+    assert statements == ["SELECT"]
+    assert window.id is not None
+    assert window.birthday_date == today
+    assert window.tz == "Africa/Lagos"
+
+
+def test_missing_window_is_computed_without_writing(db, make_user, statements):
+    user = make_user(country="Nigeria", date_of_birth=date(1990, 1, 1))
+    member = db.get(models.User, user["id"])
+    statements.clear()
+
+    # Late on Dec 31 UTC it is already Jan 1 in Lagos
+    window = BirthdayWindowService.get_current_window(db, member, datetime(2030, 12, 31, 23, 30))
+
+    assert statements == ["SELECT"]
+    assert window.id is None
+    assert window.birthday_date == date(2031, 1, 1)
+    assert window.is_open(datetime(2030, 12, 31, 23, 30))
+    assert db.query(models.BirthdayWindow).count() == 0
+
+
+@pytest.mark.parametrize("country, state, expected", [
+    ("Nigeria", "Lagos", "Africa/Lagos"),
+    ("nigeria", None, "Africa/Lagos"),
+    ("NG", "", "Africa/Lagos"),
+    ("Cote d'Ivoire", None, "Africa/Abidjan"),
+    ("USA", "california", "America/Los_Angeles"),
+    ("United States", "Ohio", "America/New_York"),
+    ("Atlantis", "Lagos", "UTC"),
+    (None, None, "UTC"),
+])
+def test_resolve_timezone_uses_country_index(country, state, expected):
+    assert resolve_timezone(country, state) == expected
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.services import celebrant_service
+from app.services.celebrant_service import CelebrantService
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    celebrant_service._state_celebrant_cache.clear()
+    yield
+    celebrant_service._state_celebrant_cache.clear()
+
+
+def test_cache_keeps_at_most_max_entries(db, monkeypatch):
+    monkeypatch.setattr(celebrant_service, "MAX_CACHE_ENTRIES", 3)
+
+    for n in range(5):
+        CelebrantService.get_state_celebrants(db, f"State {n}")
+
+    assert [key[2] for key in celebrant_service._state_celebrant_cache] == ["State 2", "State 3", "State 4"]
+
+
+def test_expired_entries_are_dropped_and_rebuilt(db, make_user):
+    today = date.today()
+    make_user(date_of_birth=date(1990, today.month, today.day))
+    CelebrantService.get_state_celebrants(db, "Lagos")
+    CelebrantService.get_state_celebrants(db, "Unknown")
+
+    # Age the "Unknown" entry past the TTL
+    key = (today, "", "Unknown")
+    entry, _ = celebrant_service._state_celebrant_cache[key]
+    celebrant_service._state_celebrant_cache[key] = (entry, datetime.utcnow() - celebrant_service.CACHE_DURATION)
+    celebrant_service._state_celebrant_cache.pop((today, "", "Lagos"))
+
+    assert CelebrantService.get_state_celebrants(db, "Lagos")["total_celebrants"] == 1
+    assert key not in celebrant_service._state_celebrant_cache
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+import pytest
+
+from app.utils import countries
+from app.utils.countries import (
+    COUNTRIES,
+    COUNTRY_TO_CURRENCY,
+    currency_for_country,
+    normalize_country,
+    resolve_country,
+)
+
+
+@pytest.mark.parametrize("value, alpha2", [
+    ("Nigeria", "NG"),
+    ("ng", "NG"),
+    ("NGA", "NG"),
+    ("Côte d'Ivoire", "CI"),
+    ("cote divoire", "CI"),
+    ("Ivory Coast", "CI"),
+    ("U.S.A.", "US"),
+    ("the United States", "US"),
+    ("  united   states of america ", "US"),
+    ("UK", "GB"),
+    ("Trinidad & Tobago", "TT"),
+    ("DRC", "CD"),
+    ("Republic of the Congo", "CG"),
+    ("Korea", "KR"),
+    ("Åland Islands", "AX"),
+])
+def test_common_spellings_resolve(value, alpha2):
+    assert resolve_country(value).alpha2 == alpha2
+
+
+@pytest.mark.parametrize("value", [None, "", "Atlantis", "the"])
+def test_unknown_countries_do_not_resolve(value):
+    assert resolve_country(value) is None
+
+
+def test_normalization():
+    assert normalize_country("Côte d'Ivoire") == "cote divoire"
+    assert normalize_country("Bosnia-and-Herzegovina") == "bosnia and herzegovina"
+    assert normalize_country("The Gambia") == "gambia"
+
+
+def test_codes_and_names_are_unambiguous():
+    assert len({c.alpha2 for c in COUNTRIES}) == len(COUNTRIES)
+    assert len({c.alpha3 for c in COUNTRIES}) == len(COUNTRIES)
+
+    # The index keeps the first country per key, so a shared key would silently shadow one
+    owners = defaultdict(set)
+    for alpha2, alpha3, name, _, other_names in countries._COUNTRY_DATA:
+        for key in (alpha2, alpha3, name) + other_names:
+            owners[normalize_country(key)].add(alpha2)
+    assert {key: codes for key, codes in owners.items() if len(codes) > 1} == {}
+
+
+def test_currencies_and_minor_units():
+    assert currency_for_country("Japan") == "JPY"
+    assert resolve_country("Japan").minor_units == 0
+    assert resolve_country("Kuwait").minor_units == 3
+    assert resolve_country("Ghana").minor_units == 2
+    assert currency_for_country("Antarctica") == "USD"
+    assert currency_for_country("Atlantis", default="EUR") == "EUR"
+    assert "AQ" not in COUNTRY_TO_CURRENCY
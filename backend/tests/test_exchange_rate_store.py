@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.currency_service import CACHE_DURATION, REFRESH_AHEAD, ExchangeRateStore
+
+
+class FakeRateApi:
+    """exchangerate-api.com stand-in serving a configurable USD table"""
+
+    def __init__(self):
+        self.rates = {"USD": 1, "NGN": 1500.0, "EUR": 0.9}
+        self.status = 200
+        self.delay = 0.0
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake.requests += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+                raw = json.dumps({"base": "USD", "rates": fake.rates}).encode()
+                self.send_response(fake.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v4/latest/USD"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def rate_api():
+    fake = FakeRateApi()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return tmp_path / "rates.json"
+
+
+def test_concurrent_cold_misses_share_one_fetch(rate_api, snapshot_path):
+    rate_api.delay = 0.2
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    async def run():
+        return await asyncio.gather(*(store.get_rates("USD") for _ in range(20)))
+
+    results = asyncio.run(run())
+
+    assert rate_api.requests == 1
+    assert all(rates["NGN"] == 1500.0 for rates in results)
+    # The fetched table is snapshotted for the next cold start
+    assert json.loads(snapshot_path.read_text())["rates"]["NGN"] == 1500.0
+
+
+def test_rates_for_other_bases_are_derived_locally(rate_api, snapshot_path):
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    async def run():
+        return await store.get_rates("NGN"), await store.get_rates("eur")
+
+    ngn, eur = asyncio.run(run())
+
+    assert rate_api.requests == 1
+    assert ngn["USD"] == pytest.approx(1 / 1500)
+    assert eur["NGN"] == pytest.approx(1500 / 0.9)
+
+
+def test_table_is_refreshed_ahead_of_expiry_without_blocking(rate_api, snapshot_path):
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    async def run():
+        await store.get_rates("USD")
+        assert rate_api.requests == 1
+
+        # Fresh: served without a request
+        await store.get_rates("USD")
+        assert rate_api.requests == 1
+
+        # Inside the refresh-ahead window: old table served, new one fetched behind it
+        store.fetched_at = datetime.now() - (CACHE_DURATION - REFRESH_AHEAD) - timedelta(seconds=1)
+        rate_api.rates = {**rate_api.rates, "NGN": 1600.0}
+        rate_api.delay = 0.1
+        stale = await store.get_rates("USD")
+        assert stale["NGN"] == 1500.0
+        await store._inflight
+        return await store.get_rates("USD")
+
+    fresh = asyncio.run(run())
+
+    assert rate_api.requests == 2
+    assert fresh["NGN"] == 1600.0
+
+
+def test_cold_start_serves_snapshot_without_network(rate_api, snapshot_path):
+    snapshot_path.write_text(json.dumps({
+        "fetched_at": datetime.now().isoformat(),
+        "rates": {"USD": 1, "NGN": 1400.0}
+    }))
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    rates = asyncio.run(store.get_rates("USD"))
+
+    assert rates["NGN"] == 1400.0
+    assert rate_api.requests == 0
+
+
+def test_old_snapshot_is_served_while_refreshing(rate_api, snapshot_path):
+    snapshot_path.write_text(json.dumps({
+        "fetched_at": (datetime.now() - timedelta(days=1)).isoformat(),
+        "rates": {"USD": 1, "NGN": 1400.0}
+    }))
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    async def run():
+        first = await store.get_rates("USD")
+        await store._inflight
+        return first, await store.get_rates("USD")
+
+    first, second = asyncio.run(run())
+
+    assert (first["NGN"], second["NGN"]) == (1400.0, 1500.0)
+    assert rate_api.requests == 1
+
+
+def test_failed_fetch_is_logged_and_raised(rate_api, snapshot_path, caplog):
+    rate_api.status = 500
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    with caplog.at_level(logging.ERROR, logger="app.services.currency_service"):
+        with pytest.raises(Exception):
+            asyncio.run(store.refresh())
+        # Lookups treat an unavailable table as no rates
+        assert asyncio.run(store.get_rates("USD")) == {}
+
+    assert any("Error fetching exchange rates" in r.message for r in caplog.records)
+    assert not snapshot_path.exists()
+
+
+def test_failed_refresh_keeps_current_table(rate_api, snapshot_path):
+    store = ExchangeRateStore(rate_api.url, str(snapshot_path))
+
+    async def run():
+        await store.get_rates("USD")
+        rate_api.status = 500
+        with pytest.raises(Exception):
+            await store.refresh()
+        return await store.get_rates("USD")
+
+    assert asyncio.run(run())["NGN"] == 1500.0
@@ -0,0 +1,368 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import app.models as models
+from app.services import gift_card_service
+from app.services.gift_card_service import (
+    MAX_ATTEMPTS,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    CircuitBreaker,
+    GiftCardFulfillmentError,
+    GiftCardService,
+    SimulatedGiftCardProvider,
+    TokenBucket,
+    gift_card_queue,
+    gift_card_worker,
+    register_provider,
+)
+
+PROVIDER = "test_brand"
+
+
+class Clock:
+    """Stands in for time.monotonic in the gift card service"""
+
+    def __init__(self):
+        # Start at the real reading, so buckets made before the patch stay consistent
+        self.now = time.monotonic()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    # Only the service's view of time; asyncio keeps the real clock
+    monkeypatch.setattr(gift_card_service, "time", SimpleNamespace(monotonic=fake))
+    return fake
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Simulated provider registered under PROVIDER for the test only"""
+    for name in ("_providers", "_buckets", "_breakers"):
+        monkeypatch.setattr(gift_card_service, name, {})
+    client = SimulatedGiftCardProvider(latency=0, rate_per_second=1000, burst=1000)
+    register_provider(PROVIDER, client)
+    return client
+
+
+@pytest.fixture
+def card_job(db, make_gift):
+    """Paid gift card for PROVIDER with its queued fulfillment job"""
+    def _card_job(provider_key=PROVIDER):
+        gift = make_gift(
+            gift_type=models.GiftTypeEnum.GIFT_CARD,
+            amount=25,
+            payment_status="completed",
+            gift_card_provider=provider_key
+        )
+        GiftCardService.enqueue(db, gift)
+        return gift
+    return _card_job
+
+
+def _process_next(db):
+    job = GiftCardService.claim_next(db)
+    assert job is not None
+    return job, asyncio.run(GiftCardService.process_claimed(db, job))
+
+
+def _make_due(db):
+    db.query(models.GiftCardJob).update({"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+class FailingThenIssuing(SimulatedGiftCardProvider):
+    """Issues the card, but the first `lost` responses never reach us"""
+
+    def __init__(self, lost: int):
+        super().__init__(latency=0, rate_per_second=1000, burst=1000)
+        self.lost = lost
+        self.calls = 0
+
+    async def purchase(self, reference, amount, currency):
+        self.calls += 1
+        order = await super().purchase(reference, amount, currency)
+        if self.lost:
+            self.lost -= 1
+            raise GiftCardFulfillmentError("Timed out waiting for provider")
+        return order
+
+
+# Token bucket
+
+def test_token_bucket_allows_burst_then_limits_rate():
+    bucket = TokenBucket(rate_per_second=20, capacity=3)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(4):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+
+    assert burst < 0.05
+    # 4 more tokens at 20/s
+    assert total >= 0.19
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate_per_second=2, capacity=2)
+
+    async def drain():
+        await bucket.acquire()
+        await bucket.acquire()
+
+    asyncio.run(drain())
+    clock.advance(60)
+    asyncio.run(drain())
+
+    assert bucket.tokens == 0
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=timedelta(seconds=60))
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.advance(59)
+    assert breaker.state == "open"
+    clock.advance(1)
+    assert breaker.state == "half_open"
+
+    # Exactly one trial call
+    assert breaker.allow()
+    assert not breaker.available()
+    assert not breaker.allow()
+
+
+def test_failed_half_open_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=timedelta(seconds=60))
+    breaker.record_failure()
+    clock.advance(60)
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.advance(60)
+    assert breaker.state == "half_open"
+
+
+def test_successful_half_open_trial_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=timedelta(seconds=60))
+    breaker.record_failure()
+    clock.advance(60)
+
+    assert breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_holds_back_its_jobs(db, provider, card_job, clock):
+    card_job()
+    breaker = gift_card_service._breakers[PROVIDER]
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    assert GiftCardService.blocked_providers() == [PROVIDER]
+    assert GiftCardService.claim_next(db) is None
+
+    clock.advance(breaker.cooldown)
+    job, status = _process_next(db)
+    assert status == "fulfilled"
+    assert breaker.state == "closed"
+
+
+def test_failures_through_the_queue_open_the_circuit(db, provider, card_job, clock):
+    provider.failure_rate = 1.0
+    breaker = gift_card_service._breakers[PROVIDER]
+    for _ in range(breaker.failure_threshold):
+        card_job()
+
+    for _ in range(breaker.failure_threshold):
+        _process_next(db)
+
+    assert breaker.state == "open"
+    _make_due(db)
+    assert GiftCardService.claim_next(db) is None
+
+
+# Backoff and dead-lettering
+
+def test_retry_delay_is_jittered_exponential_and_capped():
+    for attempts in range(1, 12):
+        ceiling = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempts - 1))
+        for _ in range(20):
+            delay = gift_card_queue.retry_delay(attempts)
+            assert ceiling / 2 <= delay <= ceiling
+
+
+def test_failed_purchase_is_rescheduled_with_backoff(db, provider, card_job):
+    provider.failure_rate = 1.0
+    card_job()
+
+    before = datetime.utcnow()
+    job, status = _process_next(db)
+
+    assert status == "pending"
+    db.expire_all()
+    job = db.get(models.GiftCardJob, job.id)
+    assert (job.attempts, job.locked_until, job.last_error) == (1, None, "Simulated provider error")
+    assert before + RETRY_BACKOFF_BASE / 2 <= job.next_attempt_at <= datetime.utcnow() + RETRY_BACKOFF_BASE
+    assert GiftCardService.claim_next(db) is None
+
+
+def test_job_is_dead_lettered_after_max_attempts(db, provider, card_job, monkeypatch):
+    provider.failure_rate = 1.0
+    # Keep the circuit out of the way
+    monkeypatch.setattr(gift_card_service._breakers[PROVIDER], "failure_threshold", MAX_ATTEMPTS + 1)
+    gift = card_job()
+
+    statuses = []
+    for _ in range(MAX_ATTEMPTS):
+        _make_due(db)
+        statuses.append(_process_next(db)[1])
+
+    assert statuses == ["pending"] * (MAX_ATTEMPTS - 1) + ["dead"]
+    db.expire_all()
+    assert db.get(models.Gift, gift.id).is_delivered is False
+
+    # The replay tool puts it back with a fresh budget
+    provider.failure_rate = 0.0
+    assert GiftCardService.requeue(db) == 1
+    assert _process_next(db)[1] == "fulfilled"
+
+
+def test_permanent_error_dead_letters_without_tripping_breaker(db, provider, card_job, monkeypatch):
+    async def refuse(reference, amount, currency):
+        raise GiftCardFulfillmentError("Brand not available in region", retryable=False)
+    monkeypatch.setattr(provider, "purchase", refuse)
+    card_job()
+
+    job, status = _process_next(db)
+
+    assert status == "dead"
+    assert gift_card_service._breakers[PROVIDER].failures == 0
+
+
+def test_job_without_provider_is_dead_lettered(db, provider, card_job):
+    card_job(provider_key="unregistered_brand")
+
+    job, status = _process_next(db)
+
+    assert status == "dead"
+    db.expire_all()
+    assert "No provider registered" in db.get(models.GiftCardJob, job.id).last_error
+
+
+# Idempotency
+
+def test_retry_reuses_the_order_for_the_same_reference(db, card_job, monkeypatch):
+    for name in ("_providers", "_buckets", "_breakers"):
+        monkeypatch.setattr(gift_card_service, name, {})
+    flaky = FailingThenIssuing(lost=2)
+    register_provider(PROVIDER, flaky)
+    gift = card_job()
+
+    statuses = []
+    for _ in range(3):
+        _make_due(db)
+        statuses.append(_process_next(db)[1])
+
+    assert statuses == ["pending", "pending", "fulfilled"]
+    assert flaky.calls == 3
+    assert list(flaky.orders) == [f"gift-{gift.id}"]
+    db.expire_all()
+    gift = db.get(models.Gift, gift.id)
+    assert gift.gift_card_code == flaky.orders[f"gift-{gift.id}"]["code"]
+    assert gift.is_delivered
+
+
+def test_delivery_and_job_outcome_commit_together(db, provider, card_job):
+    gift = card_job()
+    job = GiftCardService.claim_next(db)
+
+    # The process dies while committing the purchase
+    def crash():
+        raise RuntimeError("connection lost")
+    db.commit = crash
+    with pytest.raises(RuntimeError):
+        asyncio.run(GiftCardService.process_claimed(db, job))
+    del db.commit
+    db.rollback()
+
+    db.expire_all()
+    assert db.get(models.Gift, gift.id).is_delivered is False
+    assert db.get(models.GiftCardJob, job.id).status == "processing"
+
+    # Re-claimed after the lease; the same order is reused and finished in one commit
+    db.query(models.GiftCardJob).update({"locked_until": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    job = GiftCardService.claim_next(db)
+    commits = []
+    commit = db.commit
+    db.commit = lambda: (commits.append(True), commit())
+    assert asyncio.run(GiftCardService.process_claimed(db, job)) == "fulfilled"
+    del db.commit
+    assert len(commits) == 1
+    db.expire_all()
+    assert db.get(models.Gift, gift.id).gift_card_code == provider.orders[f"gift-{gift.id}"]["code"]
+
+
+def test_enqueue_is_idempotent(db, provider, card_job):
+    gift = card_job()
+
+    assert GiftCardService.enqueue(db, gift) is None
+    assert db.query(models.GiftCardJob).count() == 1
+
+
+def test_worker_fulfills_queued_card(db, provider, card_job):
+    gift = card_job()
+
+    assert asyncio.run(gift_card_worker.run_once()) is True
+    assert asyncio.run(gift_card_worker.run_once()) is False
+
+    db.expire_all()
+    gift = db.get(models.Gift, gift.id)
+    job = db.query(models.GiftCardJob).one()
+    assert gift.is_delivered and gift.gift_card_code
+    assert (job.status, job.attempts) == ("fulfilled", 1)
+    assert job.provider_reference == provider.orders[f"gift-{gift.id}"]["reference"]
+    assert provider.orders[f"gift-{gift.id}"]["code"] == gift.gift_card_code
+    assert Decimal(job.amount) == Decimal("25.00")
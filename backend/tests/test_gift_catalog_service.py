@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.services import gift_catalog_service
+from app.services.currency_service import CurrencyService
+from app.services.gift_catalog_service import GiftCatalogService
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    """Controllable USD rate table and version seen by the catalog"""
+    state = {"rates": {"USD": 1.0, "NGN": 1500.0}, "version": datetime(2026, 1, 1)}
+
+    async def get_exchange_rates(base_currency="USD"):
+        return state["rates"]
+    monkeypatch.setattr(CurrencyService, "get_exchange_rates", staticmethod(get_exchange_rates))
+    monkeypatch.setattr(CurrencyService, "rates_version", staticmethod(lambda: state["version"]))
+    for name, value in (("_rows", None), ("_catalog_fingerprint", None), ("_rates_version", None), ("_entries", {})):
+        monkeypatch.setattr(gift_catalog_service, name, value)
+    return state
+
+
+@pytest.fixture
+def catalog(db):
+    db.add(models.GiftCatalog(
+        gift_type=models.GiftTypeEnum.DIGITAL_CARD,
+        name="Card",
+        description="A card",
+        price=5,
+        currency="USD",
+        is_active=True
+    ))
+    db.commit()
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Threads _materialize ran on"""
+    threads = []
+    materialize = GiftCatalogService._materialize
+
+    def recording(rows, usd_rates):
+        threads.append(threading.current_thread())
+        return materialize(rows, usd_rates)
+    monkeypatch.setattr(GiftCatalogService, "_materialize", staticmethod(recording))
+    return threads
+
+
+def _price(entry):
+    return json.loads(entry[0])["gifts"][0]["price"]
+
+
+def test_catalog_is_materialized_per_currency(rates, catalog):
+    body, etag = asyncio.run(GiftCatalogService.get_catalog("NGN"))
+
+    assert json.loads(body)["user_currency"] == "NGN"
+    assert json.loads(body)["gifts"][0]["price"] == 7500.0
+    assert etag.startswith('"')
+    # Unknown currencies fall back to the base currency
+    assert json.loads(asyncio.run(GiftCatalogService.get_catalog("XYZ"))[0])["user_currency"] == "USD"
+
+
+def test_rate_change_rebuilds_off_the_event_loop_once(rates, catalog, builds):
+    asyncio.run(GiftCatalogService.get_catalog("NGN"))
+    assert len(builds) == 1
+
+    rates["rates"] = {"USD": 1.0, "NGN": 1600.0}
+    rates["version"] += timedelta(hours=1)
+
+    async def burst():
+        loop_thread = threading.current_thread()
+        entries = await asyncio.gather(*(GiftCatalogService.get_catalog("NGN") for _ in range(10)))
+        return loop_thread, entries
+
+    loop_thread, entries = asyncio.run(burst())
+
+    assert len(builds) == 2
+    assert builds[-1] is not loop_thread
+    assert {_price(entry) for entry in entries} == {8000.0}
+
+
+def test_unchanged_rates_serve_without_rebuilding(rates, catalog, builds):
+    asyncio.run(GiftCatalogService.get_catalog("USD"))
+    asyncio.run(GiftCatalogService.get_catalog("NGN"))
+
+    assert len(builds) == 1
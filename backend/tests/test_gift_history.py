@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.services.gift_stats_service import GiftStatsService
+from app.services.payment_webhook_service import PaymentWebhookService
+
+
+@pytest.fixture
+def pair(make_user):
+    return make_user(country="United States")["id"], make_user(country="United States")["id"]
+
+
+def _gift(db, sender_id, recipient_id, created_at, payment_status="completed"):
+    gift = models.Gift(
+        sender_id=sender_id,
+        recipient_id=recipient_id,
+        gift_type=models.GiftTypeEnum.DIGITAL_CARD,
+        gift_name="Card",
+        amount=5,
+        currency="USD",
+        payment_provider=models.PaymentProviderEnum.FLUTTERWAVE,
+        payment_status=payment_status,
+        created_at=created_at
+    )
+    db.add(gift)
+    db.commit()
+    return gift.id
+
+
+def _pages(client, path, user_id, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"user_id": user_id, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get(path, params=params).json()
+        ids += [gift["id"] for gift in page["gifts"]]
+        cursor = page["next_cursor"]
+        assert page["has_more"] is (cursor is not None)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("path, owner", [("/api/gifts/received", 1), ("/api/gifts/sent", 0)])
+def test_pages_cover_gifts_sharing_a_timestamp_exactly_once(client, db, pair, path, owner):
+    base = datetime(2026, 5, 5, 12, 0, 0)
+    # Three gifts per timestamp, so page boundaries fall inside a tie
+    expected = []
+    for minute in range(5):
+        for _ in range(3):
+            expected.append((base + timedelta(minutes=minute), _gift(db, *pair, base + timedelta(minutes=minute))))
+    expected = [gift_id for _, gift_id in sorted(expected, reverse=True)]
+
+    assert _pages(client, path, pair[owner], limit=2) == expected
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "2026-05-05T12:00:00", "2026-05-05T12:00:00_x", "notadate_5"])
+def test_malformed_cursor_is_rejected(client, pair, cursor):
+    response = client.get("/api/gifts/received", params={"user_id": pair[1], "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_totals_follow_sends_and_completions(client, db, pair):
+    sender_id, recipient_id = pair
+    now = datetime.utcnow()
+    gift_ids = [_gift(db, sender_id, recipient_id, now, payment_status="pending") for _ in range(2)]
+    for _ in gift_ids:
+        GiftStatsService.record_sent(db, sender_id)
+    db.commit()
+
+    gift = db.get(models.Gift, gift_ids[0])
+    gift.payment_intent_id = "HBM-GIFT-1"
+    db.commit()
+    asyncio.run(PaymentWebhookService.complete_payment(db, gift, "HBM-GIFT-1", "101"))
+    asyncio.run(PaymentWebhookService.complete_payment(db, gift, "HBM-GIFT-1", "101"))
+
+    sent = client.get("/api/gifts/sent", params={"user_id": sender_id}).json()
+    received = client.get("/api/gifts/received", params={"user_id": recipient_id}).json()
+    # Sent counts every gift sent; received only completed ones
+    assert (sent["total_count"], sent["returned_count"]) == (2, 2)
+    assert (received["total_count"], received["returned_count"]) == (1, 1)
+
+
+def test_reconcile_repairs_drifted_counters(db, pair):
+    sender_id, recipient_id = pair
+    _gift(db, sender_id, recipient_id, datetime.utcnow())
+    _gift(db, sender_id, recipient_id, datetime.utcnow(), payment_status="failed")
+    db.query(models.User).filter(models.User.id == sender_id).update({"gifts_sent_count": 7})
+    db.commit()
+
+    assert GiftStatsService.reconcile(db) == {"sent_corrected": 1, "received_corrected": 1}
+    db.commit()
+    db.expire_all()
+    assert db.get(models.User, sender_id).gifts_sent_count == 2
+    assert db.get(models.User, recipient_id).gifts_received_count == 1
+    assert GiftStatsService.reconcile(db) == {"sent_corrected": 0, "received_corrected": 0}
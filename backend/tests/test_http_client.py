@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from app.core import http_client
+from app.core.http_client import ClientConfig, ServiceClient, get_client, register_client
+
+
+@pytest.fixture
+def client_name(monkeypatch):
+    monkeypatch.setattr(http_client, "_clients", {})
+    register_client("test-service", base_url="https://service.test")
+    yield "test-service"
+    http_client._configs.pop("test-service", None)
+
+
+def _service(handler, **options) -> ServiceClient:
+    """A client whose requests are answered by handler, without backoff sleeps"""
+    client = ServiceClient(ClientConfig(name="test", backoff_base=0, **options))
+    client._client = httpx.AsyncClient(base_url="https://service.test", transport=httpx.MockTransport(handler))
+    return client
+
+
+def _attempts(method, error=None, status_code=200):
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if error is not None:
+            raise error("boom", request=request)
+        return httpx.Response(status_code)
+
+    async def send():
+        try:
+            return (await _service(handler, max_retries=2).request(method, "/pay")).status_code
+        except httpx.TransportError as e:
+            return type(e)
+
+    return asyncio.run(send()), len(calls)
+
+
+def test_post_is_retried_when_the_connection_failed():
+    assert _attempts("POST", httpx.ConnectError) == (httpx.ConnectError, 3)
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.RemoteProtocolError])
+def test_post_is_not_retried_once_it_may_have_been_sent(error):
+    assert _attempts("POST", error) == (error, 1)
+
+
+def test_post_is_not_retried_on_retryable_status():
+    assert _attempts("POST", status_code=503) == (503, 1)
+
+
+def test_get_is_retried_on_transport_errors_and_status():
+    assert _attempts("GET", httpx.ReadTimeout) == (httpx.ReadTimeout, 3)
+    assert _attempts("GET", status_code=503) == (503, 3)
+
+
+def test_client_replaced_on_a_new_loop_is_closed(client_name):
+    async def open_client():
+        return get_client(client_name)
+
+    async def reopen():
+        client = get_client(client_name)
+        await asyncio.sleep(0)  # Let the scheduled close run
+        return client
+
+    first = asyncio.run(open_client())
+    second = asyncio.run(reopen())
+
+    assert second is not first
+    assert first.is_closed
+    assert not second.is_closed
+    asyncio.run(second.aclose())
+
+
+def test_client_replaced_while_its_loop_runs_is_closed_on_that_loop(client_name):
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def open_client():
+            return get_client(client_name)
+        first = asyncio.run_coroutine_threadsafe(open_client(), other_loop).result(timeout=5)
+
+        async def reopen():
+            return get_client(client_name)
+        second = asyncio.run(reopen())
+
+        for closing in list(http_client._closing):
+            closing.result(timeout=5)
+        assert first.is_closed
+        assert not second.is_closed
+        asyncio.run(second.aclose())
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(timeout=5)
+        other_loop.close()
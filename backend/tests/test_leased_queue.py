@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import app.models as models
+from app.services.gift_card_service import GiftCardService, gift_card_queue
+from app.services.payment_webhook_service import PaymentWebhookService, webhook_queue
+
+
+def _jobs(db, make_gift, count):
+    gifts = [make_gift(gift_type=models.GiftTypeEnum.GIFT_CARD, payment_status="completed", gift_card_provider="amazon") for _ in range(count)]
+    for gift in gifts:
+        GiftCardService.enqueue(db, gift)
+    return [job.id for job in db.query(models.GiftCardJob).order_by(models.GiftCardJob.id)]
+
+
+def test_claim_is_exclusive_until_the_lease_runs_out(db, make_gift):
+    [job_id] = _jobs(db, make_gift, 1)
+
+    first = gift_card_queue.claim_next(db)
+    assert (first.id, first.status, first.attempts) == (job_id, "processing", 1)
+    assert gift_card_queue.claim_next(db) is None
+
+    later = datetime.utcnow() + gift_card_queue.lease + timedelta(seconds=1)
+    again = gift_card_queue.claim_next(db, now=later)
+    assert (again.id, again.attempts) == (job_id, 2)
+
+
+def test_fail_backs_off_then_dead_letters(db, make_gift):
+    [job_id] = _jobs(db, make_gift, 1)
+    job = gift_card_queue.claim_next(db)
+
+    assert gift_card_queue.fail(db, job, RuntimeError("timeout")) == "pending"
+    db.commit()
+    db.expire_all()
+    job = db.get(models.GiftCardJob, job_id)
+    assert job.next_attempt_at > datetime.utcnow() + gift_card_queue.backoff_base / 2 - timedelta(seconds=1)
+    assert job.locked_until is None
+
+    assert gift_card_queue.fail(db, job, ValueError("refused"), permanent=True) == "dead"
+    db.commit()
+    db.expire_all()
+    assert (db.get(models.GiftCardJob, job_id).status, db.get(models.GiftCardJob, job_id).last_error) == ("dead", "refused")
+
+
+def test_requeue_by_id_skips_done_items_and_resets_attempts(db, make_gift):
+    done_id, dead_id = _jobs(db, make_gift, 2)
+    db.query(models.GiftCardJob).filter(models.GiftCardJob.id == done_id).update({"status": "fulfilled"})
+    db.query(models.GiftCardJob).filter(models.GiftCardJob.id == dead_id).update({"status": "dead", "attempts": 8})
+    db.commit()
+
+    assert gift_card_queue.requeue(db, item_ids=[done_id, dead_id]) == 1
+    db.expire_all()
+    assert db.get(models.GiftCardJob, done_id).status == "fulfilled"
+    assert (db.get(models.GiftCardJob, dead_id).status, db.get(models.GiftCardJob, dead_id).attempts) == ("pending", 0)
+
+
+def test_dead_or_stuck_uses_each_queue_enqueue_column(db):
+    PaymentWebhookService.record_event(db, b'{"event": "charge.completed", "data": {"id": 1}}')
+    PaymentWebhookService.record_event(db, b'{"event": "charge.completed", "data": {"id": 2}}')
+    db.query(models.PaymentWebhookEvent).filter(models.PaymentWebhookEvent.transaction_id == "1").update(
+        {"received_at": datetime.utcnow() - timedelta(hours=1)}
+    )
+    db.commit()
+
+    stuck = webhook_queue.dead_or_stuck(db, timedelta(minutes=30))
+    assert [event.transaction_id for event in stuck] == ["1"]
+    assert webhook_queue.requeue(db, statuses=(), stuck_for=timedelta(minutes=30)) == 1
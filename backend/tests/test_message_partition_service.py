@@ -0,0 +1,24 @@
+from datetime import date
+
+from app.services.message_partition_service import (
+    PARTITION_NAME_RE,
+    MessagePartitionService,
+    _add_months,
+    partition_name,
+)
+
+
+def test_maintenance_is_skipped_off_postgresql():
+    assert MessagePartitionService.run_maintenance() == {"skipped": "not postgresql"}
+
+
+def test_unpartitioned_messages_table_is_not_partitioned(db):
+    assert MessagePartitionService.is_partitioned(db) is False
+
+
+def test_partition_names_follow_months():
+    assert partition_name(date(2026, 12, 1)) == "messages_y2026m12"
+    assert _add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert _add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert PARTITION_NAME_RE.match(partition_name(date(2027, 3, 1))).groups() == ("2027", "03")
+    assert PARTITION_NAME_RE.match("messages_default") is None
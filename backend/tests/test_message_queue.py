@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+import app.models as models
+from app.services.message_queue import MessageIngestQueue
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Sizes of the batches written by insert_batch"""
+    sizes = []
+    insert_batch = MessageIngestQueue.insert_batch
+
+    def record(rows):
+        sizes.append(len(rows))
+        return insert_batch(rows)
+    monkeypatch.setattr(MessageIngestQueue, "insert_batch", staticmethod(record))
+    return sizes
+
+
+def _run(queue: MessageIngestQueue, scenario):
+    async def run():
+        await queue.start()
+        try:
+            return await scenario()
+        finally:
+            await queue.stop()
+    return asyncio.run(run())
+
+
+def test_full_batches_flush_without_waiting(batches):
+    queue = MessageIngestQueue(max_batch_size=3, max_wait_seconds=0.5)
+
+    async def scenario():
+        started = time.perf_counter()
+        full = await asyncio.gather(*(queue.submit(1, n, f"message {n}") for n in range(6)))
+        return full, time.perf_counter() - started
+
+    results, elapsed = _run(queue, scenario)
+
+    assert batches == [3, 3]
+    assert elapsed < 0.5
+    assert len({result["id"] for result in results}) == 6
+
+
+def test_partial_batch_flushes_after_the_wait(batches):
+    queue = MessageIngestQueue(max_batch_size=100, max_wait_seconds=0.05)
+
+    async def scenario():
+        started = time.perf_counter()
+        await asyncio.gather(queue.submit(1, 1, "a"), queue.submit(1, 2, "b"))
+        return time.perf_counter() - started
+
+    elapsed = _run(queue, scenario)
+
+    assert batches == [2]
+    assert 0.05 <= elapsed < 1
+
+
+def test_each_submitter_gets_the_id_of_its_own_row(db, batches):
+    queue = MessageIngestQueue(max_batch_size=50, max_wait_seconds=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(queue.submit(n % 3 + 1, n, f"message {n}") for n in range(40)))
+
+    results = _run(queue, scenario)
+
+    assert len(batches) < 40
+    for n, result in enumerate(results):
+        message = db.get(models.Message, result["id"])
+        assert (message.content, message.user_id, message.room_id) == (f"message {n}", n, n % 3 + 1)
+        assert message.created_at == message.updated_at == result["created_at"]
+
+
+def test_failed_batch_fails_every_submitter(db, monkeypatch):
+    queue = MessageIngestQueue(max_batch_size=10, max_wait_seconds=0.05)
+    insert_batch = MessageIngestQueue.insert_batch
+
+    def fail(rows):
+        raise RuntimeError("database is down")
+
+    async def scenario():
+        monkeypatch.setattr(MessageIngestQueue, "insert_batch", staticmethod(fail))
+        failed = await asyncio.gather(
+            *(queue.submit(1, n, f"message {n}") for n in range(4)),
+            return_exceptions=True
+        )
+        # The flusher keeps going after a failed batch
+        monkeypatch.setattr(MessageIngestQueue, "insert_batch", staticmethod(insert_batch))
+        return failed, await queue.submit(1, 9, "after")
+
+    failed, after = _run(queue, scenario)
+
+    assert [str(error) for error in failed] == ["database is down"] * 4
+    assert db.query(models.Message).count() == 1
+    assert db.get(models.Message, after["id"]).content == "after"
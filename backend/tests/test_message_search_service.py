@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_mock_engine, event
+
+import app.models as models
+from app.core.database import Base
+from app.services import message_search_service
+from app.services.message_search_service import InvertedMessageIndex, MessageSearchService
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    # Tables are emptied between tests, so SQLite hands out the same ids again
+    monkeypatch.setattr(message_search_service, "_fallback_index", InvertedMessageIndex())
+
+
+@pytest.fixture
+def add_message(db):
+    start = datetime(2026, 10, 1)
+
+    def _add(content, minutes=0, room_id=1, user_id=1, **fields):
+        message = models.Message(
+            room_id=room_id,
+            user_id=user_id,
+            content=content,
+            created_at=start + timedelta(minutes=minutes),
+            **fields
+        )
+        db.add(message)
+        db.commit()
+        return message
+    return _add
+
+
+def test_matches_every_word_newest_first(db, add_message):
+    older = add_message("Happy birthday Ada", minutes=1)
+    newer = add_message("happy BIRTHDAY to you", minutes=2)
+    add_message("happy new year", minutes=3)
+
+    results = MessageSearchService.search(db, "birthday happy")
+
+    assert [row.id for row in results] == [newer.id, older.id]
+
+
+def test_filters_apply_to_candidates(db, add_message):
+    add_message("cake time", room_id=1)
+    kept = add_message("cake for everyone", room_id=2, minutes=1)
+    add_message("cake gone", room_id=2, minutes=2, is_deleted=True)
+
+    results = MessageSearchService.search(db, "cake", room_id=2, include_deleted=False)
+
+    assert [row.id for row in results] == [kept.id]
+
+
+def test_edited_messages_are_reindexed(db, add_message):
+    message = add_message("original words")
+    assert MessageSearchService.search(db, "original")
+
+    message.content = "edited words"
+    message.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+
+    assert MessageSearchService.search(db, "original") == []
+    assert [row.id for row in MessageSearchService.search(db, "edited")] == [message.id]
+
+
+def test_candidates_are_queried_in_bounded_chunks(db, add_message, monkeypatch):
+    monkeypatch.setattr(message_search_service, "CANDIDATE_CHUNK_SIZE", 3)
+    messages = [add_message(f"party number {n}", minutes=n) for n in range(8)]
+    in_lists = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if " IN (" in statement:
+            in_lists.append(statement.split(" IN (", 1)[1].split(")", 1)[0].count("?"))
+    try:
+        results = MessageSearchService.search(db, "party", limit=4)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+
+    assert in_lists == [3, 3, 2]
+    assert [row.id for row in results] == [m.id for m in reversed(messages)][:4]
+
+
+def test_search_vector_ddl_runs_only_on_postgresql(db):
+    sqlite_columns = {row[1] for row in db.connection().exec_driver_sql("PRAGMA table_info(messages)")}
+    assert "content" in sqlite_columns
+    assert "search_vector" not in sqlite_columns
+
+    statements = []
+    engine = create_mock_engine("postgresql://", lambda sql, *args, **kwargs: statements.append(
+        str(sql.compile(dialect=engine.dialect))
+    ))
+    Base.metadata.create_all(engine, tables=[models.Message.__table__], checkfirst=False)
+
+    assert any("ADD COLUMN search_vector tsvector" in sql for sql in statements)
+    assert any("USING gin (search_vector)" in sql for sql in statements)
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.services import payment_outbox_service
+from app.services.payment_outbox_service import PaymentOutboxService, MAX_ATTEMPTS
+from app.services.payment_reconciliation_service import PaymentReconciliationService, _status_cache
+
+
+@pytest.fixture
+def checkout(client, db, make_user, login):
+    """Sender and recipient in USD and a catalog item; returns a send_gift caller"""
+    sender = make_user(country="United States")
+    recipient = make_user(country="United States")
+    item = models.GiftCatalog(
+        gift_type=models.GiftTypeEnum.DIGITAL_CARD,
+        name="Card",
+        description="A card",
+        price=5,
+        currency="USD",
+        is_active=True
+    )
+    db.add(item)
+    db.commit()
+    login(sender["id"])
+    _status_cache.clear()
+
+    def _send():
+        return client.post("/api/gifts/send", json={
+            "recipient_id": recipient["id"],
+            "gift_catalog_id": item.id,
+            "payment_provider": "flutterwave"
+        })
+    return _send
+
+
+def _make_due(db, gift_id):
+    db.query(models.PaymentOutbox).filter(models.PaymentOutbox.gift_id == gift_id).update(
+        {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+
+def _relay():
+    return asyncio.run(PaymentOutboxService.run_relay())
+
+
+def test_checkout_dispatches_inline(checkout, db, flutterwave):
+    response = checkout()
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    tx_ref = body["payment_data"]["tx_ref"]
+    assert body["payment_data"]["payment_url"].endswith(tx_ref)
+    entry = db.query(models.PaymentOutbox).one()
+    assert (entry.status, entry.attempts, entry.locked_until) == ("sent", 1, None)
+    assert json.loads(entry.payload)["tx_ref"] == tx_ref
+    sender = db.get(models.User, db.get(models.Gift, body["gift_id"]).sender_id)
+    assert sender.gifts_sent_count == 1
+
+
+def test_failed_initialization_is_retried_by_relay(checkout, client, db, flutterwave):
+    flutterwave.fail_initialize = True
+    response = checkout()
+
+    assert response.status_code == 200, response.text
+    assert response.json()["payment_data"] is None
+    gift_id = response.json()["gift_id"]
+    entry = db.query(models.PaymentOutbox).one()
+    assert (entry.status, entry.attempts) == ("pending", 1)
+    assert entry.next_attempt_at > datetime.utcnow()
+
+    # Not due yet
+    assert _relay() == 0
+
+    flutterwave.fail_initialize = False
+    _make_due(db, gift_id)
+    assert _relay() == 1
+
+    db.expire_all()
+    entry = db.query(models.PaymentOutbox).one()
+    assert (entry.status, entry.attempts, entry.last_error) == ("sent", 2, None)
+    status = client.get(f"/api/payments/verify/{gift_id}").json()
+    assert status["payment_status"] == "pending"
+    assert status["payment_url"].endswith(json.loads(entry.payload)["tx_ref"])
+
+
+def test_entry_and_gift_fail_after_max_attempts(checkout, db, flutterwave):
+    flutterwave.fail_initialize = True
+    gift_id = checkout().json()["gift_id"]
+
+    for attempt in range(2, MAX_ATTEMPTS + 1):
+        _make_due(db, gift_id)
+        assert _relay() == 0
+        db.expire_all()
+        entry = db.query(models.PaymentOutbox).one()
+        assert entry.attempts == attempt
+        expected = "failed" if attempt == MAX_ATTEMPTS else "pending"
+        assert entry.status == expected
+        assert db.get(models.Gift, gift_id).payment_status == ("failed" if expected == "failed" else "pending")
+
+    # Failed entries are never claimed again
+    _make_due(db, gift_id)
+    assert _relay() == 0
+    db.expire_all()
+    assert db.query(models.PaymentOutbox).one().attempts == MAX_ATTEMPTS
+
+
+def test_entry_of_crashed_request_is_reclaimed_after_lease(checkout, db, flutterwave):
+    gift_id = checkout().json()["gift_id"]
+    gift = db.get(models.Gift, gift_id)
+    # A second checkout commits its gift and entry, then dies before dispatching
+    crashed = models.Gift(
+        sender_id=gift.sender_id,
+        recipient_id=gift.recipient_id,
+        gift_type=gift.gift_type,
+        gift_name=gift.gift_name,
+        amount=gift.amount,
+        currency=gift.currency,
+        payment_provider=gift.payment_provider,
+        payment_status="pending",
+        payment_intent_id="HBM-GIFT-crashed"
+    )
+    db.add(crashed)
+    db.flush()
+    PaymentOutboxService.add(db, crashed.id, payment_outbox_service.FLUTTERWAVE_INITIALIZE, {
+        **json.loads(db.query(models.PaymentOutbox).one().payload),
+        "tx_ref": "HBM-GIFT-crashed"
+    })
+    db.commit()
+
+    assert _relay() == 0  # still leased
+
+    db.query(models.PaymentOutbox).filter(models.PaymentOutbox.gift_id == crashed.id).update(
+        {"locked_until": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    assert _relay() == 1
+    db.expire_all()
+    entry = db.query(models.PaymentOutbox).filter(models.PaymentOutbox.gift_id == crashed.id).one()
+    assert (entry.status, entry.attempts) == ("sent", 2)
+    assert "HBM-GIFT-crashed" in flutterwave.initialized
+
+
+def test_attempt_that_outlived_its_lease_does_not_record(checkout, db, flutterwave):
+    flutterwave.fail_initialize = True
+    gift_id = checkout().json()["gift_id"]
+    _make_due(db, gift_id)
+
+    stale = PaymentOutboxService.claim_next(db)
+    db.query(models.PaymentOutbox).update({"locked_until": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    current = PaymentOutboxService.claim_next(db)
+    assert current.attempts == stale.attempts + 1
+
+    flutterwave.fail_initialize = False
+    asyncio.run(PaymentOutboxService.dispatch(db, current))
+    flutterwave.fail_initialize = True
+    with pytest.raises(Exception):
+        asyncio.run(PaymentOutboxService.dispatch(db, stale))
+
+    db.expire_all()
+    entry = db.query(models.PaymentOutbox).one()
+    assert (entry.status, entry.last_error) == ("sent", None)
+    assert db.get(models.Gift, gift_id).payment_status == "pending"
+
+
+def test_payment_link_ignores_undispatched_entries(checkout, client, db, flutterwave):
+    flutterwave.fail_initialize = True
+    gift_id = checkout().json()["gift_id"]
+    sender_id = db.get(models.Gift, gift_id).sender_id
+
+    assert PaymentOutboxService.payment_link(db, gift_id, sender_id) is None
+    assert "payment_url" not in client.get(f"/api/payments/verify/{gift_id}").json()
+
+
+def test_payment_link_is_only_served_to_the_sender(checkout, client, db, flutterwave, make_user, login):
+    gift_id = checkout().json()["gift_id"]
+    assert client.get(f"/api/payments/verify/{gift_id}").json()["payment_url"]
+
+    login(make_user()["id"])
+    status = client.get(f"/api/payments/verify/{gift_id}").json()
+
+    assert status["payment_status"] == "pending"
+    assert "payment_url" not in status
+    assert "payment_url" not in PaymentReconciliationService.get_status(db, gift_id)
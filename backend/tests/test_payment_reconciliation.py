@@ -0,0 +1,125 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.models as models
+from app.services.payment_reconciliation_service import GIVE_UP_AFTER, PaymentReconciliationService
+from app.services.payment_webhook_service import PaymentWebhookService, webhook_worker
+
+
+@pytest.fixture
+def stale_gift(make_gift):
+    """Pending gift old enough for reconciliation to pick up"""
+    def _stale_gift(age=timedelta(minutes=10), **fields):
+        return make_gift(created_at=datetime.utcnow() - age, **fields)
+    return _stale_gift
+
+
+def _reconcile(db):
+    return asyncio.run(PaymentReconciliationService.reconcile(db))
+
+
+def _gift(db, gift_id):
+    db.expire_all()
+    return db.get(models.Gift, gift_id)
+
+
+def test_verified_payment_completes_and_activates(db, stale_gift, flutterwave, activations):
+    gift = stale_gift()
+    flutterwave.add_transaction(9001, gift.payment_intent_id, gift.amount, gift.currency)
+
+    result = _reconcile(db)
+
+    assert result == {"checked": 1, "completed": 1, "failed": 0, "errors": 0}
+    gift = _gift(db, gift.id)
+    assert gift.payment_status == "completed"
+    assert gift.payment_transaction_id == "9001"
+    assert gift.payment_checked_at is not None
+    assert activations == [gift.id]
+    assert db.get(models.User, gift.recipient_id).gifts_received_count == 1
+
+
+def test_failed_transaction_fails_gift(db, stale_gift, flutterwave, activations):
+    gift = stale_gift()
+    flutterwave.add_transaction(9002, gift.payment_intent_id, gift.amount, gift.currency, status="failed")
+
+    result = _reconcile(db)
+
+    assert (result["completed"], result["failed"]) == (0, 1)
+    assert _gift(db, gift.id).payment_status == "failed"
+    assert activations == []
+
+
+def test_underpaid_transaction_is_not_completed(db, stale_gift, flutterwave, activations):
+    gift = stale_gift(amount=50)
+    flutterwave.add_transaction(9003, gift.payment_intent_id, 5, gift.currency)
+
+    _reconcile(db)
+
+    assert _gift(db, gift.id).payment_status == "pending"
+    assert activations == []
+
+
+def test_unknown_transaction_stays_pending_until_give_up(db, stale_gift, flutterwave, activations):
+    recent = stale_gift()
+    abandoned = stale_gift(age=GIVE_UP_AFTER + timedelta(minutes=1))
+
+    result = _reconcile(db)
+
+    assert result == {"checked": 2, "completed": 0, "failed": 1, "errors": 0}
+    recent = _gift(db, recent.id)
+    assert recent.payment_status == "pending"
+    assert recent.payment_checked_at is not None
+    assert _gift(db, abandoned.id).payment_status == "failed"
+
+    # Checked gifts wait RECHECK_INTERVAL before the next verification
+    calls = flutterwave.calls
+    assert _reconcile(db)["checked"] == 0
+    assert flutterwave.calls == calls
+
+
+def test_transient_error_leaves_gift_due(db, stale_gift, flutterwave):
+    gift = stale_gift()
+    flutterwave.fail_verify = 1
+
+    result = _reconcile(db)
+
+    assert result["errors"] == 1
+    gift = _gift(db, gift.id)
+    assert (gift.payment_status, gift.payment_checked_at) == ("pending", None)
+
+
+def test_recent_gifts_are_left_to_the_webhook(db, make_gift, flutterwave):
+    make_gift()
+
+    assert _reconcile(db)["checked"] == 0
+    assert flutterwave.calls == 0
+
+
+def test_racing_webhook_worker_activates_once(db, stale_gift, flutterwave, activations):
+    gifts = [stale_gift() for _ in range(5)]
+    for n, gift in enumerate(gifts):
+        flutterwave.add_transaction(9100 + n, gift.payment_intent_id, gift.amount, gift.currency)
+        PaymentWebhookService.record_event(db, json.dumps({
+            "event": "charge.completed",
+            "data": {"id": 9100 + n, "tx_ref": gift.payment_intent_id, "status": "successful"}
+        }).encode())
+    # Both sides wait on Flutterwave at the same time, then race to complete
+    flutterwave.verify_delay = 0.05
+
+    async def race():
+        async def drain_webhooks():
+            while await webhook_worker.run_once():
+                pass
+        await asyncio.gather(PaymentReconciliationService.run_reconciliation(), drain_webhooks())
+
+    asyncio.run(race())
+
+    db.expire_all()
+    assert sorted(activations) == sorted(gift.id for gift in gifts)
+    for gift in gifts:
+        assert _gift(db, gift.id).payment_status == "completed"
+        assert db.get(models.User, gift.recipient_id).gifts_received_count == 1
+    assert {e.status for e in db.query(models.PaymentWebhookEvent)} == {"processed"}
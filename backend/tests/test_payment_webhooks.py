@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+
+import app.models as models
+from app.services.payment_webhook_service import (
+    InvalidWebhookPayload,
+    PaymentWebhookService,
+)
+
+
+@pytest.mark.parametrize("body", [
+    b"\xff\xfe not utf-8",
+    b"{not json",
+    b"[1, 2, 3]",
+    b'"charge.completed"',
+    b"null",
+    b'{"event": "charge.completed", "data": [1]}',
+])
+def test_webhook_rejects_invalid_payload(client, db, body):
+    response = client.post("/api/payments/webhook/flutterwave", content=body)
+
+    assert response.status_code == 400
+    assert db.query(models.PaymentWebhookEvent).count() == 0
+
+
+@pytest.mark.parametrize("body", [b"[]", b"\xc3\x28", b'{"data": "x"}'])
+def test_parse_payload_raises_invalid_payload(body):
+    with pytest.raises(InvalidWebhookPayload):
+        PaymentWebhookService.parse_payload(body)
+
+
+def test_webhook_stores_event_once(client, db):
+    body = json.dumps({"event": "charge.completed", "data": {"id": 42, "tx_ref": "HBM-GIFT-x"}}).encode()
+
+    assert client.post("/api/payments/webhook/flutterwave", content=body).json() == {"status": "received"}
+    assert client.post("/api/payments/webhook/flutterwave", content=body).json() == {"status": "duplicate"}
+    event = db.query(models.PaymentWebhookEvent).one()
+    assert (event.transaction_id, event.tx_ref) == ("42", "HBM-GIFT-x")
+
+
+def test_complete_payment_activates_only_on_transition(db, make_gift, activations):
+    gift = make_gift()
+
+    first = asyncio.run(PaymentWebhookService.complete_payment(db, gift, gift.payment_intent_id, "101"))
+    second = asyncio.run(PaymentWebhookService.complete_payment(db, gift, gift.payment_intent_id, "101"))
+
+    assert (first, second) == (True, False)
+    assert activations == [gift.id]
+    db.expire_all()
+    assert db.get(models.Gift, gift.id).payment_status == "completed"
+
+
+def test_completed_gift_is_still_found_by_tx_ref(db, make_gift, activations):
+    gift = make_gift()
+    asyncio.run(PaymentWebhookService.complete_payment(db, gift, gift.payment_intent_id, "101"))
+    db.expire_all()
+
+    found = PaymentWebhookService._find_gift(db, gift.payment_intent_id)
+
+    assert found.id == gift.id
+    assert (found.payment_intent_id, found.payment_transaction_id) == (gift.payment_intent_id, "101")
+
+
+def test_complete_payment_skips_gift_completed_elsewhere(db, make_gift, activations):
+    # e.g. reconciliation completed it and is activating it right now
+    gift = make_gift(payment_status="completed")
+
+    assert asyncio.run(PaymentWebhookService.complete_payment(db, gift, gift.payment_intent_id, "101")) is False
+    assert activations == []
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import app.models as models
+from app.services import presence_service
+from app.services.presence_service import PresenceService
+
+
+@pytest.fixture(autouse=True)
+def fresh_presence(monkeypatch):
+    monkeypatch.setattr(presence_service, "_heartbeats", {})
+    monkeypatch.setattr(presence_service, "_pending_last_seen", {})
+    monkeypatch.setattr(presence_service, "_membership_cache", {})
+
+
+@pytest.fixture
+def room_id(db):
+    """Id of a tribe room with participants 1 and 2"""
+    joined = datetime(2026, 7, 7)
+    room = models.Room(
+        room_type=models.RoomTypeEnum.TRIBE,
+        room_identifier="tribe_07-07_2026",
+        opens_at=joined,
+        closes_at=joined + timedelta(days=1)
+    )
+    db.add(room)
+    db.flush()
+    for user_id in (1, 2):
+        db.add(models.RoomParticipant(room_id=room.id, user_id=user_id, joined_at=joined, last_seen=joined))
+    db.commit()
+    return room.id
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement.split()[0], executemany))
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+def _last_seen(db, room_id):
+    db.expire_all()
+    return {
+        p.user_id: p.last_seen
+        for p in db.query(models.RoomParticipant).filter_by(room_id=room_id)
+    }
+
+
+def test_heartbeats_are_written_behind_in_one_batch(db, room_id, statements):
+    assert PresenceService.heartbeat(db, room_id, 1)
+    assert PresenceService.heartbeat(db, room_id, 2)
+    assert PresenceService.heartbeat(db, room_id, 1)
+    # Membership is read once per user, and nothing is written yet
+    assert statements == [("SELECT", False), ("SELECT", False)]
+
+    assert PresenceService.flush(db) == 2
+
+    assert [s for s in statements if s[0] == "UPDATE"] == [("UPDATE", True)]
+    seen = _last_seen(db, room_id)
+    assert all(at > datetime(2026, 7, 7) for at in seen.values())
+    assert PresenceService.flush(db) == 0
+
+
+def test_non_members_are_not_tracked(db, room_id):
+    assert PresenceService.heartbeat(db, room_id, 3) is False
+    assert PresenceService.get_online_count(room_id) == 0
+    assert PresenceService.flush(db) == 0
+
+
+def test_online_users_are_most_recent_first_and_expire(db, room_id):
+    PresenceService.touch(room_id, 1)
+    PresenceService.touch(room_id, 2)
+    assert PresenceService.get_online_user_ids(room_id) == [2, 1]
+
+    presence_service._heartbeats[room_id][1] -= presence_service.ONLINE_WINDOW * 2
+    PresenceService.flush(db)
+
+    assert PresenceService.get_online_user_ids(room_id) == [2]
+    assert 1 not in presence_service._heartbeats[room_id]
+
+
+def test_failed_flush_keeps_values_for_the_next_flush(db, room_id):
+    PresenceService.touch(room_id, 1)
+    failed_at = presence_service._pending_last_seen[(room_id, 1)]
+
+    def fail():
+        # A heartbeat arrives while the flush is failing
+        PresenceService.touch(room_id, 2)
+        raise RuntimeError("database unavailable")
+    db.commit = fail
+    try:
+        with pytest.raises(RuntimeError):
+            PresenceService.flush(db)
+    finally:
+        del db.commit
+    db.rollback()
+
+    assert presence_service._pending_last_seen[(room_id, 1)] == failed_at
+    assert (room_id, 2) in presence_service._pending_last_seen
+    assert PresenceService.flush(db) == 2
+    assert _last_seen(db, room_id)[1] == failed_at
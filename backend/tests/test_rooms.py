@@ -0,0 +1,104 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, update
+
+import app.models as models
+from app.core.database import engine
+
+
+@pytest.fixture
+def personal_room(db, make_user):
+    """A personal room (owner already a participant) admitting `max_guests` invited guests"""
+    def _personal_room(max_guests):
+        owner = make_user(date_of_birth=date(1990, 7, 7))
+        now = datetime.utcnow()
+        room = models.Room(
+            room_type=models.RoomTypeEnum.PERSONAL,
+            room_identifier=f"personal_{owner['id']}",
+            opens_at=now,
+            closes_at=now + timedelta(days=1),
+            owner_id=owner["id"],
+            invite_code="invite",
+            max_guests=max_guests
+        )
+        db.add(room)
+        db.flush()
+        db.add(models.RoomParticipant(room_id=room.id, user_id=owner["id"]))
+        db.commit()
+        return room.id
+    return _personal_room
+
+
+def _join(client, room_id, user_id):
+    return client.post(f"/api/rooms/{room_id}/join", params={
+        "invite_code": "invite", "user_id": user_id
+    }).json()
+
+
+def _guest_count(db, room_id):
+    db.expire_all()
+    return db.get(models.Room, room_id).guest_count
+
+
+def test_guests_are_admitted_up_to_max_guests(client, db, make_user, personal_room):
+    room_id = personal_room(max_guests=1)
+    mate = make_user(date_of_birth=date(1992, 7, 7))
+    other = make_user(date_of_birth=date(1992, 1, 1))
+
+    assert _join(client, room_id, mate["id"]) == {"message": "Joined successfully", "is_birthday_mate": True}
+    assert _join(client, room_id, mate["id"]) == {"message": "Already a member"}
+    assert _join(client, room_id, other["id"]) == {"detail": "Room is full"}
+    assert _guest_count(db, room_id) == 1
+
+
+def _while_joining(statement_prefix, other_write):
+    """Run other_write on another connection just before the join issues statement_prefix"""
+    raced = []
+
+    def race(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(statement_prefix) and not raced:
+            raced.append(True)
+            with engine.connect() as other:
+                other_write(other)
+                other.commit()
+    event.listen(engine, "before_cursor_execute", race)
+    return raced, lambda: event.remove(engine, "before_cursor_execute", race)
+
+
+def test_concurrent_join_cannot_overfill_the_room(client, db, make_user, personal_room):
+    room_id = personal_room(max_guests=1)
+    guest = make_user()
+
+    # Another guest takes the last slot after this join read the room
+    raced, stop = _while_joining("UPDATE rooms", lambda conn: conn.execute(
+        update(models.Room).where(models.Room.id == room_id).values(guest_count=models.Room.guest_count + 1)
+    ))
+    try:
+        response = _join(client, room_id, guest["id"])
+    finally:
+        stop()
+
+    assert raced
+    assert response == {"detail": "Room is full"}
+    assert _guest_count(db, room_id) == 1
+
+
+def test_duplicate_concurrent_join_gives_the_slot_back(client, db, make_user, personal_room):
+    room_id = personal_room(max_guests=5)
+    guest = make_user()
+
+    # The same user's other request commits its participant row after this
+    # join found no membership, so its participant insert conflicts
+    raced, stop = _while_joining("UPDATE rooms", lambda conn: conn.execute(
+        models.RoomParticipant.__table__.insert().values(room_id=room_id, user_id=guest["id"])
+    ))
+    try:
+        response = _join(client, room_id, guest["id"])
+    finally:
+        stop()
+
+    assert raced
+    assert response == {"message": "Already a member"}
+    assert _guest_count(db, room_id) == 0
+    assert db.query(models.RoomParticipant).filter_by(room_id=room_id, user_id=guest["id"]).count() == 1
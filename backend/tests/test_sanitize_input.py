@@ -0,0 +1,92 @@
+"""
+sanitize_input must stay output-identical to the original implementation.
+
+The reference below is the sanitizer as it was before the patterns were
+precompiled and gated on required characters. Inputs come from a seeded
+random generator over tokens that exercise every pattern, the escape and
+unescape steps, truncation and whitespace trimming.
+"""
+import random
+import re
+
+import pytest
+
+from app.core.security import sanitize_input
+
+
+def _reference_sanitize(text: str, max_length: int = 1000) -> str:
+    if not text:
+        return ""
+    text = text.strip()
+    if len(text) > max_length:
+        text = text[:max_length]
+    dangerous_patterns = [
+        r'<script[^>]*>.*?</script>',
+        r'javascript:',
+        r'on\w+\s*=',
+        r'<iframe[^>]*>',
+        r'<object[^>]*>',
+        r'<embed[^>]*>',
+        r'<link[^>]*>',
+        r'<meta[^>]*>',
+        r'<style[^>]*>.*?</style>',
+    ]
+    for pattern in dangerous_patterns:
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
+    text = text.replace('&', '&amp;')
+    text = text.replace('<', '&lt;')
+    text = text.replace('>', '&gt;')
+    text = text.replace('"', '&quot;')
+    text = text.replace("'", '&#x27;')
+    text = text.replace('&amp;amp;', '&amp;')
+    text = text.replace('&amp;lt;', '&lt;')
+    text = text.replace('&amp;gt;', '&gt;')
+    return text
+
+
+TOKENS = [
+    "<script>", "</script>", "<SCRIPT src=x>", "<scr", "ipt>", "</scr", "javascript:", "JavaScript:",
+    "java", "script:", "onclick=", "on load =", "onerror  =", "ON", "on", "click", "=", "<iframe>",
+    "<IFRAME a=b>", "<object a>", "<embed>", "<link rel=x>", "<meta x>", "<style>", "</style>",
+    "&", "&amp;", "&lt;", "&gt;", "&amp;amp;", "&amp;lt;", "&amp;gt;", "&quot;", "&#x27;",
+    "<", ">", "\"", "'", ":", "/", "a", "b", "o", "n", " ", "  ", "\n", "\t", "é", "ß", "İ",
+    "🎉", " ", " ", "happy birthday",
+]
+ALPHABET = "<>&\"'sciptrjavonSCIPTJAVON=:;/ \n\tamplgtq#x27é"
+
+
+def _corpus(seed: int, size: int):
+    rng = random.Random(seed)
+    for _ in range(size):
+        if rng.random() < 0.5:
+            text = "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 30)))
+        else:
+            text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 60)))
+        yield text, rng.choice([1000, 1, 5, 12, 40, 200])
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_reference_on_random_corpus(seed):
+    for text, max_length in _corpus(seed, 5000):
+        assert sanitize_input(text, max_length) == _reference_sanitize(text, max_length), (text, max_length)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "plain text",
+    "  padded  ",
+    "<script>alert(1)</script>hi",
+    "<scr<script></script>ipt>alert(1)</script>",
+    "javajavascript:script:alert(1)",
+    "<img src=x onerror=alert(1)>",
+    "o<script></script>nclick=x",
+    "<style>body{}</style><STYLE>x</STYLE>",
+    "Tom & Jerry say \"hi\" it's <3",
+    "&amp;amp; &amp;lt; &lt;",
+    "x" * 1500,
+    " " * 10 + "<" * 1200,
+])
+def test_matches_reference_on_known_cases(text):
+    assert sanitize_input(text) == _reference_sanitize(text)
+    assert sanitize_input(text, 7) == _reference_sanitize(text, 7)
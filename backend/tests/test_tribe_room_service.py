@@ -0,0 +1,62 @@
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.core.database import engine, insert_or_ignore
+from app.services.tribe_room_service import TribeRoomService
+
+BIRTHDAY = date(2026, 7, 7)
+
+
+def test_provisioning_is_idempotent(db):
+    created = TribeRoomService.provision_rooms(db, BIRTHDAY, days=2)
+    db.commit()
+    again = TribeRoomService.provision_rooms(db, BIRTHDAY, days=2)
+    db.commit()
+
+    identifiers = {room.room_identifier for room in db.query(models.Room)}
+    assert created == len(identifiers) > 0
+    assert again == 0
+    assert {"tribe_07-07_2026", "tribe_07-08_2026"} <= identifiers
+
+
+def test_first_visit_provisions_the_room_and_joins_once(db, make_user):
+    user = make_user(date_of_birth=date(1990, 7, 7))
+
+    first = TribeRoomService.get_room_for_member(db, "07-07", BIRTHDAY, user["id"])
+    second = TribeRoomService.get_room_for_member(db, "07-07", BIRTHDAY, user["id"])
+
+    assert first.id == second.id
+    assert first.room_identifier == "tribe_07-07_2026"
+    participants = db.query(models.RoomParticipant).filter_by(room_id=first.id).all()
+    assert [(p.user_id, p.is_birthday_mate) for p in participants] == [(user["id"], True)]
+
+
+def test_concurrent_first_visit_joins_once(db, make_user):
+    user = make_user(date_of_birth=date(1990, 7, 7))
+    TribeRoomService.provision_rooms(db, BIRTHDAY)
+    db.commit()
+    room_id = db.query(models.Room.id).filter_by(room_identifier="tribe_07-07_2026").scalar()
+    raced = []
+
+    # Another request for the same user joins after this one saw no participation
+    def join_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO room_participants") and not raced:
+            raced.append(True)
+            with engine.connect() as other:
+                insert_or_ignore(Session(bind=other), models.RoomParticipant, {
+                    "room_id": room_id, "user_id": user["id"], "is_birthday_mate": True
+                }, ["room_id", "user_id"])
+                other.commit()
+
+    event.listen(engine, "before_cursor_execute", join_first)
+    try:
+        room = TribeRoomService.get_room_for_member(db, "07-07", BIRTHDAY, user["id"])
+    finally:
+        event.remove(engine, "before_cursor_execute", join_first)
+
+    assert raced
+    assert room.id == room_id
+    assert db.query(models.RoomParticipant).filter_by(room_id=room_id).count() == 1
@@ -0,0 +1,92 @@
+from datetime import date
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+import app.models as models
+from app.core.database import engine
+from app.services.tribe_stats_service import TribeStatsService
+
+
+def test_deactivate_decrements_tribe_count_once(client, db, make_user, login):
+    user = make_user(date_of_birth=date(1990, 3, 4))
+    make_user(date_of_birth=date(1991, 3, 4))
+    assert TribeStatsService.get_member_count(db, "03-04") == 2
+    login(user["id"])
+
+    first = client.post(f"/api/users/{user['id']}/deactivate")
+    second = client.post(f"/api/users/{user['id']}/deactivate")
+
+    assert first.json() == {"message": "Account deactivated successfully"}
+    assert second.json() == {"message": "Account already deactivated"}
+    db.expire_all()
+    assert TribeStatsService.get_member_count(db, "03-04") == 1
+    assert db.get(models.User, user["id"]).is_active is False
+
+
+def test_concurrent_deactivation_decrements_once(client, db, make_user, login):
+    user = make_user(date_of_birth=date(1990, 3, 4))
+    make_user(date_of_birth=date(1991, 3, 4))
+    login(user["id"])
+    raced = []
+
+    # Another request deactivates the account after this one read it as active
+    def deactivate_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE users SET is_active") and not raced:
+            raced.append(True)
+            with engine.connect() as other:
+                other.execute(
+                    update(models.User).where(models.User.id == user["id"]).values(is_active=False)
+                )
+                TribeStatsService.record_member_change(
+                    Session(bind=other), "03-04", "Nigeria", models.GenderEnum.FEMALE, -1
+                )
+                other.commit()
+
+    event.listen(engine, "before_cursor_execute", deactivate_first)
+    try:
+        response = client.post(f"/api/users/{user['id']}/deactivate")
+    finally:
+        event.remove(engine, "before_cursor_execute", deactivate_first)
+
+    assert raced
+    assert response.json() == {"message": "Account already deactivated"}
+    db.expire_all()
+    assert TribeStatsService.get_member_count(db, "03-04") == 1
+
+
+def _member_pages(client, tribe_id, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor is not None:
+            params["after_id"] = cursor
+        body = client.get(f"/api/users/tribe/{tribe_id}/members", params=params).json()
+        pages.append(body)
+        cursor = body["next_cursor"]
+        if not body["has_more"]:
+            return pages
+
+
+def test_tribe_members_page_by_id_without_gaps_or_repeats(client, make_user, login):
+    members = [make_user(date_of_birth=date(1980 + n, 7, 7))["id"] for n in range(5)]
+    make_user(date_of_birth=date(1990, 7, 8))
+    login(members[2])
+    client.post(f"/api/users/{members[2]}/deactivate")
+
+    pages = _member_pages(client, "07-07", limit=2)
+
+    assert [[m["id"] for m in page["members"]] for page in pages] == [
+        [members[0], members[1]], [members[3], members[4]]
+    ]
+    assert [page["next_cursor"] for page in pages] == [members[1], None]
+    assert {page["total_count"] for page in pages} == {4}
+
+
+def test_tribe_member_count_cache_sees_new_members(client, make_user):
+    make_user(date_of_birth=date(1985, 7, 7))
+    assert client.get("/api/users/tribe/07-07/members").json()["total_count"] == 1
+
+    make_user(date_of_birth=date(1986, 7, 7))
+
+    assert client.get("/api/users/tribe/07-07/members").json()["total_count"] == 2
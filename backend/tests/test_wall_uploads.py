@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app.models as models
+
+
+@pytest.fixture
+def open_wall(db, make_user):
+    """An open wall accepting uploads from the owner's birthday mates"""
+    def _open_wall(max_photos=50):
+        owner = make_user(date_of_birth=date(1990, 7, 7))
+        now = datetime.utcnow()
+        wall = models.BirthdayWall(
+            owner_id=owner["id"],
+            opens_at=now - timedelta(hours=1),
+            closes_at=now + timedelta(days=1),
+            birthday_year=now.year,
+            public_url_code="wall-code",
+            max_photos=max_photos,
+            uploads_enabled=True,
+            upload_permission="birthday_mates"
+        )
+        db.add(wall)
+        db.commit()
+        return wall.id, owner["id"]
+    return _open_wall
+
+
+def _upload(client, wall_id, user_id):
+    return client.post(
+        f"/api/rooms/birthday-wall/{wall_id}/photos",
+        params={"user_id": user_id},
+        json={"photo_url": "https://example.com/p.png"}
+    )
+
+
+def _uploads(db, wall_id):
+    db.expire_all()
+    return {u.uploader_user_id: u.upload_count for u in db.query(models.WallUpload).filter_by(wall_id=wall_id)}
+
+
+def test_guest_uploads_once(client, db, make_user, open_wall):
+    wall_id, _ = open_wall()
+    mate = make_user(date_of_birth=date(1995, 7, 7))
+
+    assert _upload(client, wall_id, mate["id"]).status_code == 200
+    second = _upload(client, wall_id, mate["id"])
+
+    assert second.status_code == 403
+    assert second.json()["detail"].startswith("You have already uploaded")
+    assert _uploads(db, wall_id) == {mate["id"]: 1}
+    assert db.query(models.WallPhoto).filter_by(wall_id=wall_id).count() == 1
+
+
+def test_owner_uploads_are_counted_on_one_row(client, db, open_wall):
+    wall_id, owner_id = open_wall()
+
+    assert _upload(client, wall_id, owner_id).status_code == 200
+    assert _upload(client, wall_id, owner_id).status_code == 200
+
+    assert _uploads(db, wall_id) == {owner_id: 2}
+    assert db.query(models.WallPhoto).filter_by(wall_id=wall_id).count() == 2
+
+
+def test_rejected_upload_releases_the_guest_claim(client, db, make_user, open_wall):
+    wall_id, _ = open_wall(max_photos=0)
+    mate = make_user(date_of_birth=date(1995, 7, 7))
+
+    response = _upload(client, wall_id, mate["id"])
+
+    assert response.json() == {"detail": "Photo limit reached"}
+    assert _uploads(db, wall_id) == {}
+
+
+def test_reaction_toggles_and_replaces(client, db, make_user, open_wall):
+    wall_id, owner_id = open_wall()
+    photo_id = _upload(client, wall_id, owner_id).json()["photo_id"]
+    guest = make_user()
+
+    def react(emoji):
+        return client.post(
+            f"/api/rooms/birthday-wall/{wall_id}/photos/{photo_id}/reactions",
+            params={"user_id": guest["id"]},
+            json={"emoji": emoji}
+        ).json()["action"]
+
+    def reactions():
+        db.expire_all()
+        return [r.emoji for r in db.query(models.PhotoReaction).filter_by(photo_id=photo_id)]
+
+    assert react("❤️") == "added"
+    assert reactions() == ["❤️"]
+    assert react("👍") == "added"
+    assert reactions() == ["👍"]
+    assert react("👍") == "removed"
+    assert reactions() == []
@@ -0,0 +1,104 @@
+"""
+Re-drive background queues (payment webhook events, gift card fulfillment jobs)
+Usage:
+    python database/replay_queue.py --queue webhooks --list            # Show dead and stuck events
+    python database/replay_queue.py --queue webhooks --dead            # Re-queue every dead event
+    python database/replay_queue.py --queue gift_cards --stuck 30      # Also re-queue jobs pending > 30 minutes
+    python database/replay_queue.py --queue gift_cards --id 12 --id 15 # Re-queue specific jobs
+
+Re-queued items get a fresh attempt budget; the running API's workers pick
+them up within a few seconds.
+"""
+import sys
+import argparse
+from datetime import timedelta
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from dotenv import load_dotenv
+load_dotenv(backend_path / ".env")
+
+from app.core.database import SessionLocal
+from app.services.payment_webhook_service import webhook_queue
+from app.services.gift_card_service import gift_card_queue
+
+
+def _describe_event(event) -> str:
+    return (
+        f"tx={event.transaction_id} ref={event.tx_ref} "
+        f"received={event.received_at:%Y-%m-%d %H:%M}"
+    )
+
+
+def _describe_job(job) -> str:
+    return (
+        f"gift={job.gift_id} provider={job.provider_key} {job.amount} {job.currency} "
+        f"created={job.created_at:%Y-%m-%d %H:%M}"
+    )
+
+
+# --queue name -> (queue, what its items are called, one-line item details)
+QUEUES = {
+    "webhooks": (webhook_queue, "webhook event", _describe_event),
+    "gift_cards": (gift_card_queue, "gift card job", _describe_job),
+}
+
+
+def list_items(queue_name: str, stuck_minutes: int):
+    """Print dead items and items that have been waiting longer than stuck_minutes"""
+    queue, label, describe = QUEUES[queue_name]
+    db = SessionLocal()
+    try:
+        items = queue.dead_or_stuck(db, timedelta(minutes=stuck_minutes))
+
+        if not items:
+            print(f"✅ No dead or stuck {label}s")
+            return
+
+        for item in items:
+            print(
+                f"#{item.id} {item.status:<10} attempts={item.attempts} "
+                f"{describe(item)} error={item.last_error or '-'}"
+            )
+    finally:
+        db.close()
+
+
+def replay(queue_name: str, item_ids, include_dead: bool, stuck_minutes):
+    """Re-queue the selected items"""
+    queue, label, _ = QUEUES[queue_name]
+    db = SessionLocal()
+    try:
+        stuck_for = timedelta(minutes=stuck_minutes) if stuck_minutes is not None else None
+        if item_ids:
+            count = queue.requeue(db, item_ids=item_ids)
+        else:
+            statuses = (queue.dead_status,) if include_dead else ()
+            count = queue.requeue(db, statuses=statuses, stuck_for=stuck_for)
+        print(f"✅ Re-queued {count} {label}(s)")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-drive background queues")
+    parser.add_argument("--queue", required=True, choices=sorted(QUEUES), help="Queue to inspect or re-drive")
+    parser.add_argument("--list", action="store_true", help="List dead and stuck items")
+    parser.add_argument("--dead", action="store_true", help="Re-queue all dead items")
+    parser.add_argument("--stuck", type=int, metavar="MINUTES", help="Re-queue items pending longer than this")
+    parser.add_argument("--id", type=int, action="append", dest="ids", help="Re-queue a specific item")
+    args = parser.parse_args()
+
+    if args.list:
+        list_items(args.queue, args.stuck if args.stuck is not None else 30)
+    elif args.ids or args.dead or args.stuck is not None:
+        replay(args.queue, args.ids, args.dead, args.stuck)
+    else:
+        parser.print_help()
+        sys.exit(1)
@@ -493,6 +493,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Amazon Gift Card $25",
+                "provider_key": "amazon",
                 "description": "Universal $25 Amazon gift card for endless shopping",
                 "price": 25.00,
                 "currency": "USD",
@@ -503,6 +504,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Netflix Premium Gift Card",
+                "provider_key": "netflix",
                 "description": "$20 Netflix gift card for premium streaming entertainment",
                 "price": 20.00,
                 "currency": "USD",
@@ -513,6 +515,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Spotify Premium Gift Card",
+                "provider_key": "spotify",
                 "description": "$15 Spotify gift card for unlimited music and podcasts",
                 "price": 15.00,
                 "currency": "USD",
@@ -523,6 +526,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Apple App Store Gift Card",
+                "provider_key": "apple",
                 "description": "$25 Apple gift card for apps, music, and more",
                 "price": 25.00,
                 "currency": "USD",
@@ -533,6 +537,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Google Play Gift Card",
+                "provider_key": "google_play",
                 "description": "$20 Google Play card for apps, games, and entertainment",
                 "price": 20.00,
                 "currency": "USD",
@@ -543,6 +548,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Uber Eats Gift Card",
+                "provider_key": "uber_eats",
                 "description": "$30 Uber Eats gift card for delicious birthday meals",
                 "price": 30.00,
                 "currency": "USD",
@@ -553,6 +559,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Starbucks Gift Card",
+                "provider_key": "starbucks",
                 "description": "$20 Starbucks gift card for birthday coffee treats",
                 "price": 20.00,
                 "currency": "USD",
@@ -563,6 +570,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Airbnb Experience Gift Card",
+                "provider_key": "airbnb",
                 "description": "$50 Airbnb gift card for memorable birthday experiences",
                 "price": 50.00,
                 "currency": "USD",
@@ -573,6 +581,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Steam Gift Card",
+                "provider_key": "steam",
                 "description": "$25 Steam gift card for gaming enthusiasts",
                 "price": 25.00,
                 "currency": "USD",
@@ -583,6 +592,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Disney+ Gift Card",
+                "provider_key": "disney_plus",
                 "description": "$15 Disney+ gift card for magical streaming",
                 "price": 15.00,
                 "currency": "USD",
@@ -593,6 +603,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Sephora Gift Card",
+                "provider_key": "sephora",
                 "description": "$30 Sephora gift card for beauty and self-care",
                 "price": 30.00,
                 "currency": "USD",
@@ -603,6 +614,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Nike Gift Card",
+                "provider_key": "nike",
                 "description": "$40 Nike gift card for athletic gear and style",
                 "price": 40.00,
                 "currency": "USD",
@@ -613,6 +625,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "Uber Gift Card",
+                "provider_key": "uber",
                 "description": "$25 Uber gift card for rides and convenience",
                 "price": 25.00,
                 "currency": "USD",
@@ -623,6 +636,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "DoorDash Gift Card",
+                "provider_key": "doordash",
                 "description": "$30 DoorDash gift card for birthday food delivery",
                 "price": 30.00,
                 "currency": "USD",
@@ -633,6 +647,7 @@ def seed_gift_catalog():
             {
                 "gift_type": GiftTypeEnum.GIFT_CARD,
                 "name": "MasterClass Gift Card",
+                "provider_key": "masterclass",
                 "description": "$50 MasterClass gift card for learning and inspiration",
                 "price": 50.00,
                 "currency": "USD",
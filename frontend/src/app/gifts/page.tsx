@@ -29,8 +29,12 @@ export default function GiftsPage() {
   const { user, loading } = useAuthStore();
   const [activeTab, setActiveTab] = useState<'catalog' | 'sent' | 'received'>('catalog');
   const [giftCatalog, setGiftCatalog] = useState<GiftItem[]>([]);
-  const [sentGifts, setSentGifts] = useState([]);
-  const [receivedGifts, setReceivedGifts] = useState([]);
+  const [sentGifts, setSentGifts] = useState<any[]>([]);
+  const [receivedGifts, setReceivedGifts] = useState<any[]>([]);
+  // next_cursor of the last loaded page; null once everything is loaded
+  const [sentCursor, setSentCursor] = useState<string | null>(null);
+  const [receivedCursor, setReceivedCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
   const [isMobile, setIsMobile] = useState(false);
   const [previewGift, setPreviewGift] = useState<GiftItem | null>(null);
@@ -230,12 +234,28 @@ export default function GiftsPage() {
 
       const giftId = giftResponse.data.gift_id;
       const paymentData = giftResponse.data.payment_data;
+      let paymentUrl: string | undefined = paymentData?.payment_url;
+
+      // The server retries payment initialization in the background; poll for the link
+      if (paymentProvider === 'flutterwave' && !paymentUrl) {
+        toast.loading('Preparing payment...', { id: 'payment' });
+        for (let attempt = 0; attempt < 10 && !paymentUrl; attempt++) {
+          await new Promise(resolve => setTimeout(resolve, 3000));
+          const statusResponse = await giftAPI.verifyPayment(giftId);
+          if (statusResponse.data.payment_status !== 'pending') break;
+          paymentUrl = statusResponse.data.payment_url || undefined;
+        }
+        if (!paymentUrl) {
+          toast.error('Payment could not be prepared yet. Please try again shortly.', { id: 'payment' });
+          return;
+        }
+      }
 
       // Step 2: Handle payment based on provider
-      if (paymentProvider === 'flutterwave' && paymentData?.payment_url) {
+      if (paymentProvider === 'flutterwave' && paymentUrl) {
         // Redirect to Flutterwave payment page
         toast.loading('Redirecting to payment...', { id: 'payment' });
-        window.location.href = paymentData.payment_url;
+        window.location.href = paymentUrl;
         return; // Don't close modal yet, user will be redirected
       } else {
         // For other providers or if no payment URL, handle as before
@@ -276,9 +296,11 @@ export default function GiftsPage() {
       } else if (activeTab === 'sent') {
         const response = await giftAPI.getSentGifts(user!.id);
         setSentGifts(response.data.gifts || []);
+        setSentCursor(response.data.next_cursor || null);
       } else {
         const response = await giftAPI.getReceivedGifts(user!.id);
         setReceivedGifts(response.data.gifts || []);
+        setReceivedCursor(response.data.next_cursor || null);
       }
     } catch (error) {
       console.error('Error fetching gift data:', error);
@@ -288,6 +310,29 @@ export default function GiftsPage() {
     }
   };
 
+  const loadMoreGifts = async () => {
+    const cursor = activeTab === 'sent' ? sentCursor : receivedCursor;
+    if (!user || !cursor || isLoadingMore) return;
+
+    setIsLoadingMore(true);
+    try {
+      if (activeTab === 'sent') {
+        const response = await giftAPI.getSentGifts(user.id, cursor);
+        setSentGifts(prev => [...prev, ...(response.data.gifts || [])]);
+        setSentCursor(response.data.next_cursor || null);
+      } else {
+        const response = await giftAPI.getReceivedGifts(user.id, cursor);
+        setReceivedGifts(prev => [...prev, ...(response.data.gifts || [])]);
+        setReceivedCursor(response.data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Error loading more gifts:', error);
+      toast.error('Failed to load more gifts');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center">
@@ -523,6 +568,17 @@ export default function GiftsPage() {
                       </div>
                     </div>
                   ))}
+                  {sentCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreGifts}
+                        disabled={isLoadingMore}
+                        className="celebration-gradient text-white px-6 py-3 rounded-full font-semibold hover:shadow-xl transition-all disabled:opacity-50"
+                      >
+                        {isLoadingMore ? 'Loading...' : 'Load More Gifts'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               ) : (
                 <div className="glass-effect rounded-3xl p-12 text-center">
@@ -562,6 +618,17 @@ export default function GiftsPage() {
                       </div>
                     </div>
                   ))}
+                  {receivedCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreGifts}
+                        disabled={isLoadingMore}
+                        className="celebration-gradient text-white px-6 py-3 rounded-full font-semibold hover:shadow-xl transition-all disabled:opacity-50"
+                      >
+                        {isLoadingMore ? 'Loading...' : 'Load More Gifts'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               ) : (
                 <div className="glass-effect rounded-3xl p-12 text-center">
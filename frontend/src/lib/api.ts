@@ -137,10 +137,12 @@ export const roomAPI = {
 export const giftAPI = {
   getCatalog: () => api.get('/gifts/catalog'),
   sendGift: (data: any) => api.post('/gifts/send', data), // sender_id from token
-  getReceivedGifts: (userId: number) =>
-    api.get(`/gifts/received`, { params: { user_id: userId } }),
-  getSentGifts: (userId: number) =>
-    api.get(`/gifts/sent`, { params: { user_id: userId } }),
+  // Cursor-paginated: { total_count, returned_count, next_cursor, has_more, gifts }.
+  // Pass the previous page's next_cursor to get the next page.
+  getReceivedGifts: (userId: number, cursor?: string | null, limit?: number) =>
+    api.get(`/gifts/received`, { params: { user_id: userId, cursor: cursor || undefined, limit } }),
+  getSentGifts: (userId: number, cursor?: string | null, limit?: number) =>
+    api.get(`/gifts/sent`, { params: { user_id: userId, cursor: cursor || undefined, limit } }),
   activateGift: (giftId: number) =>
     api.post(`/gifts/activate/${giftId}`),
   getActiveGifts: (userId: number) =>